@@ -0,0 +1,95 @@
+"""
+Recall@k vs. latency of the ANN index modes against the exact Flat baseline.
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.ann_index --vectors 50000 --dim 768
+    python -m benchmarks.ann_index --embeddings .cache/corpus/vectors/<doc_id>.npy
+
+Synthetic vectors are drawn around random cluster centres so they have the
+kind of structure IVF/HNSW rely on; pass real embeddings for real numbers.
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from scripts.embedding_faiss import make_index, select_index_mode, set_search_params, train_index
+
+
+def synthetic_vectors(n, dim, n_clusters=200, noise=0.35, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_clusters, dim)).astype("float32")
+    assignments = rng.integers(0, n_clusters, n)
+    vectors = centres[assignments] + noise * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(f[:k]) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def timed_search(index, queries, k):
+    start = time.perf_counter()
+    _, ids = index.search(queries, k)
+    return ids, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def index_bytes(index):
+    return len(faiss.serialize_index(index))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--embeddings", help=".npy file of real embeddings to use instead of synthetic ones")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    args = parser.parse_args()
+
+    if args.embeddings:
+        vectors = np.array(np.load(args.embeddings), dtype="float32")
+        faiss.normalize_L2(vectors)
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype("float32")
+    faiss.normalize_L2(queries)
+
+    n, dim = vectors.shape
+    print(f"{n} vectors x {dim} dims, {len(queries)} queries, k={args.k}, auto mode -> {select_index_mode(n)}")
+    print(f"{'mode':<10} {'setting':<14} {'build s':>8} {'MB':>8} {'ms/query':>9} {'recall@k':>9}")
+
+    baseline = None
+    for mode in ("flat", "hnsw", "ivf_flat", "ivf_pq"):
+        start = time.perf_counter()
+        index = make_index(dim, n, mode=mode)
+        train_index(index, vectors)
+        index.add(vectors)
+        build = time.perf_counter() - start
+        mb = index_bytes(index) / 1e6
+
+        if mode == "flat":
+            settings = [("exact", {})]
+        elif mode == "hnsw":
+            settings = [(f"efSearch={ef}", {"ef_search": ef}) for ef in args.ef_search]
+        else:
+            settings = [(f"nprobe={p}", {"nprobe": p}) for p in args.nprobe]
+
+        for label, params in settings:
+            set_search_params(index, **params)
+            ids, ms = timed_search(index, queries, args.k)
+            if baseline is None:
+                baseline = ids
+            print(f"{mode:<10} {label:<14} {build:8.2f} {mb:8.1f} {ms:9.3f} {recall_at_k(ids, baseline):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+End-to-end pipeline benchmark on synthetic transcripts, with the fake Azure
+OpenAI clients from scripts.fake_clients (no network, deterministic).
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.end_to_end --pages 10 100 500 --docs 2
+    python -m benchmarks.end_to_end --save baseline.json
+    python -m benchmarks.end_to_end --baseline baseline.json   # exits 1 on regression
+
+For each page count, ``--docs`` fresh transcripts go through
+process_transcript (cold cache), then every question is retrieved with
+query_index against each document's chat pool. Each page count runs in its
+own process, so "peak MB" is that run's resident set high-water mark.
+Reported: docs/min, p50/p95 query latency, peak RSS, and API calls/tokens
+from the pipeline metrics. Set the fake latencies to 0 to measure local
+CPU cost only.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.transcripts import PRODUCTS, synthetic_transcript
+from scripts.batch_qa import DEFAULT_QUESTIONS
+from scripts.extract_text import EXTRACTION_ENGINES
+from scripts.fake_clients import make_fake_clients
+from scripts.metrics import peak_rss_mb
+from scripts.pipeline import process_transcript
+from scripts.rag_query import RETRIEVAL_MODES, query_index
+
+QUESTIONS = DEFAULT_QUESTIONS + [f"What did management say about {p} demand?" for p in PRODUCTS]
+
+# metric -> True if higher is better, for --baseline comparisons
+TRACKED = {"docs_per_min": True, "query_p50_ms": False, "query_p95_ms": False, "peak_rss_mb": False}
+
+
+def run_size(pages, options):
+    """Process ``options["docs"]`` synthetic transcripts of ``pages`` pages, then query them."""
+    clients = make_fake_clients(embedding_latency=options["embedding_latency"], chat_latency=options["chat_latency"],
+                                dim=options["dim"], rate_limit_rate=options["rate_limit_rate"],
+                                error_rate=options["error_rate"])
+    pdfs = [synthetic_transcript(pages, seed=seed) for seed in range(options["docs"])]
+
+    results, api_calls, tokens = [], 0, 0
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Cold query embedding and completion caches too (run_size always runs in a fresh process)
+        os.environ["QUERY_EMBEDDING_CACHE"] = os.path.join(cache_dir, "query_embeddings.sqlite")
+        os.environ["COMPLETION_CACHE"] = os.path.join(cache_dir, "completions.sqlite")
+        start = time.perf_counter()
+        for pdf in pdfs:
+            data = process_transcript(io.BytesIO(pdf), cache_dir=cache_dir, chunk_mode=options["chunk_mode"],
+                                      extract_engine=options["extract_engine"], **clients)
+            totals = data["metrics"]["totals"]
+            api_calls += totals["api_calls"]
+            tokens += totals["tokens_in"] + totals["tokens_out"]
+            results.append(data)
+        elapsed = time.perf_counter() - start
+
+        latencies = []
+        for data in results:
+            pool = data["pools"]["chat"]
+            for question in QUESTIONS * options["query_rounds"]:
+                t0 = time.perf_counter()
+                query_index(question, pool["index"], pool["chunks"], client=data["embedding_client"],
+                            model=data["embedding_model"], mode=options["mode"], lexical=pool.get("lexical"),
+                            use_cache=False)
+                latencies.append(time.perf_counter() - t0)
+
+    return {
+        "pages": pages,
+        "docs": len(pdfs),
+        "chunks": sum(len(d["chunks"]) for d in results) // len(results),
+        "seconds": round(elapsed, 2),
+        "docs_per_min": round(len(pdfs) / elapsed * 60, 2),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "api_calls": api_calls,
+        "tokens": tokens,
+    }
+
+
+def regressions(rows, baseline, tolerance):
+    previous = {row["pages"]: row for row in baseline}
+    found = []
+    for row in rows:
+        before = previous.get(row["pages"])
+        if before is None:
+            continue
+        for metric, higher_is_better in TRACKED.items():
+            old, new = before[metric], row[metric]
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                found.append(f"{row['pages']} pages: {metric} {old} -> {new} ({change:+.0%})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--docs", type=int, default=2, help="transcripts per page count")
+    parser.add_argument("--query-rounds", type=int, default=5, help="times each question is asked per document")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="seconds per embeddings request")
+    parser.add_argument("--chat-latency", type=float, default=0.2, help="seconds per chat completion")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chat completions failing with a 500")
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--mode", default="hybrid", choices=RETRIEVAL_MODES)
+    parser.add_argument("--chunk-mode", default="speaker", choices=["speaker", "tokens"])
+    parser.add_argument("--extract-engine", choices=list(EXTRACTION_ENGINES))
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --save run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before failing")
+    args = parser.parse_args()
+
+    options = {k: getattr(args, k) for k in ("docs", "query_rounds", "embedding_latency", "chat_latency",
+                                              "rate_limit_rate", "error_rate", "dim", "mode", "chunk_mode",
+                                              "extract_engine")}
+    print(f"{'pages':>6} {'docs':>5} {'chunks':>7} {'docs/min':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'peak MB':>8} {'API calls':>10} {'tokens':>9}")
+    rows = []
+    for pages in args.pages:
+        # A fresh process per size, so peak RSS is not inherited from a larger run
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            row = pool.submit(run_size, pages, options).result()
+        rows.append(row)
+        print(f"{row['pages']:6d} {row['docs']:5d} {row['chunks']:7d} {row['docs_per_min']:9.2f} "
+              f"{row['query_p50_ms']:8.2f} {row['query_p95_ms']:8.2f} {row['peak_rss_mb'] or 0:8.1f} "
+              f"{row['api_calls']:10d} {row['tokens']:9d}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"options": options, "results": rows}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(rows, json.load(f)["results"], args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
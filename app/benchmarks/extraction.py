@@ -0,0 +1,101 @@
+"""
+Pages/sec of the PDF extraction engines, and how closely each one's output
+matches pdfplumber (the reference the section splitter was tuned on).
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.extraction transcripts/
+    python -m benchmarks.extraction call1.pdf call2.pdf --engines pdfplumber pdfium
+
+"line parity" is the share of pdfplumber lines reproduced exactly (same
+text, page and order); "section parity" compares the Metadata / Opening
+Remarks / Q&A split. Check both on a handful of real transcripts before
+switching PDF_EXTRACT_ENGINE.
+"""
+import argparse
+import difflib
+import os
+import time
+
+from scripts.extract_text import EXTRACTION_ENGINES, PdfPlumberEngine, _page_lines, open_engine
+from scripts.section_split import split_transcript_metadata_opening_qa
+
+REFERENCE_ENGINE = PdfPlumberEngine.name
+
+
+def pdf_paths(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(os.path.join(item, f) for f in os.listdir(item) if f.lower().endswith(".pdf")))
+        else:
+            paths.append(item)
+    return paths
+
+
+def extract(path, engine):
+    doc = open_engine(path, engine)
+    try:
+        start = time.perf_counter()
+        lines = []
+        for p_idx in range(len(doc)):
+            lines.extend(_page_lines(doc.page_text(p_idx), p_idx + 1))
+        elapsed = time.perf_counter() - start
+        return lines, len(doc), elapsed, getattr(doc, "fallback_pages", 0)
+    finally:
+        doc.close()
+
+
+def line_parity(lines, reference):
+    a = [(r["page"], r["text"]) for r in reference]
+    b = [(r["page"], r["text"]) for r in lines]
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks()) / max(len(a), 1)
+
+
+def section_parity(lines, reference):
+    def texts(rows):
+        return [[r["text"] for r in part] for part in split_transcript_metadata_opening_qa(rows)]
+    return texts(lines) == texts(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="PDF files and/or directories of PDFs")
+    parser.add_argument("--engines", nargs="+", default=list(EXTRACTION_ENGINES), choices=list(EXTRACTION_ENGINES))
+    args = parser.parse_args()
+
+    paths = pdf_paths(args.inputs)
+    engines = [REFERENCE_ENGINE] + [e for e in args.engines if e != REFERENCE_ENGINE]
+    totals = {e: {"pages": 0, "seconds": 0.0, "fallback": 0, "sections_ok": 0, "parity": []} for e in engines}
+
+    print(f"{'file':<32} {'engine':<11} {'pages':>6} {'pages/s':>9} {'fallback':>9} {'line parity':>12} {'sections':>9}")
+    for path in paths:
+        reference = None
+        for engine in engines:
+            lines, n_pages, seconds, fallback = extract(path, engine)
+            if reference is None:
+                reference = lines
+            parity = line_parity(lines, reference)
+            same_sections = section_parity(lines, reference)
+
+            t = totals[engine]
+            t["pages"] += n_pages
+            t["seconds"] += seconds
+            t["fallback"] += fallback
+            t["sections_ok"] += same_sections
+            t["parity"].append(parity)
+            print(f"{os.path.basename(path)[:32]:<32} {engine:<11} {n_pages:6d} {n_pages / max(seconds, 1e-9):9.1f} "
+                  f"{fallback:9d} {parity:12.3f} {'same' if same_sections else 'DIFF':>9}")
+
+    if len(paths) > 1:
+        print()
+        for engine, t in totals.items():
+            sections = f"{t['sections_ok']}/{len(paths)}"
+            print(f"{'total':<32} {engine:<11} {t['pages']:6d} {t['pages'] / max(t['seconds'], 1e-9):9.1f} "
+                  f"{t['fallback']:9d} {sum(t['parity']) / len(t['parity']):12.3f} "
+                  f"{sections:>9}")
+
+
+if __name__ == "__main__":
+    main()
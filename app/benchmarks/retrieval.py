@@ -0,0 +1,154 @@
+"""
+Offline relevance of vector, BM25 and hybrid (reciprocal rank fusion)
+retrieval, to tune RRF_K and LEXICAL_WEIGHT in scripts.rag_query.
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.retrieval
+    python -m benchmarks.retrieval --cache-entry .cache/transcripts/<key>
+
+Each query targets one chunk. Its vector is the chunk's embedding plus
+noise, standing in for the embedding of a paraphrased question, so no API
+calls are needed. "Specific" queries (--specific-share) use the chunk's most
+distinctive terms as text, like "EBITDA margin 23.4"; the others use only
+its most common terms, where lexical matching has little to go on.
+Synthetic chunks share topic vocabulary and embeddings within a topic, the
+case where cosine search finds the right topic but not the right chunk.
+
+"hybrid" rows are plain fusion; "hybrid+lex" rows are what query_index does
+in hybrid mode (lexical-only answer when BM25 is confident, fusion otherwise).
+"""
+import argparse
+import json
+import os
+import random
+
+import faiss
+import numpy as np
+
+from scripts.lexical_index import BM25Index, tokenize
+from scripts.rag_query import fuse_rankings
+
+TOPICS = {
+    "revenue": "revenue growth quarter sales volume pricing demand domestic exports",
+    "margins": "ebitda margin gross operating costs raw material inflation efficiency",
+    "capex": "capex capacity expansion plant commissioning investment brownfield greenfield",
+    "debt": "debt leverage net cash borrowing interest refinancing liquidity balance sheet",
+    "guidance": "guidance outlook full year target visibility order book pipeline",
+    "dividend": "dividend payout buyback shareholders capital allocation return",
+}
+PRODUCTS = ["Zentra", "Orbix", "Kelvo", "Tiramax", "Novapak", "Quillon", "Vespra", "Duraflex"]
+
+
+def synthetic_corpus(n_chunks, dim, seed=0):
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+    names = list(TOPICS)
+    centres = nrng.standard_normal((len(names), dim)).astype("float32")
+    chunks, vectors = [], []
+    for i in range(n_chunks):
+        t = rng.randrange(len(names))
+        words = TOPICS[names[t]].split()
+        figure = f"{rng.randint(1, 99)}.{rng.randint(0, 9)}"
+        text = (f"{' '.join(rng.choices(words, k=12))} {rng.choice(PRODUCTS)} {figure} percent "
+                f"{' '.join(rng.choices(words, k=8))} {rng.randint(100, 9999)} crores")
+        chunks.append({"chunk_id": i, "text": text})
+        vectors.append(centres[t] + 0.3 * nrng.standard_normal(dim).astype("float32"))
+    vectors = np.asarray(vectors, dtype="float32")
+    faiss.normalize_L2(vectors)
+    return chunks, vectors
+
+
+def make_queries(chunks, vectors, lexical, n_queries, noise, specific_share, seed=1):
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+    queries = []
+    for row in rng.sample(range(len(chunks)), min(n_queries, len(chunks))):
+        terms = list(dict.fromkeys(tokenize(chunks[row]["text"])))
+        if not terms:
+            continue
+        terms.sort(key=lambda t: (any(ch.isdigit() for ch in t), lexical.idf(t)), reverse=True)
+        if rng.random() < specific_share:
+            # Two most distinctive terms plus a random one
+            text = " ".join(terms[:2] + [rng.choice(terms)])
+        else:
+            text = " ".join(terms[-3:])
+        vec = vectors[row] + noise * nrng.standard_normal(vectors.shape[1]).astype("float32")
+        queries.append((text, vec.astype("float32"), row))
+    return queries
+
+
+def evaluate(rank_fn, queries, k):
+    mrr = recall = 0.0
+    for text, vec, target in queries:
+        rows = [row for row, _ in rank_fn(text, vec)][:k]
+        if target in rows:
+            recall += 1
+            mrr += 1.0 / (rows.index(target) + 1)
+    return mrr / len(queries), recall / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cache-entry", help="transcript cache dir with chunks.json and embeddings.npy")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--noise", type=float, default=0.08, help="query vector noise (paraphrase distance)")
+    parser.add_argument("--specific-share", type=float, default=0.5)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rrf-k", type=int, nargs="+", default=[10, 30, 60, 100])
+    parser.add_argument("--lexical-weight", type=float, nargs="+", default=[0.5, 1.0, 2.0])
+    args = parser.parse_args()
+
+    if args.cache_entry:
+        with open(os.path.join(args.cache_entry, "chunks.json"), encoding="utf-8") as f:
+            chunks = json.load(f)
+        vectors = np.array(np.load(os.path.join(args.cache_entry, "embeddings.npy")), dtype="float32")
+        faiss.normalize_L2(vectors)
+    else:
+        chunks, vectors = synthetic_corpus(args.chunks, args.dim)
+
+    lexical = BM25Index.build([c["text"] for c in chunks])
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    queries = make_queries(chunks, vectors, lexical, args.queries, args.noise, args.specific_share)
+    candidates = max(args.k * 4, 20)
+
+    def vector_rank(text, vec):
+        q = vec[None, :].copy()
+        faiss.normalize_L2(q)
+        D, I = index.search(q, candidates)
+        return [(int(i), float(d)) for i, d in zip(I[0], D[0]) if i >= 0]
+
+    def lexical_rank(text, vec):
+        return lexical.search(text, candidates)
+
+    print(f"{len(chunks)} chunks, {len(queries)} queries, k={args.k}")
+    print(f"{'mode':<10} {'rrf_k':>6} {'lex w':>6} {'MRR':>7} {'recall@k':>9}")
+    for name, fn in (("vector", vector_rank), ("lexical", lexical_rank)):
+        mrr, recall = evaluate(fn, queries, args.k)
+        print(f"{name:<10} {'':>6} {'':>6} {mrr:7.3f} {recall:9.3f}")
+    for rrf_k in args.rrf_k:
+        for weight in args.lexical_weight:
+            def hybrid_rank(text, vec):
+                return fuse_rankings([vector_rank(text, vec), lexical_rank(text, vec)], [1.0, weight], rrf_k)
+            def policy_rank(text, vec):
+                hits = lexical_rank(text, vec)
+                return hits if lexical.is_confident(text, hits) else hybrid_rank(text, vec)
+            for name, fn in (("hybrid", hybrid_rank), ("hybrid+lex", policy_rank)):
+                mrr, recall = evaluate(fn, queries, args.k)
+                print(f"{name:<10} {rrf_k:6d} {weight:6.1f} {mrr:7.3f} {recall:9.3f}")
+
+    # How often hybrid mode would skip the embedding call, and how often that is right
+    shortcuts = correct = 0
+    for text, _, target in queries:
+        hits = lexical.search(text, candidates)
+        if lexical.is_confident(text, hits):
+            shortcuts += 1
+            correct += hits[0][0] == target
+    print(f"lexical shortcut: {shortcuts}/{len(queries)} queries, top hit correct in {correct}")
+
+
+if __name__ == "__main__":
+    main()
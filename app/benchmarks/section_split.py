@@ -0,0 +1,120 @@
+"""
+Speed of the batched section splitter against the original line-by-line
+matcher (kept here as the reference; tests/test_section_split.py checks that
+both produce the same split).
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.section_split --lines 5000
+"""
+import argparse
+import random
+import time
+
+from rapidfuzz import fuzz
+
+from scripts.section_split import (
+    METADATA, OPENING_PHRASES, OPENING_REMARKS, QA, QA_CUES, SPEAKER_REGEX, split_transcript_metadata_opening_qa,
+)
+
+FILLER = [
+    "Revenue for the quarter grew 12% year over year, driven by volume.",
+    "Our EBITDA margin expanded by 150 basis points.",
+    "Thank you, operator.",
+    "We remain confident in our guidance for the full year.",
+    "Page 3 of 18",
+    "Q3 FY2024 Earnings Conference Call",
+    "Capital expenditure for the year is expected to be around 400 crores.",
+    "Good question, let me take that.",
+    "The question is on working capital.",
+]
+SPEAKERS = ["Moderator", "Operator", "Conference Coordinator", "Rahul Mehta", "CFO", "Ankit Shah"]
+
+
+def legacy_split(lines):
+    """The per-line partial_ratio splitter the batched version replaces."""
+    parts = {METADATA: [], OPENING_REMARKS: [], QA: []}
+    first_opening_found = False
+    qa_found = False
+    for line in lines:
+        text = line["text"].strip()
+        if not first_opening_found:
+            speaker_match = SPEAKER_REGEX.match(text)
+            if speaker_match:
+                speaker_name = speaker_match.group(1).lower()
+                if any(role in speaker_name for role in ["moderator", "coordinator"]):
+                    first_opening_found = True
+            if not first_opening_found:
+                lowered = text.lower()
+                if any(fuzz.partial_ratio(lowered, phrase) > 85 for phrase in OPENING_PHRASES):
+                    first_opening_found = True
+                else:
+                    parts[METADATA].append(line)
+                    continue
+        if not qa_found:
+            lowered = line["text"].lower()
+            if any(fuzz.partial_ratio(lowered, cue) > 85 for cue in QA_CUES):
+                qa_found = True
+        parts[QA if qa_found else OPENING_REMARKS].append(line)
+    return parts[METADATA], parts[OPENING_REMARKS], parts[QA]
+
+
+def _typo(rng, text):
+    chars = list(text)
+    for _ in range(rng.randint(1, 4)):
+        i = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.33:
+            chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz ")
+        elif op < 0.66:
+            del chars[i]
+        else:
+            chars.insert(i, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+        if not chars:
+            break
+    return "".join(chars)
+
+
+def synthetic_lines(n, rng, cue_rate=0.01):
+    lines = []
+    for i in range(n):
+        r = rng.random()
+        if r < cue_rate:
+            text = rng.choice(OPENING_PHRASES + QA_CUES)
+            text = _typo(rng, text) if rng.random() < 0.6 else text
+            text = f"{rng.choice(FILLER)[:rng.randint(0, 30)]} {text.capitalize()} {rng.choice(FILLER)[:20]}"
+        elif r < 0.2:
+            text = f"{rng.choice(SPEAKERS)}: {rng.choice(FILLER)}"
+        else:
+            text = rng.choice(FILLER)
+        if rng.random() < 0.05:
+            text = f"  {text}  "
+        lines.append({"text": text, "page": i // 40 + 1, "line": i % 40 + 1})
+    return lines
+
+
+def _timed(fn, lines):
+    start = time.perf_counter()
+    out = fn(lines)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    # Speed: a long transcript whose Q&A starts late (worst case for matching)
+    lines = synthetic_lines(args.lines, rng, cue_rate=0.0)
+    lines[args.lines // 10]["text"] = "Moderator: Ladies and gentlemen, welcome to the call."
+    lines[int(args.lines * 0.9)]["text"] = "We will now begin the Q&A session."
+    _, legacy_s = _timed(legacy_split, lines)
+    _, batched_s = _timed(split_transcript_metadata_opening_qa, lines)
+    print(f"{args.lines} lines: legacy {legacy_s * 1000:.1f} ms, batched {batched_s * 1000:.1f} ms "
+          f"({legacy_s / max(batched_s, 1e-9):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Synthetic earnings call transcripts as PDF bytes, for benchmarks that need
+whole documents (no PDF library needed to write them).
+"""
+import random
+import textwrap
+
+LINES_PER_PAGE = 55
+LINE_WIDTH = 95
+
+COMPANIES = ["Acme Industries Ltd", "Northwind Holdings", "Zentra Materials", "Orbix Technologies"]
+MANAGEMENT = [("John Smith", "Chief Executive Officer"), ("Mary Major", "Chief Financial Officer"),
+              ("Ravi Kumar", "Head of Investor Relations")]
+ANALYSTS = ["Bob Analyst", "Priya Shah", "Tom Becker", "Ana Lima", "Kenji Sato"]
+PRODUCTS = ["Zentra", "Orbix", "Kelvo", "Tiramax", "Novapak", "Quillon"]
+SENTENCES = [
+    "Revenue grew {n}% year on year, driven by volume growth in {p} and better pricing.",
+    "EBITDA margin came in at {n}.{m}%, helped by lower raw material costs and operating efficiencies.",
+    "We commissioned the new {p} line this quarter and capex for the year stays at {n}0 crores.",
+    "Net debt reduced by {n} crores and our liquidity position remains comfortable.",
+    "Demand in exports was soft, but domestic orders for {p} remained strong.",
+    "The board has declared an interim dividend of {n} rupees per share.",
+    "We expect full year growth in the range of {n} to {m}{n} percent with a healthy order book.",
+    "Working capital days improved to {n}{m} on better collections.",
+]
+QUESTIONS = [
+    "Could you elaborate on the margin outlook for {p} given raw material inflation?",
+    "What is the capex plan for next year, and how much of it is for {p}?",
+    "How should we think about export demand in the second half?",
+    "Can you share the order book position and the visibility it gives?",
+    "What drove the improvement in working capital this quarter?",
+]
+
+
+def _paragraph(rng, sentences, k):
+    text = " ".join(rng.choice(sentences).format(n=rng.randint(2, 9), m=rng.randint(0, 9), p=rng.choice(PRODUCTS))
+                    for _ in range(k))
+    return textwrap.wrap(text, LINE_WIDTH)
+
+
+def transcript_lines(n_pages, seed=0):
+    """Lines of a transcript long enough to fill ``n_pages`` pages."""
+    rng = random.Random(seed)
+    company = rng.choice(COMPANIES)
+    lines = [f"{company} Q{rng.randint(1, 4)} FY{rng.randint(22, 26)} Earnings Conference Call",
+             f"October {rng.randint(1, 28)}, 2024",
+             "Management:"]
+    lines += [f"{name} - {role}" for name, role in MANAGEMENT]
+    lines.append("")
+    lines += textwrap.wrap("Moderator: Ladies and gentlemen, good day and welcome to the earnings conference call. "
+                           "I now hand the conference over to the management.", LINE_WIDTH)
+    target = n_pages * LINES_PER_PAGE
+    # Roughly a quarter of the call is opening remarks, the rest Q&A
+    while len(lines) < target // 4:
+        name, _ = rng.choice(MANAGEMENT)
+        lines += _paragraph(rng, [f"{name}: " + SENTENCES[0]], 1) + _paragraph(rng, SENTENCES, rng.randint(4, 12))
+    lines += textwrap.wrap("Moderator: Thank you. We will now begin the question-and-answer session. "
+                           f"The first question is from the line of {ANALYSTS[0]}.", LINE_WIDTH)
+    while len(lines) < target:
+        analyst = rng.choice(ANALYSTS)
+        name, _ = rng.choice(MANAGEMENT)
+        lines += _paragraph(rng, [f"{analyst}: " + q for q in QUESTIONS], 1)
+        lines += _paragraph(rng, [f"{name}: " + SENTENCES[rng.randrange(len(SENTENCES))]], 1)
+        lines += _paragraph(rng, SENTENCES, rng.randint(2, 8))
+    return lines[:target]
+
+
+def make_pdf(pages):
+    """Minimal PDF with one Helvetica text line per entry of each page's line list."""
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: ("<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{p} 0 R" for p in page_ids), len(pages))).encode(),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for pid, lines in zip(page_ids, pages):
+        ops = ["BT", "/F1 10 Tf", "13 TL", "40 760 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects[pid] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                        f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pid + 1} 0 R >>").encode()
+        objects[pid + 1] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+
+    buf = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for oid in sorted(objects):
+        offsets[oid] = len(buf)
+        buf += b"%d 0 obj\n" % oid + objects[oid] + b"\nendobj\n"
+    xref = len(buf)
+    size = max(objects) + 1
+    buf += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for oid in range(1, size):
+        buf += b"%010d 00000 n \n" % offsets[oid]
+    buf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    return bytes(buf)
+
+
+def synthetic_transcript(n_pages, seed=0):
+    """PDF bytes of an ``n_pages`` page synthetic earnings call transcript."""
+    lines = transcript_lines(n_pages, seed)
+    return make_pdf([lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)])
@@ -0,0 +1,72 @@
+"""
+Memory per 1k chunks and recall loss of truncated / quantized vector storage.
+
+Run from the ``app`` directory:
+
+    python -m benchmarks.vector_storage --vectors 5000
+    python -m benchmarks.vector_storage --embeddings .cache/transcripts/<key>/embeddings.npy
+
+Recall@k is measured against exact float32 search on the full vectors;
+"+rerank" rows re-score candidates from a memory-mapped copy of the full
+vectors, which costs disk reads instead of RAM.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.ann_index import recall_at_k, synthetic_vectors
+from scripts.vector_store import CompactIndex, VECTOR_CODECS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=5_000)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--embeddings", help=".npy file of real embeddings to use instead of synthetic ones")
+    parser.add_argument("--dims", type=int, nargs="+", default=[3072, 1024, 512, 256])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        vectors = np.array(np.load(args.embeddings), dtype="float32")
+        faiss.normalize_L2(vectors)
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype("float32")
+    faiss.normalize_L2(queries)
+
+    n, full_dim = vectors.shape
+    exact = faiss.IndexFlatIP(full_dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full_path = os.path.join(tmp, "embeddings.npy")
+        np.save(full_path, vectors)
+
+        print(f"{n} vectors x {full_dim} dims, {len(queries)} queries, k={args.k}")
+        print(f"{'codec':<8} {'dim':>5} {'rerank':>7} {'KB/1k chunks':>13} {'ms/query':>9} {'recall@k':>9}")
+        for dim in [d for d in args.dims if d <= full_dim]:
+            for codec in VECTOR_CODECS:
+                for rerank in (False, True):
+                    if rerank and codec == "float32" and dim == full_dim:
+                        continue
+                    index = CompactIndex.build(vectors, dim=dim, codec=codec,
+                                               rerank_path=full_path if rerank else None)
+                    start = time.perf_counter()
+                    _, ids = index.search(queries, args.k)
+                    ms = (time.perf_counter() - start) * 1000 / len(queries)
+                    kb_per_1k = index.nbytes() / n * 1000 / 1024
+                    print(f"{codec:<8} {dim:>5} {'yes' if rerank else 'no':>7} {kb_per_1k:13.0f} "
+                          f"{ms:9.3f} {recall_at_k(ids, truth):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
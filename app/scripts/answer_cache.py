@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from scripts.cache_utils import CACHE_DIR
+from scripts.embedding_cache import get_query_embedding_cache, normalize_query, period_tokens
+from scripts.rag_query import UNAVAILABLE_ANSWER
+
+# Cosine similarity above which two questions on one document share an answer
+ANSWER_SIMILARITY_THRESHOLD = 0.95
+ANSWER_TTL_SECONDS = 7 * 24 * 3600
+
+
+def answer_scope(doc_id: str, *settings) -> str:
+    """
+    Cache scope of an answer: the document hash plus whatever changes the
+    answer for it (pool, chat model, retrieval mode, top_k, ...).
+    """
+    return ":".join([doc_id] + [str(s) for s in settings])
+
+
+def cached_question_vector(question: str, model: str = "text-embedding-3-large") -> Optional[np.ndarray]:
+    """
+    Unit-length question vector that retrieval already put in the query
+    embedding cache, or None when retrieval did not embed the question (e.g.
+    the BM25 shortcut answered). Never calls the embedding API.
+    """
+    vector = get_query_embedding_cache().get(model, question)
+    if vector is None:
+        return None
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+class AnswerCache:
+    """
+    Generated answers shared by every session in the process, backed by a
+    sqlite file so other processes and restarts see them too.
+
+    get() returns the stored payload for a repeat of a question on the same
+    scope (same normalized text), or, given the question's vector, for the
+    most similar earlier question with cosine similarity >= ``threshold``
+    that mentions the same figures and periods (see period_tokens).
+    Entries expire ``ttl_seconds`` after they were stored; at most
+    ``max_entries`` stay in memory and ``max_disk_entries`` on disk, least
+    recently used first out.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = ANSWER_SIMILARITY_THRESHOLD,
+                 ttl_seconds: float = ANSWER_TTL_SECONDS, max_entries: int = 5_000,
+                 max_disk_entries: int = 100_000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        # key -> (scope, vector, payload, created, normalized question)
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()
+        self._loaded_scopes = set()
+        self._lock = threading.RLock()
+        self._puts = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, scope TEXT, question TEXT, vector BLOB, payload TEXT, "
+                "created REAL, last_used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS answers_scope ON answers (scope)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(scope: str, question: str) -> str:
+        return hashlib.sha256(f"{scope}::{normalize_query(question)}".encode("utf-8")).hexdigest()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "near_hits": self.near_hits, "misses": self.misses, "entries": len(self._mem)}
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def _remember(self, key, entry):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            _, (scope, *_) = self._mem.popitem(last=False)
+            # The scope is no longer fully in memory: reload it from disk next time
+            self._loaded_scopes.discard(scope)
+
+    def _load_scope(self, scope):
+        # Bring a scope's unexpired disk entries into memory for similarity search
+        if self._db is None or scope in self._loaded_scopes:
+            return
+        rows = self._db.execute(
+            "SELECT key, vector, payload, created, question FROM answers WHERE scope = ? ORDER BY last_used", (scope,)
+        ).fetchall()
+        for key, vector, payload, created, question in rows:
+            if key not in self._mem and not self._expired(created):
+                self._remember(key, (scope, np.frombuffer(vector, dtype="float32"), json.loads(payload), created,
+                                     question))
+        self._loaded_scopes.add(scope)
+
+    def _touch(self, key):
+        self._mem.move_to_end(key)
+        if self._db is not None:
+            self._db.execute("UPDATE answers SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+    def _drop(self, key):
+        self._mem.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+            self._db.commit()
+
+    def get(self, scope: str, question: str, vector: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        key = self.make_key(scope, question)
+        with self._lock:
+            self._load_scope(scope)
+            entry = self._mem.get(key)
+            if entry is None and self._db is not None:
+                # Possibly stored by another process since the scope was loaded
+                row = self._db.execute(
+                    "SELECT vector, payload, created, question FROM answers WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (scope, np.frombuffer(row[0], dtype="float32"), json.loads(row[1]), row[2], row[3])
+                    self._remember(key, entry)
+            if entry is not None:
+                if not self._expired(entry[3]):
+                    self._touch(key)
+                    self.hits += 1
+                    return entry[2]
+                self._drop(key)
+
+            if vector is not None:
+                vector = np.asarray(vector, dtype="float32")
+                # Figures, quarters and years must match: "revenue in Q2 2024" never gets the Q1 2024 answer
+                wanted = period_tokens(normalize_query(question))
+                candidates = [(k, e) for k, e in self._mem.items()
+                              if e[0] == scope and e[1].shape == vector.shape and not self._expired(e[3])
+                              and period_tokens(e[4]) == wanted]
+                if candidates:
+                    similarities = np.stack([e[1] for _, e in candidates]) @ vector
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.threshold:
+                        self._touch(candidates[best][0])
+                        self.near_hits += 1
+                        return candidates[best][1][2]
+
+            self.misses += 1
+            return None
+
+    def put(self, scope: str, question: str, vector: Optional[np.ndarray], payload: Dict[str, Any]) -> None:
+        """
+        Store a JSON-serializable generate_answer result (plus anything else
+        the caller needs, e.g. "retrieved"). Failed generations and streams
+        that did not complete are not stored. Without a ``vector`` the answer
+        is only served to exact repeats of the question.
+        """
+        if payload.get("answer") == UNAVAILABLE_ANSWER or payload.get("complete") is False:
+            return
+        key = self.make_key(scope, question)
+        vector = np.asarray(vector if vector is not None else (), dtype="float32").copy()
+        now = time.time()
+        with self._lock:
+            self._remember(key, (scope, vector, payload, now, normalize_query(question)))
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers (key, scope, question, vector, payload, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, scope, normalize_query(question), vector.tobytes(), json.dumps(payload, default=str), now, now),
+            )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                # Keep the on-disk store bounded: drop expired, then least recently used rows
+                if self.ttl_seconds is not None:
+                    self._db.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl_seconds,))
+                self._db.execute(
+                    "DELETE FROM answers WHERE key IN ("
+                    "SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+            self._db.commit()
+
+
+_default_cache: Optional[AnswerCache] = None
+_default_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Process-wide answer cache, persisted next to the transcript cache."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            path = os.getenv("ANSWER_CACHE", os.path.join(CACHE_DIR, "answers.sqlite"))
+            threshold = os.getenv("ANSWER_SIMILARITY_THRESHOLD")
+            ttl = os.getenv("ANSWER_CACHE_TTL_SECONDS")
+            _default_cache = AnswerCache(
+                path=path,
+                threshold=float(threshold) if threshold else ANSWER_SIMILARITY_THRESHOLD,
+                ttl_seconds=float(ttl) if ttl else ANSWER_TTL_SECONDS,
+            )
+        return _default_cache
@@ -0,0 +1,222 @@
+"""
+Async variant of the pipeline and query path, for AsyncAzureOpenAI clients.
+
+Embeddings and chat completions are awaited on the event loop, so many
+uploads and questions overlap their network waits in one thread; CPU work
+(PDF extraction, chunking, FAISS) runs in worker threads. Clients default to
+scripts.clients.get_async_clients: one pooled HTTP client per event loop,
+with the connection limit, keep-alive and timeouts from the environment.
+
+    data = await process_transcript_async(pdf_file)
+    pool = data["pools"]["chat"]
+    retrieved = await aquery_index(question, pool["index"], pool["chunks"], data["embedding_client"],
+                                   mode="hybrid", lexical=pool["lexical"])
+    answer = await agenerate_answer(question, retrieved, data["chat_client"])
+
+Results and cache entries are the same as scripts.pipeline.process_transcript's.
+"""
+import asyncio
+from contextlib import nullcontext
+from typing import List, Optional, Union
+
+import faiss
+import numpy as np
+
+from scripts.cache_utils import CACHE_DIR
+from scripts.embedding_cache import get_query_embedding_cache
+from scripts.embedding_faiss import (
+    MAX_BATCH_ITEMS, MAX_BATCH_TOKENS, MAX_CONCURRENCY, MAX_RETRIES, make_token_batches, response_embeddings,
+    retry_delay,
+)
+from scripts.metadata_extraction import FIELD_QUERIES, metadata_request, parse_metadata
+from scripts.metrics import Metrics, record
+from scripts.pipeline import (
+    SECTION_NAMES, assign_roles, build_stages, cached_result, prepare_clients, prepare_run, processed_result,
+)
+from scripts.rag_query import (
+    LEXICAL_WEIGHT, NO_CONTEXT_ANSWER, RRF_K, UNAVAILABLE_ANSWER, answer_request, finish_retrieval, format_answer,
+    plan_retrieval,
+)
+from scripts.stage_graph import run_stage_graph_async
+from scripts.topics_summaries import TOPICS_WINDOW_TOKENS, topics_requests
+
+
+# --------------------------
+# Embeddings and completions
+# --------------------------
+async def aembed_text(texts, client, model="text-embedding-3-large",
+                      max_batch_tokens=MAX_BATCH_TOKENS, max_batch_items=MAX_BATCH_ITEMS,
+                      max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+    """
+    embed_text for async clients: the same token-sized batches, at most
+    ``max_concurrency`` in flight, 429s retried after their retry-after.
+    """
+    texts = list(texts)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def embed_batch(start, end):
+        attempt = 0
+        while True:
+            async with semaphore:
+                try:
+                    return response_embeddings(await client.embeddings.create(input=texts[start:end], model=model))
+                except Exception as e:
+                    delay = retry_delay(e, attempt, max_retries)
+                    if delay is None:
+                        raise
+            # Back off without holding a slot
+            record("retries")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    results = await asyncio.gather(*(embed_batch(s, e) for s, e in make_token_batches(texts, max_batch_tokens,
+                                                                                    max_batch_items)))
+    embeddings = [row for batch in results for row in batch]
+    return np.array(embeddings).astype("float32")
+
+
+async def _acomplete(client, model, request) -> Optional[str]:
+    if client is None:
+        return None
+    try:
+        resp = await client.chat.completions.create(model=model, **request)
+        content = (resp.choices[0].message.content or "").strip()
+        return content or None
+    except Exception:
+        return None
+
+
+# --------------------------
+# Topics and metadata
+# --------------------------
+async def agenerate_topics_and_summaries(lines: List[Union[str, dict]], model="gpt-4o", client=None,
+                                         window_tokens=TOPICS_WINDOW_TOKENS):
+    """generate_topics_and_summaries for async clients; the prompts of each map-reduce round are awaited together."""
+    steps = topics_requests(lines, window_tokens)
+    try:
+        requests = next(steps)
+        while True:
+            replies = await asyncio.gather(*(_acomplete(client, model, r) for r in requests))
+            requests = steps.send(list(replies))
+    except StopIteration as done:
+        return done.value
+
+
+async def aextract_document_metadata(lines, chunks, index, embedding_client, chat_client, chat_model="gpt-4o",
+                                     embedding_model="text-embedding-3-large"):
+    """extract_document_metadata for async clients; the field queries are embedded in one call."""
+    retrieved = await aretrieve_batch(list(FIELD_QUERIES.values()), index, chunks, embedding_client, top_k=8,
+                                      model=embedding_model)
+    content = await _acomplete(chat_client, chat_model, metadata_request(lines, retrieved))
+    return parse_metadata(content, lines)
+
+
+# --------------------------
+# Query path
+# --------------------------
+async def aretrieve_batch(questions, index, chunks, client, top_k=5, context_window=2,
+                          model="text-embedding-3-large", use_cache=True, mode="vector", lexical=None,
+                          rrf_k=RRF_K, lexical_weight=LEXICAL_WEIGHT):
+    """retrieve_batch for async clients."""
+    plan = plan_retrieval(questions, chunks, top_k, mode, lexical)
+    q_emb = None
+    if plan["need_vectors"]:
+        asked = [plan["questions"][i] for i in plan["need_vectors"]]
+        if use_cache:
+            q_emb = await get_query_embedding_cache().aembed(asked, client=client, model=model)
+        else:
+            q_emb = await aembed_text(asked, client=client, model=model)
+        faiss.normalize_L2(q_emb)
+    return finish_retrieval(plan, q_emb, index, chunks, top_k, context_window, mode, rrf_k, lexical_weight)
+
+
+async def aquery_index(question, index, chunks, client, top_k=5, context_window=2,
+                       model="text-embedding-3-large", use_cache=True, mode="vector", lexical=None,
+                       rrf_k=RRF_K, lexical_weight=LEXICAL_WEIGHT):
+    """query_index for async clients."""
+    results = await aretrieve_batch([question], index, chunks, client, top_k=top_k, context_window=context_window,
+                                    model=model, use_cache=use_cache, mode=mode, lexical=lexical,
+                                    rrf_k=rrf_k, lexical_weight=lexical_weight)
+    return results[0]
+
+
+async def agenerate_answer(question, retrieved_chunks, client, model="gpt-4o"):
+    """generate_answer for async clients."""
+    if not retrieved_chunks:
+        return format_answer(NO_CONTEXT_ANSWER, retrieved_chunks)
+    try:
+        resp = await client.chat.completions.create(model=model, **answer_request(question, retrieved_chunks))
+        return format_answer((resp.choices[0].message.content or "").strip(), retrieved_chunks)
+    except Exception:
+        return format_answer(UNAVAILABLE_ANSWER, retrieved_chunks)
+
+
+# --------------------------
+# Pipeline
+# --------------------------
+def _async_stages(pdf_file, chunk_size, overlap, clients, vector_opts, rerank_path, extract_workers, extract_engine,
+                  chunk_mode):
+    # The pipeline's stage graph, with the API-bound stages swapped for coroutines
+    stages = build_stages(pdf_file, chunk_size, overlap, clients, vector_opts, rerank_path, extract_workers,
+                          extract_engine, chunk_mode)
+    chat_client, embedding_client = clients["chat_client"], clients["embedding_client"]
+    chat_model, embedding_model = clients["chat_model"], clients["embedding_model"]
+
+    async def embed(r):
+        return await aembed_text([chunk["text"] for chunk in r["extract"]["chunks"]], client=embedding_client,
+                                 model=embedding_model)
+
+    async def metadata(r):
+        pool = r["pool:metadata"]
+        summary = await aextract_document_metadata(r["extract"]["lines"], pool["chunks"], pool["index"],
+                                                   embedding_client, chat_client, chat_model=chat_model,
+                                                   embedding_model=embedding_model)
+        assign_roles(r["extract"]["chunks"], summary)
+        return summary
+
+    def topics(section_name):
+        async def run(r):
+            return await agenerate_topics_and_summaries(r["extract"]["sections"][section_name], model=chat_model,
+                                                        client=chat_client)
+        return run
+
+    stages["embed"] = (stages["embed"][0], embed)
+    stages["metadata"] = (stages["metadata"][0], metadata)
+    for section_name in SECTION_NAMES:
+        name = f"topics:{section_name}"
+        stages[name] = (stages[name][0], topics(section_name))
+    return stages
+
+
+async def process_transcript_async(pdf_file, chunk_size=500, overlap=50, cache_dir=CACHE_DIR, use_cache=True,
+                                   corpus=None, vector_dim=None, vector_codec="float32", rerank=True, mmap=True,
+                                   resident=None, extract_workers=1, extract_engine=None, chunk_mode="speaker",
+                                   chat_client=None, embedding_client=None, chat_model=None, embedding_model=None):
+    """
+    process_transcript on the running event loop, with async clients. Takes
+    the same arguments and returns the same result, and shares its disk
+    cache. Per-stage CPU time in "metrics" is that of the event loop thread
+    for the async stages, so it includes other coroutines running meanwhile.
+    """
+    clients = prepare_clients(chat_client, embedding_client, chat_model, embedding_model, use_cache,
+                              asynchronous=True)
+    metrics = Metrics()
+
+    # Hashing the PDF and loading a cache entry are blocking reads
+    run = await asyncio.to_thread(prepare_run, pdf_file, chunk_size, overlap, cache_dir, use_cache, vector_dim,
+                                  vector_codec, rerank, extract_engine, chunk_mode, clients["chat_model"],
+                                  clients["embedding_model"])
+    async with resident.aloading(run["cache_key"]) if resident is not None else nullcontext():
+        if resident is not None:
+            hot = resident.get(run["cache_key"])
+            if hot is not None:
+                return hot
+
+        cached = await asyncio.to_thread(cached_result, run, rerank, mmap, corpus, resident, metrics, clients)
+        if cached is not None:
+            return cached
+
+        stages = _async_stages(pdf_file, chunk_size, overlap, clients, run["vector_opts"], run["rerank_path"],
+                               extract_workers, extract_engine, chunk_mode)
+        results, timings = await run_stage_graph_async(stages, metrics=metrics)
+        return await asyncio.to_thread(processed_result, run, results, timings, corpus, resident, metrics, clients)
@@ -0,0 +1,166 @@
+"""
+Answer a checklist of questions against one processed transcript.
+
+    python -m scripts.batch_qa transcript.pdf --questions checklist.txt --out answers.csv
+
+(run from the ``app`` directory; one question per line, defaults to the
+chat tab's suggested questions).
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from scripts.answer_cache import AnswerCache, answer_scope, cached_question_vector, get_answer_cache
+from scripts.embedding_cache import normalize_query
+from scripts.metrics import Metrics, propagate, stage
+from scripts.rag_query import generate_answer, retrieve_batch
+
+DEFAULT_QUESTIONS = [
+    "What were the main drivers of revenue and earnings growth this quarter?",
+    "Any comments on margins, operating costs, or profitability trends?",
+    "What are the key risks, challenges, or headwinds the company faces?",
+    "Any updates on capital allocation, dividends, or share repurchase plans?",
+    "How is the company managing cash flow and liquidity?",
+]
+MAX_ANSWER_WORKERS = 8
+
+
+def answer_questions(questions: List[str], data: Dict[str, Any], pool: str = "chat", top_k: int = 5,
+                     context_window: int = 2, mode: str = "hybrid",
+                     max_workers: int = MAX_ANSWER_WORKERS, metrics: Optional[Metrics] = None,
+                     answer_cache: Optional[AnswerCache] = None) -> List[Dict[str, Any]]:
+    """
+    Batch query_index + generate_answer over a process_transcript result.
+
+    Repeated questions (after normalization) are answered once. Retrieval
+    is one embedding call and one matrix search for all of them, then the
+    answers are generated concurrently on at most ``max_workers`` threads.
+    Rows come back in question order. ``metrics`` collects the "query" and
+    "answer" stages. With an ``answer_cache`` (see scripts.answer_cache),
+    questions answered before on this transcript, or close paraphrases of
+    them, are served from it and new answers are added to it.
+    """
+    unique = list(dict.fromkeys(normalize_query(q) for q in questions if (q or "").strip()))
+    first_asked = {}
+    for q in questions:
+        first_asked.setdefault(normalize_query(q), q.strip())
+    texts = [first_asked[key] for key in unique]
+    # The models process_transcript built the document with: queries must match the index
+    embedding_model, chat_model = data["embedding_model"], data["chat_model"]
+
+    answers = {}
+    if answer_cache is not None:
+        scope = answer_scope(data["doc_id"], pool, chat_model, mode, top_k, context_window)
+        with stage("answer_cache", metrics):
+            for key, text in zip(unique, texts):
+                hit = answer_cache.get(scope, text)
+                if hit is not None:
+                    answers[key] = dict(hit, seconds=0.0)
+    todo = [i for i, key in enumerate(unique) if key not in answers]
+
+    target = data["pools"][pool]
+    with stage("query", metrics):
+        retrieved = dict(zip(todo, retrieve_batch([texts[i] for i in todo], target["index"], target["chunks"],
+                                                  client=data["embedding_client"], top_k=top_k,
+                                                  context_window=context_window, mode=mode,
+                                                  lexical=target.get("lexical"), model=embedding_model)))
+
+    vectors = {}
+    if answer_cache is not None and todo:
+        with stage("answer_cache", metrics):
+            # Paraphrase check with the vectors retrieval just embedded (none where BM25 answered)
+            for i in todo:
+                vectors[i] = cached_question_vector(texts[i], model=embedding_model)
+                hit = answer_cache.get(scope, texts[i], vectors[i]) if vectors[i] is not None else None
+                if hit is not None:
+                    answers[unique[i]] = dict(hit, seconds=0.0)
+        todo = [i for i in todo if unique[i] not in answers]
+
+    def answer(i):
+        start = time.perf_counter()
+        ans = generate_answer(texts[i], retrieved[i], client=data["chat_client"], model=chat_model)
+        if answer_cache is not None:
+            answer_cache.put(scope, texts[i], vectors.get(i), dict(ans, retrieved=retrieved[i]))
+        ans["seconds"] = round(time.perf_counter() - start, 3)
+        return ans
+
+    if todo:
+        with stage("answer", metrics), ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(todo)))) as executor:
+            answers.update(zip((unique[i] for i in todo), executor.map(propagate(answer), todo)))
+
+    rows = []
+    for q in questions:
+        if not (q or "").strip():
+            continue
+        ans = answers[normalize_query(q)]
+        rows.append({
+            "question": q.strip(),
+            "answer": ans["answer"],
+            "confidence": None if ans.get("confidence") is None else round(float(ans["confidence"]), 4),
+            "bm25": None if ans.get("bm25") is None else round(float(ans["bm25"]), 4),
+            "sources": ans["sources"],
+            "seconds": ans["seconds"],
+        })
+    return rows
+
+
+def write_rows(rows: List[Dict[str, Any]], out, fmt: str = "json") -> None:
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=["question", "answer", "confidence", "bm25", "sources", "seconds"])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(row, sources="; ".join(row["sources"])))
+    else:
+        json.dump(rows, out, indent=2, ensure_ascii=False)
+        out.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", help="transcript PDF (served from the disk cache when already processed)")
+    parser.add_argument("--questions", help="text file with one question per line")
+    parser.add_argument("--out", help="output file; format from its extension (.csv or .json), default stdout")
+    parser.add_argument("--format", choices=["json", "csv"])
+    parser.add_argument("--mode", default="hybrid", choices=["vector", "lexical", "hybrid"])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=MAX_ANSWER_WORKERS)
+    parser.add_argument("--no-answer-cache", action="store_true",
+                        help="generate every answer instead of reusing ones the app or earlier runs stored")
+    args = parser.parse_args(argv)
+
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    else:
+        questions = DEFAULT_QUESTIONS
+
+    # Imported here: the pipeline module sets up the Azure clients
+    from scripts.pipeline import process_transcript
+
+    start = time.perf_counter()
+    with open(args.pdf, "rb") as f:
+        data = process_transcript(f)
+    processed = time.perf_counter()
+    metrics = Metrics()
+    rows = answer_questions(questions, data, top_k=args.top_k, mode=args.mode, max_workers=args.workers,
+                            metrics=metrics, answer_cache=None if args.no_answer_cache else get_answer_cache())
+    done = time.perf_counter()
+    totals = metrics.log("batch_qa", doc_id=data["doc_id"], questions=len(rows))["totals"]
+
+    fmt = args.format or ("csv" if (args.out or "").lower().endswith(".csv") else "json")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as out:
+            write_rows(rows, out, fmt)
+    else:
+        write_rows(rows, sys.stdout, fmt)
+    print(f"{len(rows)} questions: transcript {processed - start:.1f}s, answers {done - processed:.1f}s, "
+          f"{totals['api_calls']} API calls, {totals['tokens_in']} tokens in, {totals['tokens_out']} out",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,27 @@ from typing import Tuple, Any, Dict
 import numpy as np
 import faiss
 
+# Bump whenever extraction/splitting/chunking/prompt logic changes so that
+# previously cached artifacts are not reused for a different pipeline.
+PIPELINE_VERSION = "1"
+
+CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(".cache", "transcripts"))
+
 
 def compute_doc_id(file_bytes: bytes) -> str:
     return hashlib.sha256(file_bytes).hexdigest()[:32]
 
 
+def compute_cache_key(doc_id: str, config: Dict[str, Any]) -> str:
+    """
+    Cache key = document hash + hash of everything that shapes the artifacts
+    (pipeline version, chat/embedding models, chunking parameters).
+    """
+    payload = json.dumps({"pipeline_version": PIPELINE_VERSION, **config}, sort_keys=True)
+    config_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+    return f"{doc_id}_{config_hash}"
+
+
 def get_cache_dir(base_dir: str, doc_id: str) -> str:
     path = os.path.join(base_dir, doc_id)
     os.makedirs(path, exist_ok=True)
@@ -23,8 +39,11 @@ def path_in_cache(cache_dir: str, name: str) -> str:
 
 
 def save_json(path: str, data: Any) -> None:
-    with open(path, "w", encoding="utf-8") as f:
+    # Write to a temp file first so a crash never leaves a half-written artifact
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
 
 
 def load_json(path: str) -> Any:
@@ -33,26 +52,40 @@ def load_json(path: str) -> Any:
 
 
 def save_numpy(path: str, arr: np.ndarray) -> None:
-    np.save(path, arr)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp_path, path)
 
 
-def load_numpy(path: str) -> np.ndarray:
-    return np.load(path, allow_pickle=False)
+def load_numpy(path: str, mmap: bool = False) -> np.ndarray:
+    # mmap=True maps the file read-only: pages are only read (and kept) when touched
+    return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
 
 
 def save_faiss(path: str, index: faiss.Index) -> None:
-    faiss.write_index(index, path)
+    tmp_path = f"{path}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
 
 
-def load_faiss(path: str) -> faiss.Index:
-    return faiss.read_index(path)
+def load_faiss(path: str, mmap: bool = False) -> faiss.Index:
+    flags = 0
+    if mmap:
+        # IO_FLAG_MMAP maps inverted lists; newer faiss can also map flat codes (IO_FLAG_MMAP_IFC)
+        flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    return faiss.read_index(path, flags)
 
 
 def has_cached_artifacts(cache_dir: str) -> bool:
     required = [
+        path_in_cache(cache_dir, "lines.json"),
+        path_in_cache(cache_dir, "sections.json"),
         path_in_cache(cache_dir, "chunks.json"),
+        path_in_cache(cache_dir, "embeddings.npy"),
         path_in_cache(cache_dir, "faiss.index"),
         path_in_cache(cache_dir, "topics_summaries.json"),
-        path_in_cache(cache_dir, "sections.json"),
+        path_in_cache(cache_dir, "metadata.json"),
     ]
-    return all(os.path.exists(p) for p in required) 
\ No newline at end of file
+    return all(os.path.exists(p) for p in required)
+ 
\ No newline at end of file
@@ -1,7 +1,17 @@
 import re
+import sys
 import uuid
 
+import numpy as np
+
+from scripts.embedding_faiss import count_tokens
+from scripts.section_split import METADATA
+
 SPEAKER_REGEX = re.compile(r"^([A-Z][a-zA-Z\.]*(?:\s[A-Z][a-zA-Z\.]*)*):\s")
+MODERATOR_REGEX = re.compile("moderator", re.IGNORECASE)
+SENTENCE_END_REGEX = re.compile(r"(?<=[.!?])\s+")
+
+CHUNK_MODES = ("speaker", "tokens")
 
 def speaker_level_chunks(lines, section=None, start_chunk_id=0, global_state=None):
     """
@@ -122,3 +132,295 @@ def chunk_metadata(metadata_lines, chunk_size=500, overlap=50, start_chunk_id=0)
         start = end - overlap  # shift back for overlap
 
     return chunks, chunk_id
+
+
+def _line_offsets(parts, line_refs):
+    offsets = []
+    pos = 0
+    for part, (page, line_no) in zip(parts, line_refs):
+        offsets.append((pos, page, line_no))
+        pos += len(part) + 1
+    return offsets
+
+
+def _metadata_chunk(words, chunk_id):
+    return {
+        "chunk_id": f"Metadata_{chunk_id}",
+        "text": " ".join(words),
+        "section": "Metadata"
+    }
+
+
+def iter_transcript_chunks(section_lines, chunk_size=500, overlap=50, with_offsets=False):
+    """
+    Single pass over the (section, line) pairs of iter_section_lines that
+    yields each chunk as soon as it is complete: metadata word windows as
+    they fill up, speaker paragraphs when the next speaker (or section)
+    starts. Only the open paragraph and one metadata window are held.
+
+    Output is the same as chunk_metadata followed by speaker_level_chunks
+    per section with a fresh moderator/first-speaker state, including the
+    chunk_id sequence (which is not advanced after a section's last
+    paragraph).
+
+    ``with_offsets`` adds ``_lines``: (char offset in text, page, line) for
+    each line of a speaker paragraph, used to re-split it with provenance.
+    """
+    chunk_id = 0
+    words = []
+    section = None
+    moderator_found, first_speaker = False, None
+    current_speaker = None
+    current_para = []
+    current_lines = []
+    start_page = start_line = end_page = end_line = None
+
+    def close_paragraph():
+        if current_para and current_speaker not in (None, "Unknown"):
+            if not (not moderator_found and current_speaker == first_speaker):
+                chunk = {
+                    "chunk_id": f"{section}_{chunk_id}" if section else chunk_id,
+                    "speaker": current_speaker,
+                    "text": " ".join(current_para).strip(),
+                    "start_page": start_page,
+                    "end_page": end_page,
+                    "start_line": start_line,
+                    "end_line": end_line,
+                    "section": section
+                }
+                if with_offsets:
+                    chunk["_lines"] = _line_offsets(current_para, current_lines)
+                return chunk
+        return None
+
+    for line_section, line in section_lines:
+        if line_section == METADATA:
+            # Same windows as chunk_metadata: emit once more words follow
+            words.extend(line["text"].split())
+            while len(words) > chunk_size:
+                yield _metadata_chunk(words[:chunk_size], chunk_id)
+                chunk_id += 1
+                words = words[chunk_size - overlap:]
+            continue
+
+        if line_section != section:
+            if words:
+                yield _metadata_chunk(words, chunk_id)
+                chunk_id += 1
+                words = []
+            chunk = close_paragraph()
+            if chunk:
+                yield chunk
+            # Speaker state is per section
+            section = line_section
+            moderator_found, first_speaker = False, None
+            current_speaker = None
+            current_para = []
+            current_lines = []
+            start_page = start_line = end_page = end_line = None
+
+        text = line["text"].strip()
+        if MODERATOR_REGEX.search(text):
+            moderator_found = True
+            continue
+
+        match = SPEAKER_REGEX.match(text)
+        if match:
+            speaker = match.group(1).strip()
+            if first_speaker is None:
+                first_speaker = speaker
+
+            if current_para and current_speaker not in (None, "Unknown"):
+                chunk = close_paragraph()
+                if chunk:
+                    yield chunk
+                chunk_id += 1
+                current_para = []
+                current_lines = []
+
+            current_speaker = speaker
+            start_page, start_line = line["page"], line.get("line")
+            end_page, end_line = start_page, start_line
+            text_after = text[match.end():].strip()
+            if text_after:
+                current_para.append(text_after)
+                current_lines.append((start_page, start_line))
+
+        elif current_speaker not in (None, "Unknown"):
+            current_para.append(text)
+            current_lines.append((line["page"], line.get("line")))
+            end_page, end_line = line["page"], line.get("line")
+
+    if words:
+        yield _metadata_chunk(words, chunk_id)
+    chunk = close_paragraph()
+    if chunk:
+        yield chunk
+
+
+# --------------------------
+# Token mode
+# --------------------------
+def _sentence_spans(text):
+    start = 0
+    for match in SENTENCE_END_REGEX.finditer(text):
+        yield start, match.start()
+        start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+def _split_long_span(text, start, end, max_tokens):
+    # A single sentence over the limit: fall back to word boundaries
+    piece_start = start
+    tokens = 0
+    for match in re.finditer(r"\S+", text[start:end]):
+        word_tokens = count_tokens(" " + match.group())
+        if tokens and tokens + word_tokens > max_tokens:
+            yield piece_start, start + match.start(), tokens
+            piece_start, tokens = start + match.start(), 0
+        tokens += word_tokens
+    yield piece_start, end, tokens
+
+
+def _token_windows(text, max_tokens, overlap_tokens):
+    """
+    (start, end) character ranges of ``text`` holding whole sentences and at
+    most ~max_tokens tokens each; every window after the first repeats the
+    trailing sentences of the previous one, up to overlap_tokens.
+    """
+    spans = []
+    for start, end in _sentence_spans(text):
+        tokens = count_tokens(text[start:end])
+        if tokens > max_tokens:
+            spans.extend(_split_long_span(text, start, end, max_tokens))
+        else:
+            spans.append((start, end, tokens))
+
+    window = []
+    total = 0
+    for span in spans:
+        if window and total + span[2] > max_tokens:
+            yield window[0][0], window[-1][1]
+            # Carry trailing sentences over as overlap, keeping room for this one
+            carry = []
+            carried = 0
+            for prev in reversed(window):
+                if carried + prev[2] > overlap_tokens or carried + prev[2] + span[2] > max_tokens:
+                    break
+                carry.insert(0, prev)
+                carried += prev[2]
+            window, total = carry, carried
+        window.append(span)
+        total += span[2]
+    if window:
+        yield window[0][0], window[-1][1]
+
+
+def _span_provenance(offsets, start, end):
+    first = last = offsets[0]
+    for entry in offsets:
+        if entry[0] <= start:
+            first = entry
+        if entry[0] < end:
+            last = entry
+    return {"start_page": first[1], "start_line": first[2], "end_page": last[1], "end_line": last[2]}
+
+
+def _pack(turns, section):
+    # Several tiny turns in one chunk: keep who said what in the text
+    if len(turns) == 1:
+        chunk = dict(turns[0])
+    else:
+        per_speaker = {}
+        for turn in turns:
+            per_speaker[turn["speaker"]] = per_speaker.get(turn["speaker"], 0) + turn["tokens"]
+        chunk = {
+            "chunk_id": None,
+            "speaker": max(per_speaker, key=per_speaker.get),
+            "speakers": list(per_speaker),
+            "text": "\n".join(f"{t['speaker']}: {t['text']}" for t in turns),
+            "start_page": turns[0]["start_page"],
+            "end_page": turns[-1]["end_page"],
+            "start_line": turns[0]["start_line"],
+            "end_line": turns[-1]["end_line"],
+            "section": section,
+        }
+    chunk["tokens"] = count_tokens(chunk["text"])
+    return chunk
+
+
+def iter_token_chunks(section_lines, max_tokens=500, overlap_tokens=50, min_tokens=None):
+    """
+    Token-bounded variant of iter_transcript_chunks (tiktoken counts):
+
+    - speaker turns over ``max_tokens`` are split at sentence boundaries,
+      consecutive pieces sharing up to ``overlap_tokens`` of sentences;
+    - turns under ``min_tokens`` (default max_tokens // 10) are packed with
+      the following turns of the same section, up to ``max_tokens``;
+    - metadata is windowed by tokens instead of words.
+
+    Every chunk keeps its speaker and page/line span and gets a ``tokens``
+    count; chunk ids are renumbered sequentially.
+    """
+    min_tokens = max_tokens // 10 if min_tokens is None else min_tokens
+    chunk_id = 0
+    pending = []
+    pending_tokens = 0
+
+    def numbered(chunk):
+        nonlocal chunk_id
+        chunk["chunk_id"] = f"{chunk['section']}_{chunk_id}"
+        chunk_id += 1
+        return chunk
+
+    def flush():
+        nonlocal pending, pending_tokens
+        packed = [numbered(_pack(pending, pending[0]["section"]))] if pending else []
+        pending, pending_tokens = [], 0
+        return packed
+
+    # Metadata comes out as one chunk, split by tokens below
+    for turn in iter_transcript_chunks(section_lines, chunk_size=sys.maxsize, overlap=0, with_offsets=True):
+        offsets = turn.pop("_lines", None)
+        tokens = count_tokens(turn["text"])
+
+        if turn["section"] == METADATA or tokens > max_tokens:
+            yield from flush()
+            for start, end in _token_windows(turn["text"], max_tokens, overlap_tokens):
+                piece = dict(turn, text=turn["text"][start:end])
+                if offsets:
+                    piece.update(_span_provenance(offsets, start, end))
+                piece["tokens"] = count_tokens(piece["text"])
+                yield numbered(piece)
+            continue
+
+        turn["tokens"] = tokens
+        if pending and (pending[0]["section"] != turn["section"] or pending_tokens + tokens > max_tokens):
+            yield from flush()
+        if pending or tokens < min_tokens:
+            pending.append(turn)
+            pending_tokens += tokens
+            if pending_tokens >= min_tokens:
+                yield from flush()
+        else:
+            yield numbered(turn)
+
+    yield from flush()
+
+
+def token_stats(chunks):
+    """Token count distribution of chunk texts, for embedding cost and context sizing."""
+    counts = np.array([c["tokens"] if "tokens" in c else count_tokens(c["text"]) for c in chunks], dtype="int64")
+    if not len(counts):
+        return {"chunks": 0, "total": 0}
+    return {
+        "chunks": int(len(counts)),
+        "total": int(counts.sum()),
+        "mean": round(float(counts.mean()), 1),
+        "min": int(counts.min()),
+        "p50": int(np.percentile(counts, 50)),
+        "p90": int(np.percentile(counts, 90)),
+        "p99": int(np.percentile(counts, 99)),
+        "max": int(counts.max()),
+    }
@@ -0,0 +1,146 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# setting name -> (environment variable, default)
+SETTINGS = {
+    "api_key": ("AZURE_OPENAI_API_KEY", None),
+    "endpoint": ("AZURE_OPENAI_ENDPOINT", "https://agents-general.openai.azure.com"),
+    "chat_api_version": ("AZURE_OPENAI_CHAT_COMPLETION_VERSION", "2024-08-01-preview"),
+    "embeddings_api_version": ("AZURE_OPENAI_EMBEDDINGS_VERSION", "2023-05-15"),
+    "chat_model": ("AZURE_OPENAI_CHAT_DEPLOYMENT", "gpt-4o"),
+    "embedding_model": ("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-3-large"),
+    # Connection pool shared by the chat and embeddings clients
+    "max_connections": ("AZURE_OPENAI_MAX_CONNECTIONS", "32"),
+    "max_keepalive_connections": ("AZURE_OPENAI_MAX_KEEPALIVE", "16"),
+    "keepalive_seconds": ("AZURE_OPENAI_KEEPALIVE_SECONDS", "30"),
+    "timeout_seconds": ("AZURE_OPENAI_TIMEOUT_SECONDS", "60"),
+    "connect_timeout_seconds": ("AZURE_OPENAI_CONNECT_TIMEOUT_SECONDS", "10"),
+}
+
+
+def _streamlit_secrets():
+    # Only consulted when a setting is missing from the environment, so
+    # headless runs never import Streamlit
+    try:
+        import streamlit as st
+        return {key: st.secrets[key] for key in st.secrets}
+    except Exception:
+        return {}
+
+
+def load_settings() -> Dict[str, Any]:
+    """Azure OpenAI settings from the environment (.env), falling back to st.secrets."""
+    settings = {}
+    secrets = None
+    for name, (env_var, default) in SETTINGS.items():
+        value = os.getenv(env_var)
+        if not value:
+            if secrets is None:
+                secrets = _streamlit_secrets()
+            value = secrets.get(env_var, default)
+        settings[name] = value
+    return settings
+
+
+def _http_options(settings: Dict[str, Any]) -> Dict[str, Any]:
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(settings["max_connections"]),
+            max_keepalive_connections=int(settings["max_keepalive_connections"]),
+            keepalive_expiry=float(settings["keepalive_seconds"]),
+        ),
+        "timeout": httpx.Timeout(float(settings["timeout_seconds"]),
+                                 connect=float(settings["connect_timeout_seconds"])),
+    }
+
+
+def _client_kwargs(settings: Dict[str, Any], api_version_key: str, http_client) -> Dict[str, Any]:
+    return {
+        "api_key": settings["api_key"],
+        "api_version": settings[api_version_key],
+        "azure_endpoint": settings["endpoint"],
+        "http_client": http_client,
+    }
+
+
+def make_clients(settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Build the chat and embeddings clients. Returns the dict of keyword
+    arguments process_transcript takes: chat_client, embedding_client,
+    chat_model, embedding_model. Both clients share one pooled HTTP client
+    (AZURE_OPENAI_MAX_CONNECTIONS, ..._KEEPALIVE, ..._TIMEOUT_SECONDS).
+    """
+    import httpx
+    from openai import AzureOpenAI
+
+    settings = settings or load_settings()
+    if not settings["api_key"]:
+        raise RuntimeError("AZURE_OPENAI_API_KEY is not set in the environment.")
+    http_client = httpx.Client(**_http_options(settings))
+    return {
+        "chat_client": AzureOpenAI(**_client_kwargs(settings, "chat_api_version", http_client)),
+        "embedding_client": AzureOpenAI(**_client_kwargs(settings, "embeddings_api_version", http_client)),
+        "chat_model": settings["chat_model"],
+        "embedding_model": settings["embedding_model"],
+    }
+
+
+def make_async_clients(settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    AsyncAzureOpenAI counterpart of make_clients, for scripts.async_pipeline.
+    The shared httpx.AsyncClient belongs to the event loop it is first used
+    on; see get_async_clients.
+    """
+    import httpx
+    from openai import AsyncAzureOpenAI
+
+    settings = settings or load_settings()
+    if not settings["api_key"]:
+        raise RuntimeError("AZURE_OPENAI_API_KEY is not set in the environment.")
+    http_client = httpx.AsyncClient(**_http_options(settings))
+    return {
+        "chat_client": AsyncAzureOpenAI(**_client_kwargs(settings, "chat_api_version", http_client)),
+        "embedding_client": AsyncAzureOpenAI(**_client_kwargs(settings, "embeddings_api_version", http_client)),
+        "chat_model": settings["chat_model"],
+        "embedding_model": settings["embedding_model"],
+    }
+
+
+_default_clients: Optional[Dict[str, Any]] = None
+_default_lock = threading.Lock()
+
+
+def get_clients() -> Dict[str, Any]:
+    """Process-wide clients, built on first use."""
+    global _default_clients
+    with _default_lock:
+        if _default_clients is None:
+            _default_clients = make_clients()
+        return _default_clients
+
+
+_async_clients: Dict[Any, Dict[str, Any]] = {}
+
+
+def get_async_clients() -> Dict[str, Any]:
+    """
+    Async clients for the running event loop, built on first use. Every
+    coroutine on one loop shares a single connection pool.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    with _default_lock:
+        # Drop the clients of loops that have been closed
+        for old in [l for l in _async_clients if l.is_closed()]:
+            del _async_clients[old]
+        if loop not in _async_clients:
+            _async_clients[loop] = make_async_clients()
+        return _async_clients[loop]
@@ -0,0 +1,230 @@
+"""
+Content-addressed cache of chat completions, keyed by (model, messages,
+request parameters).
+
+Wrap a chat client with ``cache_completions(client)`` and every
+``chat.completions.create`` call whose exact request was answered before is
+served from the cache: topics, metadata and answers alike. Reprocessing a
+transcript after a config change (embedding model, chunking, ...) only pays
+for the prompts that actually changed. Hits and misses are counted against
+the active metrics stage as "cache_hits" / "cache_misses".
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from scripts.cache_utils import CACHE_DIR
+from scripts.metrics import record
+
+# Transport options that do not change the completion
+_IGNORED_PARAMS = ("stream", "stream_options", "timeout", "extra_headers")
+
+
+def completion_key(model: Optional[str] = None, messages=None, **params) -> str:
+    """sha256 of the model, the messages and every parameter that shapes the reply."""
+    params = {k: v for k, v in params.items() if k not in _IGNORED_PARAMS}
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Completion texts shared by every client in the process, backed by a
+    sqlite file so restarts and other processes reuse them. At most
+    ``max_entries`` stay in memory; on disk, least recently used entries are
+    evicted once the stored texts exceed ``max_disk_bytes``.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 2_000,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._mem: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # key -> {"content", "finish_reason"}
+        self._lock = threading.RLock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, last_used REAL)"
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._mem)}
+
+    def _remember(self, key, entry):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT response FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = json.loads(row[0])
+                    self._db.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key: str, model: str, content: str, finish_reason: Optional[str] = None) -> None:
+        entry = {"content": content, "finish_reason": finish_reason}
+        response = json.dumps(entry)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO completions (key, model, response, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, len(response), time.time()),
+            )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                # Keep the on-disk store under its byte budget, most recently used rows first
+                self._db.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS kept "
+                    "FROM completions) WHERE kept > ?)",
+                    (self.max_disk_bytes,),
+                )
+            self._db.commit()
+
+
+def _response(entry):
+    # Just the fields callers read from a ChatCompletion
+    message = SimpleNamespace(role="assistant", content=entry["content"])
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason=entry["finish_reason"])],
+                           usage=None, cached=True)
+
+
+def _stream(entry):
+    # A cached reply replayed as a one-chunk stream
+    delta = SimpleNamespace(role="assistant", content=entry["content"])
+    yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=entry["finish_reason"])],
+                          usage=None)
+
+
+def _first_choice(resp):
+    choices = getattr(resp, "choices", None) or []
+    if not choices:
+        return None, None
+    return getattr(choices[0].message, "content", None), getattr(choices[0], "finish_reason", None)
+
+
+class _CachedCompletions:
+    def __init__(self, create, cache, asynchronous):
+        self._create = create
+        self._cache = cache
+        self._asynchronous = asynchronous
+
+    def create(self, *args, **params):
+        if args or params.get("n", 1) != 1 or (self._asynchronous and params.get("stream")):
+            # Positional calls, several choices and async streams are not cached
+            return self._create(*args, **params)
+
+        model = params.get("model")
+        key = completion_key(**params)
+        entry = self._cache.get(key)
+        if entry is not None:
+            record("cache_hits")
+            if params.get("stream"):
+                return _stream(entry)
+            return self._hit(entry) if self._asynchronous else _response(entry)
+
+        record("cache_misses")
+        resp = self._create(**params)
+        if self._asynchronous:
+            return self._store_async(resp, key, model)
+        if params.get("stream"):
+            return self._store_stream(resp, key, model)
+        self._store(resp, key, model)
+        return resp
+
+    def _store(self, resp, key, model):
+        content, finish_reason = _first_choice(resp)
+        if content and content.strip():
+            self._cache.put(key, model, content, finish_reason)
+
+    async def _hit(self, entry):
+        return _response(entry)
+
+    async def _store_async(self, pending, key, model):
+        resp = await pending
+        self._store(resp, key, model)
+        return resp
+
+    def _store_stream(self, events, key, model):
+        # Stored only once the stream has been read to the end without errors
+        parts, finish_reason = [], None
+        for event in events:
+            for choice in getattr(event, "choices", None) or []:
+                delta = getattr(getattr(choice, "delta", None), "content", None)
+                if delta:
+                    parts.append(delta)
+                finish_reason = getattr(choice, "finish_reason", None) or finish_reason
+            yield event
+        text = "".join(parts)
+        if text.strip():
+            self._cache.put(key, model, text, finish_reason)
+
+
+class CachedChatClient:
+    """
+    Proxy for an OpenAI-style chat client that answers repeated
+    ``chat.completions.create`` requests from a CompletionCache. Empty or
+    failed completions are not stored. Everything else is passed through.
+    """
+
+    def __init__(self, client, cache: CompletionCache, asynchronous: bool = False):
+        self.wrapped = client
+        self.chat = SimpleNamespace(completions=_CachedCompletions(client.chat.completions.create, cache,
+                                                                   asynchronous))
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+
+def cache_completions(client, cache: Optional[CompletionCache] = None, asynchronous: bool = False):
+    """Wrap ``client`` (AsyncAzureOpenAI-style with ``asynchronous``) in the process-wide completion cache."""
+    if client is None or isinstance(client, CachedChatClient):
+        return client
+    return CachedChatClient(client, cache or get_completion_cache(), asynchronous=asynchronous)
+
+
+_default_cache: Optional[CompletionCache] = None
+_default_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """Process-wide completion cache, persisted next to the transcript cache."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            path = os.getenv("COMPLETION_CACHE", os.path.join(CACHE_DIR, "completions.sqlite"))
+            max_mb = os.getenv("COMPLETION_CACHE_MAX_MB")
+            _default_cache = CompletionCache(
+                path=path, max_disk_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else 256 * 1024 * 1024
+            )
+        return _default_cache
@@ -0,0 +1,290 @@
+import os
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import faiss
+
+from scripts.cache_utils import (
+    CACHE_DIR, path_in_cache, save_json, load_json, save_numpy, load_numpy, save_faiss, load_faiss
+)
+from scripts.embedding_cache import get_query_embedding_cache
+from scripts.embedding_faiss import _unwrap, make_index, select_index_mode, train_index
+from scripts.rag_query import merge_context_windows
+
+FilterValue = Union[str, Iterable[str], None]
+
+
+def _as_set(value: FilterValue):
+    if value is None:
+        return None
+    values = [value] if isinstance(value, str) else list(value)
+    return {str(v).strip().lower() for v in values}
+
+
+def _search_params(index, selector):
+    # IVF and HNSW indexes only accept their own parameter types, which also
+    # carry the nprobe / efSearch the index was tuned with
+    inner = _unwrap(index)
+    if isinstance(inner, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+class CorpusIndex:
+    """
+    One FAISS index over the chunks of every processed transcript.
+
+    Each document gets a contiguous block of int64 ids (``first_id`` ..
+    ``first_id + n_chunks - 1``) in an ``IndexIDMap2``, so adding a transcript
+    only appends its vectors and never touches the existing ones. Per-document
+    metadata (company, ticker, call_date) lives in ``corpus.json``, chunk
+    lists in ``chunks/<doc_id>.json`` (loaded lazily) and the normalized
+    vectors in ``vectors/<doc_id>.npy`` so the index can be rebuilt as an
+    ANN index (see ``rebuild``) once the corpus grows.
+
+    Adding a document only writes that document's files and the manifest;
+    ``corpus.index`` is rewritten by ``save()`` and ``rebuild()``. Documents
+    added after the last save are re-added from their vectors on load.
+    """
+
+    def __init__(self, corpus_dir: str = os.path.join(CACHE_DIR, "corpus")):
+        self.corpus_dir = corpus_dir
+        os.makedirs(os.path.join(corpus_dir, "chunks"), exist_ok=True)
+        os.makedirs(os.path.join(corpus_dir, "vectors"), exist_ok=True)
+        self._lock = threading.RLock()
+        self._chunks: Dict[str, List[dict]] = {}
+
+        manifest_path = path_in_cache(corpus_dir, "corpus.json")
+        index_path = path_in_cache(corpus_dir, "corpus.index")
+        self.index = None
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.next_id = 0
+        self.mode = "flat"
+        self._indexed_next_id = 0  # ids below this are in the saved index file
+        if os.path.exists(manifest_path):
+            manifest = load_json(manifest_path)
+            self.docs = manifest["docs"]
+            self.next_id = manifest["next_id"]
+            if os.path.exists(index_path):
+                self.index = load_faiss(index_path)
+                self.mode = manifest.get("mode", "flat")
+                self._indexed_next_id = manifest.get("indexed_next_id", self.next_id)
+        self._rebuild_id_table()
+        self._dirty = False
+        self._catch_up()
+
+    def _catch_up(self):
+        # Index the documents added since corpus.index was last written
+        for doc_id in self._doc_order:
+            info = self.docs[doc_id]
+            if info["first_id"] >= self._indexed_next_id:
+                self._add_vectors(self._load_vectors(doc_id), info["first_id"])
+                self._dirty = True
+
+    def _load_vectors(self, doc_id):
+        return load_numpy(path_in_cache(self.corpus_dir, os.path.join("vectors", f"{doc_id}.npy")))
+
+    def _add_vectors(self, vectors, first_id):
+        if self.index is None:
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+        ids = np.arange(first_id, first_id + len(vectors), dtype="int64")
+        self.index.add_with_ids(np.ascontiguousarray(vectors, dtype="float32"), ids)
+
+    def _rebuild_id_table(self):
+        ordered = sorted(self.docs.items(), key=lambda kv: kv[1]["first_id"])
+        self._first_ids = [d["first_id"] for _, d in ordered]
+        self._doc_order = [doc_id for doc_id, _ in ordered]
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.docs
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # --------------------------
+    # Ingest
+    # --------------------------
+    def add_document(self, doc_id: str, chunks: List[dict], embeddings: np.ndarray,
+                     metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Append one transcript; returns False if it is already in the corpus."""
+        with self._lock:
+            if doc_id in self.docs or not len(chunks):
+                return False
+
+            vectors = np.array(embeddings, dtype="float32")  # copy: normalized below
+            faiss.normalize_L2(vectors)
+            first_id = self.next_id
+            self._add_vectors(vectors, first_id)
+
+            metadata = metadata or {}
+            self.docs[doc_id] = {
+                "first_id": first_id,
+                "count": len(chunks),
+                "company": metadata.get("company"),
+                "ticker": metadata.get("ticker"),
+                "call_date": metadata.get("call_date"),
+            }
+            self.next_id = first_id + len(chunks)
+            self._chunks[doc_id] = chunks
+            self._rebuild_id_table()
+
+            save_json(path_in_cache(self.corpus_dir, os.path.join("chunks", f"{doc_id}.json")), chunks)
+            save_numpy(path_in_cache(self.corpus_dir, os.path.join("vectors", f"{doc_id}.npy")), vectors)
+            self._dirty = True
+            self._save_manifest()
+            return True
+
+    def _save_manifest(self):
+        save_json(path_in_cache(self.corpus_dir, "corpus.json"),
+                  {"docs": self.docs, "next_id": self.next_id, "mode": self.mode,
+                   "indexed_next_id": self._indexed_next_id})
+
+    def save(self) -> None:
+        """Write corpus.index if documents were added since it was last written."""
+        with self._lock:
+            if not self._dirty or self.index is None:
+                return
+            save_faiss(path_in_cache(self.corpus_dir, "corpus.index"), self.index)
+            self._indexed_next_id = self.next_id
+            self._save_manifest()
+            self._dirty = False
+
+    def rebuild(self, mode: str = "auto", **index_params) -> str:
+        """
+        Re-index every stored vector with the given index mode (see
+        embedding_faiss.make_index), keeping ids stable. Later documents are
+        added to the trained index incrementally. Returns the chosen mode.
+        """
+        with self._lock:
+            if not self.docs:
+                return self.mode
+            ordered = sorted(self.docs.items(), key=lambda kv: kv[1]["first_id"])
+            vectors = np.concatenate([self._load_vectors(doc_id) for doc_id, _ in ordered])
+            ids = np.concatenate([
+                np.arange(info["first_id"], info["first_id"] + info["count"], dtype="int64")
+                for _, info in ordered
+            ])
+
+            if mode == "auto":
+                mode = select_index_mode(len(vectors))
+            inner = make_index(vectors.shape[1], len(vectors), mode=mode, **index_params)
+            train_index(inner, vectors)
+            index = faiss.IndexIDMap2(inner)
+            index.add_with_ids(vectors, ids)
+
+            self.index = index
+            self.mode = mode
+            self._dirty = True
+            self.save()
+            return self.mode
+
+    def get_chunks(self, doc_id: str) -> List[dict]:
+        with self._lock:
+            if doc_id not in self._chunks:
+                self._chunks[doc_id] = load_json(
+                    path_in_cache(self.corpus_dir, os.path.join("chunks", f"{doc_id}.json"))
+                )
+            return self._chunks[doc_id]
+
+    # --------------------------
+    # Search
+    # --------------------------
+    def _matching_docs(self, company=None, ticker=None, call_date=None, doc_ids=None):
+        wanted = {"company": _as_set(company), "ticker": _as_set(ticker), "call_date": _as_set(call_date)}
+        doc_ids = set(doc_ids) if doc_ids is not None else None
+        for doc_id, info in self.docs.items():
+            if doc_ids is not None and doc_id not in doc_ids:
+                continue
+            if all(
+                values is None or str(info.get(field) or "").strip().lower() in values
+                for field, values in wanted.items()
+            ):
+                yield doc_id
+
+    def _allowed_positions(self, doc_id, sections):
+        chunks = self.get_chunks(doc_id)
+        if sections is None:
+            return list(range(len(chunks)))
+        return [i for i, c in enumerate(chunks) if str(c.get("section") or "").lower() in sections]
+
+    def search_vectors(self, q_emb: np.ndarray, top_k: int = 5, context_window: int = 2,
+                       company: FilterValue = None, ticker: FilterValue = None,
+                       call_date: FilterValue = None, section: FilterValue = None,
+                       doc_ids: Optional[Iterable[str]] = None) -> List[dict]:
+        """
+        Search with an already-normalized (1, dim) query vector. Filters are
+        case-insensitive exact matches (a string or a list of strings); only
+        vectors passing them are scored, via an IDSelectorBatch.
+        """
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return []
+
+            sections = _as_set(section)
+            allowed: Dict[str, List[int]] = {}
+            for doc_id in self._matching_docs(company, ticker, call_date, doc_ids):
+                positions = self._allowed_positions(doc_id, sections)
+                if positions:
+                    allowed[doc_id] = positions
+            if not allowed:
+                return []
+
+            first_ids = {doc_id: self.docs[doc_id]["first_id"] for doc_id in allowed}
+            ids = np.concatenate([
+                np.asarray(positions, dtype="int64") + first_ids[doc_id]
+                for doc_id, positions in allowed.items()
+            ])
+            D, I = self.index.search(q_emb, top_k, params=_search_params(self.index, faiss.IDSelectorBatch(ids)))
+
+            # Group hits per document, as rows into that document's allowed chunks
+            hits_by_doc: Dict[str, list] = {}
+            for score, vid in zip(D[0], I[0]):
+                if vid < 0:
+                    continue
+                doc_id = self._doc_order[bisect.bisect_right(self._first_ids, int(vid)) - 1]
+                position = int(vid) - first_ids[doc_id]
+                row = bisect.bisect_left(allowed[doc_id], position)
+                hits_by_doc.setdefault(doc_id, []).append((row, float(score)))
+
+            results = []
+            for doc_id, hits in hits_by_doc.items():
+                chunks = self.get_chunks(doc_id)
+                pool = [chunks[p] for p in allowed[doc_id]]
+                details = {row: {"similarity": score} for row, score in hits}
+                for r in merge_context_windows(hits, pool, top_k=top_k, context_window=context_window,
+                                               details=details):
+                    r["doc_id"] = doc_id
+                    r["company"] = self.docs[doc_id].get("company")
+                    r["ticker"] = self.docs[doc_id].get("ticker")
+                    r["call_date"] = self.docs[doc_id].get("call_date")
+                    results.append(r)
+
+            results.sort(key=lambda x: x["score"], reverse=True)
+            return results[:top_k]
+
+    def search(self, question: str, client, top_k: int = 5, context_window: int = 2,
+               model: str = "text-embedding-3-large", **filters) -> List[dict]:
+        """query_index-style search across every transcript in the corpus."""
+        question = (question or "").strip()
+        if not question:
+            return []
+        q_emb = get_query_embedding_cache().embed([question], client=client, model=model)
+        faiss.normalize_L2(q_emb)
+        return self.search_vectors(q_emb, top_k=top_k, context_window=context_window, **filters)
+
+
+_default_corpus: Optional[CorpusIndex] = None
+_default_lock = threading.Lock()
+
+
+def get_corpus_index() -> CorpusIndex:
+    """Process-wide corpus index stored under the transcript cache dir."""
+    global _default_corpus
+    with _default_lock:
+        if _default_corpus is None:
+            _default_corpus = CorpusIndex(os.getenv("CORPUS_INDEX_DIR", os.path.join(CACHE_DIR, "corpus")))
+        return _default_corpus
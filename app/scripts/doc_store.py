@@ -0,0 +1,206 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from scripts.vector_store import CompactIndex
+
+DEFAULT_MEMORY_BUDGET_MB = 512
+DEFAULT_IDLE_TTL_SECONDS = 3600
+
+
+def _index_nbytes(index) -> int:
+    if isinstance(index, CompactIndex):
+        index = index.index
+    try:
+        return index.ntotal * index.sa_code_size()
+    except RuntimeError:
+        return index.ntotal * index.d * 4
+
+
+def estimate_resident_bytes(data: Dict[str, Any], mmap: bool = False) -> int:
+    """
+    Rough resident size of a processed document: chunk/section text plus
+    vectors held in RAM. Memory-mapped arrays and indexes count as zero
+    because the OS pages them in and out on demand.
+    """
+    nbytes = sum(len(c.get("text", "")) + 200 for c in data.get("chunks", []))
+    for lines in (data.get("sections") or {}).values():
+        nbytes += sum(len(r.get("text", "")) + 100 for r in lines)
+    if mmap:
+        return nbytes
+
+    indexes = [data.get("faiss_index")] + [p["index"] for p in (data.get("pools") or {}).values()]
+    nbytes += sum(_index_nbytes(ix) for ix in indexes if ix is not None)
+    embeddings = data.get("embeddings")
+    if isinstance(embeddings, np.ndarray) and not isinstance(embeddings, np.memmap):
+        nbytes += embeddings.nbytes
+    return nbytes
+
+
+class ResidentDocuments:
+    """
+    LRU of processed documents kept in memory, bounded by an estimated byte
+    budget. Documents not accessed for ``ttl_seconds`` are dropped too.
+    Evicting just drops the reference: the artifacts stay in the disk cache,
+    so the next access reloads (memory-mapped) from there.
+
+    Loaders wrap their miss path in ``loading(key)`` (``aloading`` on an
+    event loop): concurrent misses for one key then run one at a time, so
+    only the first pays for the load and the others find its put().
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024,
+                 on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (data, nbytes, last_used)
+        self._lock = threading.RLock()
+        self._loads: Dict[str, list] = {}  # key -> [lock, callers holding or waiting on it]
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self.expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries[key] = (entry[0], entry[1], time.monotonic())
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _load_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            entry = self._loads.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _release_load_lock(self, key: str) -> None:
+        with self._lock:
+            entry = self._loads[key]
+            entry[1] -= 1
+            if not entry[1]:
+                del self._loads[key]
+
+    @contextmanager
+    def loading(self, key: str):
+        """Single-flight guard: blocks while another thread is loading ``key``."""
+        lock = self._load_lock(key)
+        try:
+            with lock:
+                yield
+        finally:
+            self._release_load_lock(key)
+
+    @asynccontextmanager
+    async def aloading(self, key: str):
+        """loading() for coroutines: waits without blocking the event loop."""
+        lock = self._load_lock(key)
+        try:
+            while not lock.acquire(blocking=False):
+                await asyncio.sleep(0.01)
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            self._release_load_lock(key)
+
+    def put(self, key: str, data: Dict[str, Any], nbytes: Optional[int] = None) -> None:
+        nbytes = estimate_resident_bytes(data) if nbytes is None else nbytes
+        with self._lock:
+            self.pop(key)
+            self._entries[key] = (data, nbytes, time.monotonic())
+            self.resident_bytes += nbytes
+            self.expire()
+            self._evict_over_budget(keep=key)
+
+    def pop(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self.resident_bytes -= entry[1]
+            return entry[0]
+
+    def expire(self) -> int:
+        """Drop documents idle for longer than ttl_seconds; returns how many."""
+        if self.ttl_seconds is None:
+            return 0
+        cutoff = time.monotonic() - self.ttl_seconds
+        dropped = 0
+        with self._lock:
+            # Entries are in access order, so the idle ones are at the front
+            while self._entries:
+                key, entry = next(iter(self._entries.items()))
+                if entry[2] >= cutoff:
+                    break
+                data = self.pop(key)
+                dropped += 1
+                if self.on_evict is not None:
+                    self.on_evict(key, data)
+            self.expirations += dropped
+        return dropped
+
+    def _evict_over_budget(self, keep: Optional[str] = None) -> None:
+        # Never evict the entry just added, even if it alone exceeds the budget
+        while self.resident_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                self._entries.move_to_end(key)
+                key = next(iter(self._entries))
+            data = self.pop(key)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key, data)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+_default_resident: Optional[ResidentDocuments] = None
+_default_lock = threading.Lock()
+
+
+def get_resident_documents() -> ResidentDocuments:
+    """
+    Process-wide LRU; budget from TRANSCRIPT_MEMORY_BUDGET_MB, idle timeout
+    from TRANSCRIPT_RESIDENT_TTL_SECONDS (0 keeps documents until evicted).
+    """
+    global _default_resident
+    with _default_lock:
+        if _default_resident is None:
+            budget_mb = float(os.getenv("TRANSCRIPT_MEMORY_BUDGET_MB", DEFAULT_MEMORY_BUDGET_MB))
+            ttl = float(os.getenv("TRANSCRIPT_RESIDENT_TTL_SECONDS", DEFAULT_IDLE_TTL_SECONDS))
+            _default_resident = ResidentDocuments(max_bytes=int(budget_mb * 1024 * 1024), ttl_seconds=ttl or None)
+        return _default_resident
@@ -0,0 +1,186 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from scripts.cache_utils import CACHE_DIR
+from scripts.embedding_faiss import embed_text
+
+_PUNCT_EDGES = re.compile(r"^[\s\"'?.!,;:]+|[\s\"'?.!,;:]+$")
+# Tokens that name a figure or a period: "q1", "2024", "fy24", "3.5", "first", "next"
+_PERIOD_TOKENS = re.compile(r"\w*\d(?:[\w.]*\w)?|\b(?:first|second|third|fourth|last|next|previous|prior|current)\b")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, collapse whitespace and drop surrounding punctuation."""
+    return _PUNCT_EDGES.sub("", " ".join((text or "").lower().split()))
+
+
+def period_tokens(text: str) -> tuple:
+    """Sorted numbers, quarters, years and relative periods in a normalized query."""
+    return tuple(sorted(_PERIOD_TOKENS.findall(text)))
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of query embeddings keyed by (model, normalized text), shared by
+    every session in the process and backed by a sqlite file so it survives
+    restarts.
+
+    If ``near_duplicate_threshold`` is set, a miss falls back to the closest
+    cached query of the same model by rapidfuzz token-sort ratio (0-100
+    scale, not cosine), so trivially reworded questions ("What was revenue
+    growth" vs "what was the revenue growth?") reuse a vector without another
+    API call. This is a lexical match, so only queries naming exactly the same
+    numbers and periods qualify: "revenue in Q1 2024" never borrows the
+    vector of "revenue in Q2 2024".
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10_000,
+                 max_disk_entries: int = 200_000, near_duplicate_threshold: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (model, text, vector)
+        self._lock = threading.RLock()
+        self._puts = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT, text TEXT, vector BLOB, last_used REAL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}::{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "entries": len(self._mem),
+            }
+
+    def _remember(self, key, model, text, vector):
+        self._mem[key] = (model, text, vector)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        key = self.make_key(model, text)
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype="float32")
+                    self._db.execute("UPDATE query_embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self._remember(key, model, normalize_query(text), vector)
+                    self.disk_hits += 1
+                    return vector
+
+            if self.near_duplicate_threshold is not None and self._mem:
+                wanted = period_tokens(normalize_query(text))
+                choices = {k: e[1] for k, e in self._mem.items()
+                           if e[0] == model and period_tokens(e[1]) == wanted}
+                match = process.extractOne(
+                    normalize_query(text), choices, scorer=fuzz.token_sort_ratio,
+                    score_cutoff=self.near_duplicate_threshold,
+                )
+                if match is not None:
+                    self.near_hits += 1
+                    return self._mem[match[2]][2]
+
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, vector: np.ndarray) -> None:
+        key = self.make_key(model, text)
+        vector = np.asarray(vector, dtype="float32").copy()
+        with self._lock:
+            self._remember(key, model, normalize_query(text), vector)
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, model, text, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, normalize_query(text), vector.tobytes(), time.time()),
+            )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                # Keep the on-disk store bounded: drop least recently used rows
+                self._db.execute(
+                    "DELETE FROM query_embeddings WHERE key IN ("
+                    "SELECT key FROM query_embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+            self._db.commit()
+
+    def _fill(self, texts, model, vectors, missing, fresh) -> np.ndarray:
+        for i, vec in zip(missing, fresh):
+            self.put(model, texts[i], vec)
+            vectors[i] = vec
+        return np.stack(vectors).astype("float32")
+
+    def embed(self, texts: List[str], client, model: str = "text-embedding-3-large") -> np.ndarray:
+        """embed_text with the cache in front: all misses go out in one call."""
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        vectors: List[Optional[np.ndarray]] = [self.get(model, t) for t in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        fresh = embed_text([texts[i] for i in missing], client=client, model=model) if missing else []
+        return self._fill(texts, model, vectors, missing, fresh)
+
+    async def aembed(self, texts: List[str], client, model: str = "text-embedding-3-large") -> np.ndarray:
+        """embed() for async clients."""
+        from scripts.async_pipeline import aembed_text
+
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        vectors: List[Optional[np.ndarray]] = [self.get(model, t) for t in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        fresh = await aembed_text([texts[i] for i in missing], client=client, model=model) if missing else []
+        return self._fill(texts, model, vectors, missing, fresh)
+
+
+_default_cache: Optional[QueryEmbeddingCache] = None
+_default_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Process-wide cache instance, persisted next to the transcript cache."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            path = os.getenv("QUERY_EMBEDDING_CACHE", os.path.join(CACHE_DIR, "query_embeddings.sqlite"))
+            # rapidfuzz score, 0-100 (e.g. 95)
+            threshold = os.getenv("QUERY_NEAR_DUPLICATE_THRESHOLD")
+            _default_cache = QueryEmbeddingCache(
+                path=path, near_duplicate_threshold=float(threshold) if threshold else None
+            )
+        return _default_cache
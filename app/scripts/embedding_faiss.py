@@ -1,19 +1,298 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import numpy as np
 import faiss
+import tiktoken
+
+from scripts.metrics import propagate, record
+from scripts.vector_store import CompactIndex
+
+# text-embedding-3-* accept up to 8191 tokens per input; keep each request
+# well under the per-request token budget so large batches are not rejected.
+MAX_BATCH_TOKENS = 8000
+MAX_BATCH_ITEMS = 64
+MAX_CONCURRENCY = 4
+MAX_RETRIES = 6
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(name="cl100k_base"):
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        # The BPE file is downloaded on first use; offline we estimate instead
+        return None
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text or "") // 4 + 1  # ~4 characters per token for English text
+    return len(encoding.encode(text or "", disallowed_special=()))
+
+
+def make_token_batches(texts, max_batch_tokens=MAX_BATCH_TOKENS, max_batch_items=MAX_BATCH_ITEMS):
+    """
+    Group texts into consecutive batches bounded by total token count and item
+    count. Returns a list of (start, end) index ranges into ``texts``.
+    """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        n = count_tokens(text)
+        if i > start and (tokens + n > max_batch_tokens or i - start >= max_batch_items):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += n
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def _is_rate_limited(exc):
+    return getattr(exc, "status_code", None) == 429
+
+
+def _retry_after(exc, attempt):
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        # Exponential backoff with jitter, capped at 30s
+        return min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def retry_delay(exc, attempt, max_retries=MAX_RETRIES):
+    """Seconds to wait before retrying a failed embedding request, or None if ``exc`` must be raised."""
+    if not _is_rate_limited(exc) or attempt >= max_retries:
+        return None
+    return _retry_after(exc, attempt)
+
+
+def response_embeddings(resp):
+    """Embedding rows of an embeddings.create response, in input order."""
+    return [e.embedding for e in sorted(resp.data, key=lambda e: e.index)]
+
+
+class _AdaptiveLimiter:
+    """
+    AIMD concurrency window shared by all in-flight embedding requests:
+    halve the window and pause everyone on a 429, grow it back by one after
+    a full window of successful calls.
+    """
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self._successes = 0
+        self._pause_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+            delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, rate_limited=False, retry_after=0.0):
+        with self._cond:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+                self._pause_until = max(self._pause_until, time.monotonic() + retry_after)
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def _embed_batch(batch, client, model, limiter, max_retries):
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            resp = client.embeddings.create(input=batch, model=model)
+        except Exception as e:
+            delay = retry_delay(e, attempt, max_retries)
+            if delay is None:
+                limiter.release()
+                raise
+            limiter.release(rate_limited=True, retry_after=delay)
+            record("retries")
+            attempt += 1
+            continue
+        limiter.release()
+        return response_embeddings(resp)
+
+
+def embed_text(texts, client , model="text-embedding-3-large",
+               max_batch_tokens=MAX_BATCH_TOKENS, max_batch_items=MAX_BATCH_ITEMS,
+               max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+    """
+    Embed texts with token-sized batches and up to ``max_concurrency``
+    requests in flight. 429 responses shrink the window and back off; the
+    returned rows are always in the same order as ``texts``.
+    """
+    texts = list(texts)
+    batches = make_token_batches(texts, max_batch_tokens, max_batch_items)
+    limiter = _AdaptiveLimiter(max_concurrency)
+
+    if len(batches) <= 1 or max_concurrency <= 1:
+        results = [_embed_batch(texts[s:e], client, model, limiter, max_retries) for s, e in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as pool:
+            futures = [
+                pool.submit(propagate(_embed_batch), texts[s:e], client, model, limiter, max_retries)
+                for s, e in batches
+            ]
+            results = [f.result() for f in futures]
 
-def embed_text(texts, client , model="text-embedding-3-large"):
-    embeddings = []
-    batch_size = 20
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        resp = client.embeddings.create(input=batch, model=model)
-        batch_embeddings = [e.embedding for e in resp.data]
-        embeddings.extend(batch_embeddings)
+    embeddings = [row for batch in results for row in batch]
     return np.array(embeddings).astype("float32")
 
-def build_faiss_index(embeddings):
+
+# --------------------------
+# Index factory
+# --------------------------
+INDEX_MODES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# Vector-count thresholds for mode="auto". Below the first one an exact scan
+# is both fastest to build and fast enough to query.
+AUTO_FLAT_MAX = 20_000
+AUTO_HNSW_MAX = 200_000
+AUTO_IVF_FLAT_MAX = 2_000_000
+
+TRAIN_SAMPLE_SIZE = 100_000
+MIN_POINTS_PER_CENTROID = 39  # faiss warns below this many training points per list
+
+
+def select_index_mode(n_vectors):
+    if n_vectors <= AUTO_FLAT_MAX:
+        return "flat"
+    if n_vectors <= AUTO_HNSW_MAX:
+        return "hnsw"
+    if n_vectors <= AUTO_IVF_FLAT_MAX:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def _default_nlist(n_vectors):
+    nlist = int(4 * np.sqrt(max(n_vectors, 1)))
+    return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def _default_pq_m(dim):
+    # Sub-quantizer count must divide dim; aim for ~32 dims per code byte
+    for m in (96, 64, 48, 32, 24, 16, 8, 4, 2, 1):
+        if m <= dim and dim % m == 0 and dim // m >= 8:
+            return m
+    return 1
+
+
+def make_index(dim, n_vectors, mode="auto", hnsw_m=32, ef_construction=80, ef_search=64,
+               nlist=None, nprobe=16, pq_m=None, pq_bits=8):
+    """
+    Create an (untrained) inner-product index for ``n_vectors`` vectors.
+
+    - flat: exact IndexFlatIP
+    - hnsw: graph index, no training, good recall at moderate memory
+    - ivf_flat: inverted lists of full vectors, needs training
+    - ivf_pq: inverted lists of product-quantized codes, smallest memory
+    """
+    if mode == "auto":
+        mode = select_index_mode(n_vectors)
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown index mode '{mode}', expected one of {INDEX_MODES} or 'auto'")
+
+    if mode == "flat":
+        return faiss.IndexFlatIP(dim)
+    if mode == "hnsw":
+        # index_factory already returns the concrete type (IndexHNSWFlat / IndexIVF*)
+        index = faiss.index_factory(dim, f"HNSW{hnsw_m}", faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+        return index
+
+    nlist = nlist or _default_nlist(n_vectors)
+    if mode == "ivf_flat":
+        spec = f"IVF{nlist},Flat"
+    else:
+        spec = f"IVF{nlist},PQ{pq_m or _default_pq_m(dim)}x{pq_bits}"
+    index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+    set_search_params(index, nprobe=min(nprobe, nlist))
+    return index
+
+
+def _unwrap(index):
+    # Look through IndexIDMap/IndexIDMap2 wrappers (as used by the corpus index)
+    while isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    """Tune recall/latency at query time (ignored by index types they don't apply to)."""
+    index = _unwrap(index)
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+
+
+def train_index(index, vectors, train_sample=TRAIN_SAMPLE_SIZE, seed=0):
+    """Train on a random sample of ``vectors`` if the index type needs it."""
+    if index.is_trained:
+        return index
+    if len(vectors) > train_sample:
+        rows = np.random.default_rng(seed).choice(len(vectors), train_sample, replace=False)
+        vectors = vectors[np.sort(rows)]
+    index.train(np.ascontiguousarray(vectors, dtype="float32"))
+    return index
+
+
+def build_faiss_index(embeddings, mode="auto", **index_params):
+    """
+    Normalize ``embeddings`` in place and index them for cosine search.
+    mode="auto" picks Flat/HNSW/IVF-Flat/IVF-PQ from the vector count.
+    """
     dim = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dim)
     faiss.normalize_L2(embeddings)
+    index = make_index(dim, len(embeddings), mode=mode, **index_params)
+    train_index(index, embeddings)
     index.add(embeddings)
     return index
+
+
+def build_pool_index(embeddings, chunks, predicate, dim=None, codec="float32", rerank_path=None):
+    """
+    Build a sub-index over the chunks matching ``predicate`` so that filtered
+    retrieval searches only those vectors and row ids map straight back into
+    the returned ``chunks`` list. ``embeddings`` must already be normalized
+    (build_faiss_index normalizes in place) and aligned with ``chunks``.
+    With a reduced ``dim`` or a non-float32 ``codec`` the pool is stored as a
+    CompactIndex (optionally re-ranked from ``rerank_path``).
+    """
+    rows = [i for i, c in enumerate(chunks) if predicate(c)]
+    if dim is None and codec == "float32":
+        index = faiss.IndexFlatIP(embeddings.shape[1])
+        if rows:
+            index.add(np.ascontiguousarray(embeddings[rows], dtype="float32"))
+    else:
+        index = CompactIndex.build(
+            embeddings[rows] if rows else np.zeros((0, embeddings.shape[1]), dtype="float32"),
+            dim=dim, codec=codec, rerank_path=rerank_path, rows=rows,
+        )
+    return {"index": index, "chunks": [chunks[i] for i in rows], "rows": rows}
@@ -1,18 +1,172 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
 import pdfplumber
+import pypdfium2 as pdfium
+
+PAGES_PER_TASK = 4
+DEFAULT_ENGINE = os.getenv("PDF_EXTRACT_ENGINE", "pdfplumber")
+
+
+# --------------------------
+# Extraction engines
+# --------------------------
+class PdfPlumberEngine:
+    """pdfplumber layout analysis: slowest, but the reference output."""
+    name = "pdfplumber"
+
+    def __init__(self, source):
+        self._pdf = pdfplumber.open(BytesIO(source) if isinstance(source, bytes) else source)
+
+    def __len__(self):
+        return len(self._pdf.pages)
+
+    def page_text(self, index):
+        page = self._pdf.pages[index]
+        text = page.extract_text() or ""
+        # Drop pdfplumber's cached layout objects for pages already done
+        page.flush_cache()
+        return text
+
+    def close(self):
+        self._pdf.close()
+
+
+class PdfiumEngine:
+    """
+    PDFium's native text extraction (pypdfium2, already a pdfplumber
+    dependency): no Python-side layout analysis, many times faster. Pages
+    where it finds no text are re-extracted with pdfplumber.
+    """
+    name = "pdfium"
+
+    def __init__(self, source):
+        self._source = source
+        self._doc = pdfium.PdfDocument(source)
+        self._fallback = None
+        self.fallback_pages = 0
+
+    def __len__(self):
+        return len(self._doc)
+
+    def page_text(self, index):
+        page = self._doc[index]
+        try:
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n")
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+
+        if not text.strip():
+            if self._fallback is None:
+                self._fallback = PdfPlumberEngine(self._source)
+            self.fallback_pages += 1
+            text = self._fallback.page_text(index)
+        return text
+
+    def close(self):
+        if self._fallback is not None:
+            self._fallback.close()
+        self._doc.close()
+
+
+EXTRACTION_ENGINES = {
+    PdfPlumberEngine.name: PdfPlumberEngine,
+    PdfiumEngine.name: PdfiumEngine,
+}
+
+
+def open_engine(pdf_file, engine=None):
+    engine = engine or DEFAULT_ENGINE
+    if engine not in EXTRACTION_ENGINES:
+        raise ValueError(f"Unknown extraction engine '{engine}', expected one of {sorted(EXTRACTION_ENGINES)}")
+    if not isinstance(pdf_file, (bytes, str, os.PathLike)):
+        # Both engines (and the fallback) need to read the source independently
+        pdf_file = _read_bytes(pdf_file)
+    return EXTRACTION_ENGINES[engine](pdf_file)
 
-def extract_pdf_text(pdf_path: str):
-    with pdfplumber.open(pdf_path) as pdf:
-        lines = []
-        for p_idx, page in enumerate(pdf.pages, start=1):
-            content = page.extract_text() or ""
-            line_no = 0
-            for line in content.split("\n"):
-                clean = line.strip()
-                if clean:
-                    line_no += 1
-                    lines.append({
-                        "text": clean,
-                        "page": p_idx,
-                        "line": line_no
-                    })
+
+def _page_lines(content, p_idx):
+    lines = []
+    line_no = 0
+    for line in content.split("\n"):
+        clean = line.strip()
+        if clean:
+            line_no += 1
+            lines.append({
+                "text": clean,
+                "page": p_idx,
+                "line": line_no
+            })
     return lines
+
+
+def iter_pdf_lines(pdf_path, engine=None, start=0, end=None):
+    """Yield line records page by page, without materializing the document."""
+    doc = open_engine(pdf_path, engine)
+    try:
+        for p_idx in range(start, len(doc) if end is None else end):
+            yield from _page_lines(doc.page_text(p_idx), p_idx + 1)
+    finally:
+        doc.close()
+
+
+_worker_pdf_bytes = None
+
+
+def _init_worker(pdf_bytes):
+    # Ship the PDF to each worker process once instead of once per task
+    global _worker_pdf_bytes
+    _worker_pdf_bytes = pdf_bytes
+
+
+def _extract_page_range(start, end, engine):
+    # Runs in a worker process: re-open the PDF from bytes, parse [start, end)
+    return list(iter_pdf_lines(_worker_pdf_bytes, engine=engine, start=start, end=end))
+
+
+def _count_pages(pdf_bytes):
+    doc = pdfium.PdfDocument(pdf_bytes)
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def iter_pdf_lines_parallel(pdf_file, workers=None, pages_per_task=PAGES_PER_TASK, engine=None):
+    """
+    Like iter_pdf_lines, but page ranges are parsed in a process pool. Lines
+    are still yielded in document order, as soon as every earlier range is
+    done, so downstream stages can start on the first pages early.
+    """
+    pdf_bytes = pdf_file if isinstance(pdf_file, bytes) else _read_bytes(pdf_file)
+    n_pages = _count_pages(pdf_bytes)
+    workers = workers or min(os.cpu_count() or 1, 8)
+    if workers <= 1 or n_pages <= pages_per_task:
+        yield from iter_pdf_lines(pdf_bytes, engine=engine)
+        return
+
+    ranges = [(s, min(s + pages_per_task, n_pages)) for s in range(0, n_pages, pages_per_task)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pdf_bytes,)) as pool:
+        futures = [pool.submit(_extract_page_range, s, e, engine) for s, e in ranges]
+        for future in futures:
+            yield from future.result()
+
+
+def _read_bytes(pdf_file):
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    data = pdf_file.read()
+    pdf_file.seek(0)
+    return data
+
+
+def extract_pdf_text(pdf_path: str, workers=1, engine=None):
+    if workers and workers > 1:
+        return list(iter_pdf_lines_parallel(pdf_path, workers=workers, engine=engine))
+    return list(iter_pdf_lines(pdf_path, engine=engine))
@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class FakeRateLimitError(Exception):
+    """Mimics openai.RateLimitError closely enough for the retry logic."""
+    status_code = 429
+
+    def __init__(self, message="Rate limit exceeded", retry_after=None):
+        super().__init__(message)
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+def fake_embedding(text, dim=3072, model=""):
+    """Deterministic unit vector derived from a hash of (model, text)."""
+    seed = int.from_bytes(hashlib.sha256(f"{model}::{text}".encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    return vec / np.linalg.norm(vec)
+
+
+class _FakeEmbeddings:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, input, model, **kwargs):
+        return self._owner._create(input, model)
+
+
+class FakeEmbeddingClient:
+    """
+    Offline stand-in for ``AzureOpenAI`` embeddings, for benchmarking embed_text.
+
+    - latency: fixed seconds per request (+ per_item_latency per input)
+    - server_concurrency: simultaneous requests allowed before answering 429
+    - rate_limit_rate: probability of a random 429 on any request
+    """
+
+    def __init__(self, dim=3072, latency=0.2, per_item_latency=0.0,
+                 server_concurrency=None, rate_limit_rate=0.0, seed=0):
+        self.dim = dim
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.server_concurrency = server_concurrency
+        self.rate_limit_rate = rate_limit_rate
+        self.embeddings = _FakeEmbeddings(self)
+
+        self.calls = 0
+        self.rate_limited = 0
+        self._in_flight = 0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        with self._lock:
+            self.calls += 1
+            over_capacity = self.server_concurrency is not None and self._in_flight >= self.server_concurrency
+            unlucky = self.rate_limit_rate and self._rng.random() < self.rate_limit_rate
+            if over_capacity or unlucky:
+                self.rate_limited += 1
+                raise FakeRateLimitError(retry_after=self.latency)
+            self._in_flight += 1
+
+    def _done(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _response(self, texts, model):
+        data = [
+            SimpleNamespace(index=i, embedding=fake_embedding(t, self.dim, model).tolist())
+            for i, t in enumerate(texts)
+        ]
+        n_tokens = sum(len(t.split()) for t in texts)
+        return SimpleNamespace(data=data, model=model, usage=SimpleNamespace(prompt_tokens=n_tokens, total_tokens=n_tokens))
+
+    def _create(self, input, model):
+        texts = [input] if isinstance(input, str) else list(input)
+        self._admit()
+        try:
+            time.sleep(self.latency + self.per_item_latency * len(texts))
+        finally:
+            self._done()
+        return self._response(texts, model)
+
+
+class FakeServerError(Exception):
+    """Mimics a 5xx from the API: not retried by embed_text."""
+    status_code = 500
+
+
+def _fake_answer_text(messages):
+    # Deterministic reply shaped like what each pipeline prompt expects
+    system = messages[0]["content"] if messages else ""
+    prompt = messages[-1]["content"] if messages else ""
+    seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "little")
+    rng = np.random.default_rng(seed)
+    words = [w.strip(".,:;?()[]") for w in prompt.split() if len(w) > 5 and w.isascii()]
+
+    def pick(k):
+        return " ".join(rng.choice(words, size=k)) if words else "general business update"
+
+    if "metadata" in system:
+        header = next((m["content"] for m in messages if "[HEADER CONTEXT]" in m["content"]), "")
+        first = [l for l in header.splitlines()[1:] if l.strip()]
+        return json.dumps({
+            "company": first[0] if first else None,
+            "ceo": None,
+            "call_date": first[1] if len(first) > 1 else None,
+            "ticker": None,
+            "participants": [],
+        })
+    if "topics" in system:
+        return "\n".join(f"- Topic: {pick(2).title()}\n  Summary: {pick(12)}." for _ in range(5))
+    return f"{pick(15)}. {pick(15)}."
+
+
+class _FakeCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, messages, stream=False, **kwargs):
+        return self._owner._create(model, messages, stream)
+
+
+class FakeChatClient:
+    """
+    Offline stand-in for ``AzureOpenAI`` chat completions: metadata prompts
+    get JSON, topic prompts a topics block, anything else a short answer,
+    all derived deterministically from the prompt text.
+
+    - latency: seconds before the first token (+ per_token_latency per output token)
+    - rate_limit_rate / error_rate: probability of a 429 / a 500 on any request
+    """
+
+    def __init__(self, latency=0.5, per_token_latency=0.0, rate_limit_rate=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        with self._lock:
+            self.calls += 1
+            roll = self._rng.random()
+            if roll < self.rate_limit_rate:
+                self.rate_limited += 1
+                raise FakeRateLimitError(retry_after=self.latency)
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                raise FakeServerError("Internal server error")
+
+    def _response(self, model, messages):
+        text = _fake_answer_text(messages)
+        pieces = text.split(" ")
+        usage = SimpleNamespace(prompt_tokens=sum(len(m["content"].split()) for m in messages),
+                                completion_tokens=len(pieces))
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+                               model=model, usage=usage)
+
+    def _create(self, model, messages, stream):
+        self._admit()
+        resp = self._response(model, messages)
+        time.sleep(self.latency)
+        if stream:
+            return self._stream(resp.choices[0].message.content.split(" "))
+        time.sleep(self.per_token_latency * resp.usage.completion_tokens)
+        return resp
+
+    def _stream(self, pieces):
+        for i, piece in enumerate(pieces):
+            time.sleep(self.per_token_latency)
+            delta = SimpleNamespace(content=piece if i == 0 else " " + piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)])
+
+
+class _AsyncFakeEmbeddings(_FakeEmbeddings):
+    async def create(self, input, model, **kwargs):
+        owner = self._owner
+        texts = [input] if isinstance(input, str) else list(input)
+        owner._admit()
+        try:
+            await asyncio.sleep(owner.latency + owner.per_item_latency * len(texts))
+        finally:
+            owner._done()
+        return owner._response(texts, model)
+
+
+class AsyncFakeEmbeddingClient(FakeEmbeddingClient):
+    """FakeEmbeddingClient for AsyncAzureOpenAI code paths: waits without blocking the event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.embeddings = _AsyncFakeEmbeddings(self)
+
+
+class _AsyncFakeCompletions(_FakeCompletions):
+    async def create(self, model, messages, stream=False, **kwargs):
+        owner = self._owner
+        owner._admit()
+        resp = owner._response(model, messages)
+        await asyncio.sleep(owner.latency + owner.per_token_latency * resp.usage.completion_tokens)
+        return resp
+
+
+class AsyncFakeChatClient(FakeChatClient):
+    """FakeChatClient for AsyncAzureOpenAI code paths (no streaming)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chat = SimpleNamespace(completions=_AsyncFakeCompletions(self))
+
+
+def make_fake_clients(embedding_latency=0.2, chat_latency=0.5, dim=3072, rate_limit_rate=0.0, error_rate=0.0,
+                      seed=0, asynchronous=False):
+    """
+    Fake counterpart of scripts.clients.make_clients (process_transcript
+    client kwargs), or of make_async_clients with ``asynchronous``.
+    ``error_rate`` only applies to chat: the pipeline degrades gracefully on
+    failed completions, while a failed embedding batch fails the document.
+    """
+    chat_cls, embedding_cls = ((AsyncFakeChatClient, AsyncFakeEmbeddingClient) if asynchronous
+                               else (FakeChatClient, FakeEmbeddingClient))
+    return {
+        "chat_client": chat_cls(latency=chat_latency, rate_limit_rate=rate_limit_rate,
+                                error_rate=error_rate, seed=seed),
+        "embedding_client": embedding_cls(dim=dim, latency=embedding_latency,
+                                          rate_limit_rate=rate_limit_rate, seed=seed),
+        "chat_model": "fake-chat",
+        "embedding_model": "fake-embedding",
+    }
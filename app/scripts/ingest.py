@@ -0,0 +1,183 @@
+"""
+Headless bulk ingestion: process every PDF in a folder into the transcript
+cache, without Streamlit.
+
+    python -m scripts.ingest transcripts/ --workers 4
+
+(run from the ``app`` directory). Documents already in the cache are served
+from it, and entries are only complete once metadata.json is written, so an
+interrupted run picks up where it stopped when started again.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from scripts.cache_utils import CACHE_DIR
+from scripts.chunking import CHUNK_MODES
+from scripts.clients import make_clients
+from scripts.corpus_index import CorpusIndex
+from scripts.extract_text import EXTRACTION_ENGINES
+from scripts.vector_store import VECTOR_CODECS
+
+_worker_clients: Optional[Dict[str, Any]] = None
+
+
+def find_pdfs(root: str, recursive: bool = False) -> List[str]:
+    if os.path.isfile(root):
+        return [root]
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        paths.extend(os.path.join(dirpath, f) for f in filenames if f.lower().endswith(".pdf"))
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def _init_worker(client_factory: Callable[[], Dict[str, Any]]):
+    # Each worker process builds its own clients once
+    global _worker_clients
+    _worker_clients = client_factory()
+
+
+def ingest_file(path: str, options: Dict[str, Any], clients: Optional[Dict[str, Any]] = None,
+                corpus: Optional[CorpusIndex] = None) -> Dict[str, Any]:
+    """
+    Process one PDF into the cache (and ``corpus``, if given); returns a
+    small, picklable status record.
+    """
+    from scripts.pipeline import process_transcript
+
+    clients = clients if clients is not None else _worker_clients
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            data = process_transcript(f, **options, corpus=corpus, **(clients or {}))
+    except Exception as e:
+        return {"file": path, "ok": False, "error": f"{type(e).__name__}: {e}",
+                "seconds": round(time.perf_counter() - start, 3)}
+    pages = (data["summary"] or {}).get("total_pages") or max(
+        (c.get("end_page") or 0 for c in data["chunks"]), default=0)
+    return {
+        "file": path,
+        "ok": True,
+        "doc_id": data["doc_id"],
+        "cache_hit": data["cache_hit"],
+        "chunks": len(data["chunks"]),
+        "pages": int(pages or 0),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def ingest_directory(paths: List[str], options: Optional[Dict[str, Any]] = None, workers: int = 1,
+                     client_factory: Callable[[], Dict[str, Any]] = make_clients,
+                     on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                     corpus: Optional[CorpusIndex] = None) -> Dict[str, Any]:
+    """
+    Ingest ``paths`` on ``workers`` processes (in-process when 1). Clients
+    come from ``client_factory``, a picklable callable returning the
+    process_transcript client kwargs (see scripts.clients.make_clients).
+
+    With a ``corpus``, every ingested document is also added to that
+    cross-transcript index. Worker processes only fill the disk cache; the
+    parent then adds each finished document from there, without API calls.
+    """
+    options = options or {}
+    results = []
+    start = time.perf_counter()
+    clients = client_factory() if workers <= 1 or corpus is not None else None
+
+    def collect(record):
+        if corpus is not None and record["ok"] and workers > 1:
+            added = ingest_file(record["file"], options, clients, corpus)
+            if not added["ok"]:
+                record = dict(record, ok=False, error=f"adding to the corpus: {added['error']}")
+        results.append(record)
+        if on_result is not None:
+            on_result(record)
+
+    if workers <= 1:
+        for path in paths:
+            collect(ingest_file(path, options, clients, corpus))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(client_factory,)) as pool:
+            futures = [pool.submit(ingest_file, path, options) for path in paths]
+            for future in as_completed(futures):
+                collect(future.result())
+    if corpus is not None:
+        corpus.save()
+
+    elapsed = time.perf_counter() - start
+    done = [r for r in results if r["ok"]]
+    processed = [r for r in done if not r["cache_hit"]]
+    pages = sum(r["pages"] for r in processed)
+    return {
+        "files": len(results),
+        "processed": len(processed),
+        "cached": len(done) - len(processed),
+        "failed": len(results) - len(done),
+        "pages": pages,
+        "seconds": round(elapsed, 2),
+        "docs_per_min": round(len(processed) / elapsed * 60, 2) if elapsed else 0.0,
+        "pages_per_sec": round(pages / elapsed, 2) if elapsed else 0.0,
+        "results": results,
+    }
+
+
+def _print_result(record):
+    if not record["ok"]:
+        print(f"FAILED  {record['file']}: {record['error']}", file=sys.stderr)
+        return
+    status = "cached " if record["cache_hit"] else "done   "
+    print(f"{status} {record['file']} ({record['pages']} pages, {record['chunks']} chunks, {record['seconds']:.1f}s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="folder of PDFs (or a single PDF)")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 4))
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--chunk-mode", default="speaker", choices=CHUNK_MODES)
+    parser.add_argument("--extract-engine", choices=list(EXTRACTION_ENGINES))
+    parser.add_argument("--vector-dim", type=int)
+    parser.add_argument("--vector-codec", default="float32", choices=VECTOR_CODECS)
+    parser.add_argument("--corpus", action="store_true",
+                        help="also add the transcripts to the cross-transcript corpus index "
+                             "(<cache-dir>/corpus, or CORPUS_INDEX_DIR)")
+    parser.add_argument("--rebuild-corpus", action="store_true",
+                        help="re-index the corpus afterwards, as an ANN index once it is large (implies --corpus)")
+    args = parser.parse_args(argv)
+
+    paths = find_pdfs(args.path, args.recursive)
+    if not paths:
+        parser.error(f"no PDFs found in {args.path}")
+    options = {
+        "cache_dir": args.cache_dir,
+        "chunk_size": args.chunk_size,
+        "overlap": args.overlap,
+        "chunk_mode": args.chunk_mode,
+        "extract_engine": args.extract_engine,
+        "vector_dim": args.vector_dim,
+        "vector_codec": args.vector_codec,
+    }
+    print(f"Ingesting {len(paths)} PDFs with {args.workers} workers into {args.cache_dir}")
+    corpus = None
+    if args.corpus or args.rebuild_corpus:
+        corpus = CorpusIndex(os.getenv("CORPUS_INDEX_DIR", os.path.join(args.cache_dir, "corpus")))
+    report = ingest_directory(paths, options, workers=args.workers, on_result=_print_result, corpus=corpus)
+    print(f"{report['processed']} processed, {report['cached']} from cache, {report['failed']} failed "
+          f"in {report['seconds']:.1f}s: {report['docs_per_min']} docs/min, {report['pages_per_sec']} pages/s")
+    if corpus is not None:
+        mode = corpus.rebuild() if args.rebuild_corpus else corpus.mode
+        print(f"Corpus index: {len(corpus)} transcripts, {corpus.index.ntotal if corpus.index else 0} chunks ({mode})")
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
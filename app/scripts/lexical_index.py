@@ -0,0 +1,103 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Words, tickers and numbers ("23.4", "fy2024", "q3"); thousands separators
+# are dropped first so "1,200" and "1200" match
+TOKEN_REGEX = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+THOUSANDS_REGEX = re.compile(r"(?<=\d),(?=\d{3}\b)")
+
+STOPWORDS = frozenset("""
+a about an and are as at be been but by can could did do does for from had has have how i in is it its
+of on or our so that the their them there these they this to was we were what when where which who why
+will with would you your
+""".split())
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# A lexical-only answer needs every query term in the top chunk and a clear lead over the runner-up
+LEXICAL_MARGIN = 1.5
+
+
+def tokenize(text: str) -> List[str]:
+    text = THOUSANDS_REGEX.sub("", (text or "").lower())
+    return [t for t in TOKEN_REGEX.findall(text) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over a list of chunk texts. Row ids are
+    positions in that list, like the rows of the FAISS (sub-)index built over
+    the same chunks, so both rankings can be fused directly. Building is a
+    single pass over the text, cheap enough to redo when a cache entry loads.
+    """
+
+    def __init__(self, postings: Dict[str, Tuple[np.ndarray, np.ndarray]], doc_lens: np.ndarray,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.postings = postings
+        self.doc_lens = doc_lens
+        self.k1 = k1
+        self.b = b
+        self.avgdl = float(doc_lens.mean()) if len(doc_lens) else 0.0
+
+    @classmethod
+    def build(cls, texts: Sequence[str], **kwargs) -> "BM25Index":
+        rows: Dict[str, List[int]] = {}
+        freqs: Dict[str, List[int]] = {}
+        doc_lens = np.zeros(len(texts), dtype="float32")
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lens[row] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                rows.setdefault(term, []).append(row)
+                freqs.setdefault(term, []).append(tf)
+        postings = {
+            term: (np.asarray(rows[term], dtype="int64"), np.asarray(freqs[term], dtype="float32"))
+            for term in rows
+        }
+        return cls(postings, doc_lens, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.doc_lens)
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings[term][0]) if term in self.postings else 0
+        return math.log(1.0 + (len(self) - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self), dtype="float32")
+        if not len(self):
+            return scores
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_lens / max(self.avgdl, 1e-9))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            rows, tf = self.postings[term]
+            scores[rows] += self.idf(term) * tf * (self.k1 + 1.0) / (tf + norm[rows])
+        return scores
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """Best-first (row, bm25 score) pairs with a non-zero score."""
+        scores = self.scores(query)
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def is_confident(self, query: str, hits: List[Tuple[int, float]]) -> bool:
+        """
+        Whether the lexical ranking alone can answer ``query``: the top chunk
+        contains every query term and out-scores the runner-up by LEXICAL_MARGIN.
+        """
+        terms = set(tokenize(query))
+        if not hits or not terms:
+            return False
+        top_row = hits[0][0]
+        if not all(term in self.postings and top_row in self.postings[term][0] for term in terms):
+            return False
+        return len(hits) == 1 or hits[0][1] >= LEXICAL_MARGIN * hits[1][1]
@@ -1,7 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import json
 from json_repair import repair_json
-from scripts.rag_query import query_index
+from scripts.rag_query import retrieve_batch
 
 
 def repair_and_load_json(res):
@@ -20,30 +20,24 @@ def repair_and_load_json(res):
                 pass
     return res_json
 
-def extract_document_metadata(lines: List[dict], chunks: List[dict], index, embedding_client, chat_client) -> Dict[str, Any]:
-    # Build header context (first ~2 pages) to capture title block and date
-    header_lines = [r.get("text", "") for r in lines if (r.get("page") or 0) <= 2][:400]
-    header_context = "\n".join(header_lines)
 
-    # Retrieval contexts for each field
-    field_queries = {
-        "company": "What is the company name of the earnings call transcript?",
-        "ceo": "Who is the CEO or main management person speaking on the call?",
-        "call_date": "What is the date of the call? Return a human-readable date.",
-        "ticker": "What is the company ticker if mentioned?",
-        "participants": "List the key management participants with their roles (e.g., CEO, CFO)."
-    }
+# Retrieval query for each field
+FIELD_QUERIES = {
+    "company": "What is the company name of the earnings call transcript?",
+    "ceo": "Who is the CEO or main management person speaking on the call?",
+    "call_date": "What is the date of the call? Return a human-readable date.",
+    "ticker": "What is the company ticker if mentioned?",
+    "participants": "List the key management participants with their roles (e.g., CEO, CFO)."
+}
 
-    # Only allow chunks where chunk_id contains "Metadata"
-    allowed_chunks = [c for c in chunks if "Metadata" in str(c.get("chunk_id", ""))]
 
-    contexts: Dict[str, str] = {"header": header_context}
-    for key, q in field_queries.items():
-        retrieved = query_index(q, index, allowed_chunks, client=embedding_client, top_k=8)
-        ctx = "\n\n".join([r.get("text", "") for r in retrieved])
-        contexts[key] = ctx
+def _header_context(lines: List[dict]) -> str:
+    # First ~2 pages, to capture title block and date
+    header_lines = [r.get("text", "") for r in lines if (r.get("page") or 0) <= 2][:400]
+    return "\n".join(header_lines)
 
 
+def _metadata_messages(contexts: Dict[str, str]) -> List[Dict[str, str]]:
     system = (
         "You extract factual metadata from earnings call context. "
         "Use the header context when available. If unknown, return null. "
@@ -54,24 +48,44 @@ def extract_document_metadata(lines: List[dict], chunks: List[dict], index, embe
         "Extract metadata from the contexts. If a value is not present, use null.\n"
         "Return ONLY JSON."
     )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+        {"role": "user", "content": prompt},
+    ]
 
-    try:
-        resp = chat_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0,
-            max_tokens=500,
-        )
-        import json
-        content = (resp.choices[0].message.content or "").strip()
-        data = repair_and_load_json(content)
-    except Exception:
-        data = {"company": None, "ceo": None, "call_date": None, "ticker": None, "participants": []}
 
+def metadata_request(lines: List[dict], retrieved: List[List[dict]]) -> Dict[str, Any]:
+    """
+    chat.completions.create arguments (except the model) for the metadata
+    prompt: the header pages plus ``retrieved`` chunks per FIELD_QUERIES entry.
+    """
+    contexts: Dict[str, str] = {"header": _header_context(lines)}
+    for key, hits in zip(FIELD_QUERIES, retrieved):
+        contexts[key] = "\n\n".join([r.get("text", "") for r in hits])
+    return {"messages": _metadata_messages(contexts), "temperature": 0, "max_tokens": 500}
+
+
+def parse_metadata(content: Optional[str], lines: List[dict]) -> Dict[str, Any]:
+    """Metadata dict from the model's reply (None if the call failed), plus total_pages."""
+    data = repair_and_load_json(content) if content else None
+    if not isinstance(data, dict):
+        data = {"company": None, "ceo": None, "call_date": None, "ticker": None, "participants": []}
     total_pages = max((r.get("page") or 0) for r in lines) if lines else 0
     data["total_pages"] = total_pages
-    return data
\ No newline at end of file
+    return data
+
+
+def extract_document_metadata(lines: List[dict], chunks: List[dict], index, embedding_client, chat_client,
+                              chat_model: str = "gpt-4o",
+                              embedding_model: str = "text-embedding-3-large") -> Dict[str, Any]:
+    # `index` is the Metadata-pool sub-index: row i of the index is chunks[i].
+    # All field queries are embedded in one call and searched together.
+    retrieved = retrieve_batch(list(FIELD_QUERIES.values()), index, chunks, embedding_client, top_k=8,
+                               model=embedding_model)
+    try:
+        resp = chat_client.chat.completions.create(model=chat_model, **metadata_request(lines, retrieved))
+        content = (resp.choices[0].message.content or "").strip()
+    except Exception:
+        content = None
+    return parse_metadata(content, lines)
@@ -0,0 +1,262 @@
+"""
+Per-stage instrumentation: wall/CPU time, memory high-water mark, API calls,
+tokens and retries.
+
+A stage is opened with ``with stage("embed", metrics):``. Code running
+inside it (including threads started through ``propagate``) reports
+counters with ``record("retries")``, without having the metrics object
+passed down. API calls are counted by wrapping clients in
+``InstrumentedClient``.
+"""
+import contextvars
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+COUNTERS = ("api_calls", "tokens_in", "tokens_out", "retries", "rate_limited", "errors", "cache_hits", "cache_misses")
+
+logger = logging.getLogger("transcript.metrics")
+if os.getenv("TRANSCRIPT_METRICS_LOG"):
+    _handler = logging.FileHandler(os.environ["TRANSCRIPT_METRICS_LOG"])
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+# (Metrics, stage name) that record() currently reports to
+_current: contextvars.ContextVar = contextvars.ContextVar("transcript_metrics_stage", default=None)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB; None where the platform has no getrusage."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Metrics:
+    """Counters and timings per stage for one pipeline run or query."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, name: str) -> Dict[str, Any]:
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = {counter: 0 for counter in COUNTERS}
+        return entry
+
+    def add(self, stage_name: str, key: str, value=1) -> None:
+        with self._lock:
+            entry = self._stage(stage_name)
+            entry[key] = entry.get(key, 0) + value
+
+    def set(self, stage_name: str, key: str, value) -> None:
+        with self._lock:
+            self._stage(stage_name)[key] = value
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = {counter: sum(s.get(counter, 0) for s in self.stages.values()) for counter in COUNTERS}
+            totals["cpu_s"] = round(sum(s.get("cpu_s", 0.0) for s in self.stages.values()), 4)
+        totals["peak_rss_mb"] = peak_rss_mb()
+        return totals
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+        return {"stages": stages, "totals": self.totals()}
+
+    def log(self, event: str, **fields) -> Dict[str, Any]:
+        """Emit the metrics as one JSON log line on the "transcript.metrics" logger."""
+        payload = {"event": event, **fields, **self.as_dict()}
+        logger.info(json.dumps(payload, default=str))
+        return payload
+
+
+@contextmanager
+def stage(name: str, metrics: Optional[Metrics] = None):
+    """
+    Time a stage and make it the target of record(). Without ``metrics``
+    the stage is nested in the current one's Metrics (or is a no-op when
+    none is active). CPU time is that of the calling thread; the memory
+    figures are the process high-water mark, so they are approximate when
+    stages overlap.
+    """
+    if metrics is None:
+        current = _current.get()
+        if current is None:
+            yield None
+            return
+        metrics = current[0]
+    token = _current.set((metrics, name))
+    rss_before = peak_rss_mb()
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    try:
+        yield metrics
+    finally:
+        metrics.add(name, "wall_s", round(time.perf_counter() - wall0, 4))
+        metrics.add(name, "cpu_s", round(time.thread_time() - cpu0, 4))
+        rss_after = peak_rss_mb()
+        metrics.set(name, "peak_rss_mb", rss_after)
+        if rss_after is not None:
+            metrics.add(name, "rss_growth_mb", round(rss_after - rss_before, 1))
+        _current.reset(token)
+
+
+def record(key: str, value=1) -> None:
+    """Add to a counter of the current stage, if any."""
+    current = _current.get()
+    if current is not None:
+        current[0].add(current[1], key, value)
+
+
+def propagate(fn: Callable) -> Callable:
+    """Wrap ``fn`` so it reports to the caller's stage when run on a pool thread."""
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def annotate(key: str, value) -> None:
+    """Set a (non-counter) value on the current stage, if any."""
+    current = _current.get()
+    if current is not None:
+        current[0].set(current[1], key, value)
+
+
+def timed_iter(iterable, totals: Dict[str, float], key: str) -> Iterator:
+    """
+    Yield from ``iterable``, adding the seconds spent producing items to
+    ``totals[key]``. For nested generators the time includes that of the
+    generators they pull from.
+    """
+    totals.setdefault(key, 0.0)
+    iterator = iter(iterable)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            totals[key] += time.perf_counter() - t0
+        yield item
+
+
+# --------------------------
+# Instrumented clients
+# --------------------------
+class _Endpoint:
+    def __init__(self, create: Callable):
+        self._create = create
+
+    def create(self, *args, **kwargs):
+        target = _current.get()
+
+        def add(key, value=1):
+            if target is not None and value:
+                target[0].add(target[1], key, value)
+
+        add("api_calls")
+        try:
+            resp = self._create(*args, **kwargs)
+        except Exception as e:
+            _count_error(e, add)
+            raise
+        if inspect.isawaitable(resp):
+            # Async clients: count once the response arrives
+            return _count_async(resp, add)
+        if kwargs.get("stream"):
+            return _count_stream(resp, add, kwargs.get("messages") or [])
+        _count_usage(resp, add)
+        return resp
+
+
+def _count_error(e, add):
+    add("rate_limited" if getattr(e, "status_code", None) == 429 else "errors")
+
+
+def _count_usage(resp, add):
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        add("tokens_in", getattr(usage, "prompt_tokens", 0) or 0)
+        add("tokens_out", getattr(usage, "completion_tokens", 0) or 0)
+
+
+async def _count_async(pending, add):
+    try:
+        resp = await pending
+    except Exception as e:
+        _count_error(e, add)
+        raise
+    _count_usage(resp, add)
+    return resp
+
+
+def _count_stream(events, add, messages):
+    # Streams carry no usage block by default: count the prompt and the
+    # streamed text instead
+    from scripts.embedding_faiss import count_tokens
+
+    text = []
+    usage_seen = False
+    for event in events:
+        usage = getattr(event, "usage", None)
+        if usage is not None:
+            usage_seen = True
+            add("tokens_in", getattr(usage, "prompt_tokens", 0) or 0)
+            add("tokens_out", getattr(usage, "completion_tokens", 0) or 0)
+        for choice in getattr(event, "choices", None) or []:
+            delta = getattr(getattr(choice, "delta", None), "content", None)
+            if delta:
+                text.append(delta)
+        yield event
+    if not usage_seen:
+        add("tokens_in", sum(count_tokens(str(m.get("content", ""))) for m in messages))
+        add("tokens_out", count_tokens("".join(text)))
+
+
+class _Namespace:
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+class InstrumentedClient:
+    """
+    Proxy for an OpenAI-style client that counts ``chat.completions.create``
+    and ``embeddings.create`` calls, tokens and failures against the stage
+    active when each call is made. Everything else is passed through.
+    """
+
+    def __init__(self, client):
+        self.wrapped = client
+        if hasattr(client, "chat"):
+            self.chat = _Namespace(completions=_Endpoint(client.chat.completions.create))
+        if hasattr(client, "embeddings"):
+            self.embeddings = _Endpoint(client.embeddings.create)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+
+def instrument(client):
+    if client is None or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
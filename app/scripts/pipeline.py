@@ -1,139 +1,138 @@
-from dotenv import load_dotenv
+import logging
 import os
-import streamlit as st
-from scripts.extract_text import extract_pdf_text
-from scripts.chunking import chunk_metadata , speaker_level_chunks
-from scripts.section_split import split_transcript_metadata_opening_qa
-from scripts.embedding_faiss import embed_text, build_faiss_index
+import time
+from contextlib import nullcontext
+from scripts.extract_text import DEFAULT_ENGINE, iter_pdf_lines, iter_pdf_lines_parallel
+from scripts.chunking import CHUNK_MODES, iter_token_chunks, iter_transcript_chunks, token_stats
+from scripts.section_split import iter_section_lines, METADATA, OPENING_REMARKS, QA
+from scripts.embedding_faiss import embed_text, build_faiss_index, build_pool_index
 from scripts.topics_summaries import generate_topics_and_summaries
 from scripts.topics_parser import parse_topics_block
 from scripts.rag_query import query_index, generate_answer
 from scripts.cache_utils import (
-    compute_doc_id, get_cache_dir, path_in_cache,
+    CACHE_DIR, compute_doc_id, compute_cache_key, get_cache_dir, path_in_cache,
     has_cached_artifacts, save_json, load_json, save_numpy, load_numpy,
     save_faiss, load_faiss
 )
-from openai import AzureOpenAI
 from rapidfuzz import fuzz
 import faiss
 from scripts.metadata_extraction import extract_document_metadata
+from scripts.vector_store import CompactIndex
+from scripts.doc_store import estimate_resident_bytes
+from scripts.stage_graph import run_stage_graph
+from scripts.lexical_index import BM25Index
+from scripts.clients import get_async_clients, get_clients, load_settings
+from scripts.metrics import Metrics, annotate, instrument, stage, timed_iter
+from scripts.completion_cache import cache_completions
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 # --------------------------
-# Initialize clients from environment
+# Disk cache helpers
 # --------------------------
-# API Key
-if os.getenv("AZURE_OPENAI_API_KEY"):
-    AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-else:
-    AZURE_OPENAI_API_KEY = st.secrets["AZURE_OPENAI_API_KEY"]
-
-# Endpoint
-if os.getenv("AZURE_OPENAI_ENDPOINT"):
-    AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-else:
-    AZURE_OPENAI_ENDPOINT = st.secrets.get("AZURE_OPENAI_ENDPOINT", "https://agents-general.openai.azure.com")
-
-# Chat Completion Version
-if os.getenv("AZURE_OPENAI_CHAT_COMPLETION_VERSION"):
-    AZURE_OPENAI_CHAT_COMPLETION_VERSION = os.getenv("AZURE_OPENAI_CHAT_COMPLETION_VERSION")
-else:
-    AZURE_OPENAI_CHAT_COMPLETION_VERSION = st.secrets.get("AZURE_OPENAI_CHAT_COMPLETION_VERSION", "2024-08-01-preview")
-
-# Embeddings Version
-if os.getenv("AZURE_OPENAI_EMBEDDINGS_VERSION"):
-    AZURE_OPENAI_EMBEDDINGS_VERSION = os.getenv("AZURE_OPENAI_EMBEDDINGS_VERSION")
-else:
-    AZURE_OPENAI_EMBEDDINGS_VERSION = st.secrets.get("AZURE_OPENAI_EMBEDDINGS_VERSION", "2023-05-15")
-
-# Chat Model
-if os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT"):
-    CHAT_MODEL = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT")
-else:
-    CHAT_MODEL = st.secrets.get("AZURE_OPENAI_CHAT_DEPLOYMENT", "gpt-4o")
-
-# Embedding Model
-if os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"):
-    EMBEDDING_MODEL = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-else:
-    EMBEDDING_MODEL = st.secrets.get("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-3-large")
-
-if not AZURE_OPENAI_API_KEY:
-    raise RuntimeError("AZURE_OPENAI_API_KEY is not set in the environment.")
-
-# Chat client
-chat_client = AzureOpenAI(
-    api_key=AZURE_OPENAI_API_KEY,
-    api_version=AZURE_OPENAI_CHAT_COMPLETION_VERSION,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-)
+def _unwrap_index(index):
+    return index.index if isinstance(index, CompactIndex) else index
 
-# Embeddings client
-embedding_client = AzureOpenAI(
-    api_key=AZURE_OPENAI_API_KEY,
-    api_version=AZURE_OPENAI_EMBEDDINGS_VERSION,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-)
 
-# --------------------------
-# Main processing function
-# --------------------------
-def process_transcript(pdf_file, chunk_size=500, overlap=50):
+def _save_artifacts(cache_dir, lines, sections, chunks, embeddings, index, pools, topics_summaries, metadata):
+    save_json(path_in_cache(cache_dir, "lines.json"), lines)
+    save_json(path_in_cache(cache_dir, "sections.json"), sections)
+    save_json(path_in_cache(cache_dir, "chunks.json"), chunks)
+    if not os.path.exists(path_in_cache(cache_dir, "embeddings.npy")):  # may be written early for re-ranking
+        save_numpy(path_in_cache(cache_dir, "embeddings.npy"), embeddings)
+    save_faiss(path_in_cache(cache_dir, "faiss.index"), _unwrap_index(index))
+    for name, pool in pools.items():
+        save_faiss(path_in_cache(cache_dir, f"pool_{name}.index"), _unwrap_index(pool["index"]))
+    save_json(path_in_cache(cache_dir, "pools.json"), {name: pool["rows"] for name, pool in pools.items()})
+    save_json(path_in_cache(cache_dir, "topics_summaries.json"), topics_summaries)
+    # metadata.json is written last: its presence marks a complete cache entry
+    save_json(path_in_cache(cache_dir, "metadata.json"), metadata)
+
+
+def _load_artifacts(cache_dir, vector_opts=None, rerank=True, mmap=True):
     """
-    Process a transcript PDF end-to-end with disk cache by document hash.
-    Accepts an uploaded file object from Streamlit.
+    Load a cache entry. With ``mmap`` the embeddings and FAISS indexes are
+    memory-mapped instead of read, so an entry costs little more than its
+    chunk text until it is actually searched.
     """
+    topics_summaries = load_json(path_in_cache(cache_dir, "topics_summaries.json"))
+    chunks = load_json(path_in_cache(cache_dir, "chunks.json"))
+    embeddings = load_numpy(path_in_cache(cache_dir, "embeddings.npy"), mmap=mmap)
+    rerank_path = path_in_cache(cache_dir, "embeddings.npy") if (rerank and vector_opts) else None
 
-    # Compute document hash for cache key
-    file_bytes = pdf_file.read()
-    pdf_file.seek(0)
-    print("PDF Read Completed")
-    doc_id = compute_doc_id(file_bytes)
-
-    # Step 1: Extract text
-    transcript_lines = extract_pdf_text(pdf_file)  # returns list of dict lines
+    def wrap(index, rows=None):
+        return CompactIndex(index, rerank_path=rerank_path, rows=rows, **vector_opts) if vector_opts else index
 
-    print("Text Extracted")
+    index = wrap(load_faiss(path_in_cache(cache_dir, "faiss.index"), mmap=mmap))
 
-    # Step 2: Split into sections
-    metadata, opening_remarks_lines, qa_lines = split_transcript_metadata_opening_qa(transcript_lines)
+    pools_path = path_in_cache(cache_dir, "pools.json")
+    if os.path.exists(pools_path):
+        pools = {
+            name: {
+                "index": wrap(load_faiss(path_in_cache(cache_dir, f"pool_{name}.index"), mmap=mmap), rows),
+                "chunks": [chunks[i] for i in rows],
+                "rows": rows,
+                "lexical": BM25Index.build([chunks[i]["text"] for i in rows]),
+            }
+            for name, rows in load_json(pools_path).items()
+        }
+    else:
+        # Entries written before pool indexes were persisted
+        pools = _build_pools(embeddings, chunks, vector_opts=vector_opts, rerank_path=rerank_path)
 
-    sections = {
-        "Opening Remarks": opening_remarks_lines,
-        "Q&A": qa_lines
+    return {
+        "sections": load_json(path_in_cache(cache_dir, "sections.json")),
+        "chunks": chunks,
+        "embeddings": embeddings,
+        "faiss_index": index,
+        "pools": pools,
+        "topics_summaries": topics_summaries,
+        "topics_items": {name: parse_topics_block(block) for name, block in topics_summaries.items()},
+        "summary": load_json(path_in_cache(cache_dir, "metadata.json")),
     }
-    print("Sections Split")
 
-    all_chunks = []
-    chunk_id = 0
 
-    # 1️⃣ Metadata chunks (500 words, 50 overlap)
-    metadata_chunks, chunk_id = chunk_metadata(metadata, chunk_size=500, overlap=50, start_chunk_id=chunk_id)
-    all_chunks.extend(metadata_chunks)
+# --------------------------
+# Pipeline stages
+# --------------------------
+SECTION_NAMES = (OPENING_REMARKS, QA)
+
+# Retrieval pools get their own FAISS sub-index (and BM25 index) at ingest time, so a
+# filtered query only searches (and returns row ids into) the chunks it is allowed to use.
+RETRIEVAL_POOLS = {
+    "metadata": lambda c: "Metadata" in str(c.get("chunk_id", "")),
+    "chat": lambda c: c.get("role", "").lower() == "answer" or "opening" in c.get("section", "").lower(),
+}
+
 
-    # 2️⃣ Speaker-level chunks for Opening Remarks + Q&A
-    for section_name, lines in sections.items():
-        section_chunks, chunk_id , state = speaker_level_chunks(lines, section=section_name, start_chunk_id=chunk_id)
-        all_chunks.extend(section_chunks)
+def _build_pools(embeddings, chunks, names=tuple(RETRIEVAL_POOLS), vector_opts=None, rerank_path=None):
+    vector_opts = vector_opts or {}
+    pools = {}
+    for name in names:
+        pool = build_pool_index(embeddings, chunks, RETRIEVAL_POOLS[name], rerank_path=rerank_path, **vector_opts)
+        # BM25 over the same rows, for lexical/hybrid retrieval
+        pool["lexical"] = BM25Index.build([c["text"] for c in pool["chunks"]])
+        pools[name] = pool
+    return pools
 
-    print("Chunks Created")
 
-    # Step 4.5: Initial document metadata (for management participants) after chunking but before index
-    embeddings = embed_text([chunk["text"] for chunk in all_chunks], client=embedding_client)
-    index = build_faiss_index(embeddings)
-    prelim_summary = extract_document_metadata(transcript_lines, all_chunks, index, embedding_client, chat_client)
-    print("FAISS Index Built")
+def _vector_opts(vector_dim, vector_codec):
+    # None means the default full-precision IndexFlatIP path
+    if vector_dim is None and vector_codec == "float32":
+        return None
+    return {"dim": vector_dim, "codec": vector_codec}
 
-    # Use participants list to mark management speakers
+
+def assign_roles(chunks, summary):
+    """Mark Q&A chunks spoken by the management participants in ``summary`` as "answer", others "question"."""
     management_names = set()
-    for p in (prelim_summary.get("participants") or []):
+    for p in (summary.get("participants") or []):
         # keep the name part before comma/role if present
         name = p.split(",")[0].strip()
         if name:
             management_names.add(name.lower())
 
-    for c in all_chunks:
+    for c in chunks:
         spk = (c.get("speaker") or "").lower()
         
         if c.get("section") == "Q&A":
@@ -142,31 +141,276 @@ def process_transcript(pdf_file, chunk_size=500, overlap=50):
             else:
                 c["role"] = "question"
 
-    # Step 4: Generate topics and summaries per section (needed for per-topic sources)
+
+def _topics_stage(section_name, chat_client, chat_model):
+    def run(r):
+        block = generate_topics_and_summaries(r["extract"]["sections"][section_name], model=chat_model,
+                                              client=chat_client)
+        logger.info("Topics generated: %s", section_name)
+        return block
+    return run
+
+
+def _extract_and_split(pdf_file, chunk_size, overlap, workers=1, engine=None, chunk_mode="speaker"):
+    # Section splitting and chunking consume lines as each page is extracted
+    # instead of waiting for the whole PDF to be parsed; the seconds spent in
+    # each step are recorded as the extract stage's "parts"
+    if workers > 1:
+        lines_iter = iter_pdf_lines_parallel(pdf_file, workers=workers, engine=engine)
+    else:
+        lines_iter = iter_pdf_lines(pdf_file, engine=engine)
+    lines = []
+    metadata = []
+    sections = {name: [] for name in SECTION_NAMES}
+
+    def collect(section_lines):
+        # The line lists are still needed for metadata, topics and the cache
+        for section, line in section_lines:
+            lines.append(line)
+            (metadata if section == METADATA else sections[section]).append(line)
+            yield section, line
+
+    chunker = iter_token_chunks if chunk_mode == "tokens" else iter_transcript_chunks
+    seconds = {}
+    section_lines = timed_iter(iter_section_lines(timed_iter(lines_iter, seconds, "pdf")), seconds, "split")
+    chunks = list(timed_iter(chunker(collect(section_lines), chunk_size, overlap), seconds, "chunk"))
+    # Each step's time includes the steps it pulls from
+    annotate("parts", {
+        "pdf_s": round(seconds["pdf"], 4),
+        "split_s": round(seconds["split"] - seconds["pdf"], 4),
+        "chunk_s": round(seconds["chunk"] - seconds["split"], 4),
+    })
+    return {"lines": lines, "metadata": metadata, "sections": sections, "chunks": chunks}
+
+
+def build_stages(pdf_file, chunk_size, overlap, clients, vector_opts=None, rerank_path=None,
+                 extract_workers=1, extract_engine=None, chunk_mode="speaker"):
+    """
+    The pipeline's stage graph (see scripts.stage_graph) for prepare_clients' ``clients``:
+
+    extract (streamed with split + chunking) → embed → index → metadata pool → metadata (+ Q&A roles) → chat pool
+                                            ↘ topics per section (independent of the embedding branch)
+    """
+    chat_client, embedding_client = clients["chat_client"], clients["embedding_client"]
+    chat_model, embedding_model = clients["chat_model"], clients["embedding_model"]
+
+    def metadata(r):
+        pool = r["pool:metadata"]
+        summary = extract_document_metadata(r["extract"]["lines"], pool["chunks"], pool["index"], embedding_client,
+                                            chat_client, chat_model=chat_model, embedding_model=embedding_model)
+        assign_roles(r["extract"]["chunks"], summary)
+        return summary
+
+    def index(r):
+        if not vector_opts:
+            return build_faiss_index(r["embed"])
+        faiss.normalize_L2(r["embed"])
+        if rerank_path:
+            # Re-ranking reads full vectors from disk, so they must exist before the first query
+            save_numpy(rerank_path, r["embed"])
+        return CompactIndex.build(r["embed"], rerank_path=rerank_path, **vector_opts)
+
+    def pool(name):
+        return lambda r: _build_pools(r["embed"], r["extract"]["chunks"], [name], vector_opts, rerank_path)[name]
+
+    stages = {
+        "extract": ((), lambda r: _extract_and_split(pdf_file, chunk_size, overlap, extract_workers,
+                                                          extract_engine, chunk_mode)),
+        "embed": (("extract",), lambda r: embed_text([chunk["text"] for chunk in r["extract"]["chunks"]],
+                                                     client=embedding_client, model=embedding_model)),
+        "index": (("embed",), index),
+        "pool:metadata": (("extract", "index"), pool("metadata")),
+        "metadata": (("extract", "pool:metadata"), metadata),
+        # The chat pool depends on the Q&A roles assigned in the metadata stage
+        "pool:chat": (("metadata",), pool("chat")),
+    }
+    for section_name in SECTION_NAMES:
+        stages[f"topics:{section_name}"] = (("extract",), _topics_stage(section_name, chat_client, chat_model))
+    return stages
+
+
+# --------------------------
+# Main processing function
+# --------------------------
+def _resolve_models(chat_model, embedding_model, defaults=None):
+    if not (chat_model and embedding_model):
+        defaults = defaults or load_settings()
+        chat_model = chat_model or defaults["chat_model"]
+        embedding_model = embedding_model or defaults["embedding_model"]
+    return chat_model, embedding_model
+
+
+def prepare_clients(chat_client, embedding_client, chat_model, embedding_model, use_cache=True, asynchronous=False):
+    """
+    Client and model fields of a run's result. Clients and model names not
+    given come from scripts.clients (the async clients with ``asynchronous``).
+    """
+    defaults = None
+    if chat_client is None or embedding_client is None:
+        defaults = get_async_clients() if asynchronous else get_clients()
+        chat_client = chat_client or defaults["chat_client"]
+        embedding_client = embedding_client or defaults["embedding_client"]
+    chat_model, embedding_model = _resolve_models(chat_model, embedding_model, defaults)
+    # API calls and tokens are counted against the stage making them; repeated
+    # chat requests are answered by the completion cache and never reach the API
+    chat_client = instrument(chat_client)
+    if use_cache:
+        chat_client = cache_completions(chat_client, asynchronous=asynchronous)
+    return {
+        "embedding_client": instrument(embedding_client),
+        "chat_client": chat_client,
+        "chat_model": chat_model,
+        "embedding_model": embedding_model
+    }
+
+
+def prepare_run(pdf_file, chunk_size, overlap, cache_dir, use_cache, vector_dim, vector_codec, rerank,
+                extract_engine, chunk_mode, chat_model, embedding_model):
+    """Document hash, cache key and cache paths for one run."""
+    if chunk_mode not in CHUNK_MODES:
+        raise ValueError(f"Unknown chunk mode '{chunk_mode}', expected one of {CHUNK_MODES}")
+    file_bytes = pdf_file.read()
+    pdf_file.seek(0)
+    doc_id = compute_doc_id(file_bytes)
+
+    cache_key = compute_cache_key(doc_id, {
+        "chat_model": chat_model,
+        "embedding_model": embedding_model,
+        "chunk_size": chunk_size,
+        "overlap": overlap,
+        "chunk_mode": chunk_mode,
+        "vector_dim": vector_dim,
+        "vector_codec": vector_codec,
+        "extract_engine": extract_engine or DEFAULT_ENGINE,
+    })
+    doc_cache_dir = get_cache_dir(cache_dir, cache_key) if use_cache else None
+    vector_opts = _vector_opts(vector_dim, vector_codec)
+    return {
+        "doc_id": doc_id,
+        "cache_key": cache_key,
+        "cache_dir": doc_cache_dir,
+        "vector_opts": vector_opts,
+        "rerank_path": path_in_cache(doc_cache_dir, "embeddings.npy") if (doc_cache_dir and rerank and vector_opts) else None,
+    }
+
+
+def cached_result(run, rerank, mmap, corpus, resident, metrics, clients):
+    """The result served from a complete disk cache entry; None if there is none."""
+    if not (run["cache_dir"] and has_cached_artifacts(run["cache_dir"])):
+        return None
+    t0 = time.perf_counter()
+    with stage("load_cache", metrics):
+        cached = _load_artifacts(run["cache_dir"], run["vector_opts"], rerank, mmap=mmap)
+    elapsed = round(time.perf_counter() - t0, 4)
+    logger.info("Loaded from cache: %s", run["cache_key"])
+    if corpus is not None:
+        corpus.add_document(run["doc_id"], cached["chunks"], cached["embeddings"], cached["summary"])
+    result = {
+        "doc_id": run["doc_id"],
+        "cache_key": run["cache_key"],
+        "cache_hit": True,
+        "summary": cached["summary"],
+        "sections": cached["sections"],
+        "chunks": cached["chunks"],
+        "token_stats": token_stats(cached["chunks"]),
+        "topics_summaries": cached["topics_summaries"],
+        "topics_items": cached["topics_items"],
+        "faiss_index": cached["faiss_index"],
+        "pools": cached["pools"],
+        "timings": {"load_cache": elapsed, "total": elapsed},
+        "metrics": metrics.log("process_transcript", doc_id=run["doc_id"], cache_hit=True),
+        **clients,
+    }
+    if resident is not None:
+        resident.put(run["cache_key"], result, estimate_resident_bytes(result, mmap=mmap))
+    return result
+
+
+def processed_result(run, results, timings, corpus, resident, metrics, clients):
+    """Persist the outputs of the stage graph and assemble the result."""
+    logger.info("Pipeline completed: %s", run["doc_id"])
+
+    transcript_lines = results["extract"]["lines"]
+    sections = results["extract"]["sections"]
+    all_chunks = results["extract"]["chunks"]
+    embeddings = results["embed"]
+    index = results["index"]
+    prelim_summary = results["metadata"]
+    pools = {name: results[f"pool:{name}"] for name in RETRIEVAL_POOLS}
+
     topics_summaries = {}
     topics_items = {}
-    for section_name, lines in sections.items():
-        block = generate_topics_and_summaries(
-            lines, client=chat_client
-        )
+    for section_name in SECTION_NAMES:
+        block = results[f"topics:{section_name}"]
         topics_summaries[section_name] = block
-        items = parse_topics_block(block)
-        topics_items[section_name] = items
-        
-    print("Topics and Summaries Generated")
+        topics_items[section_name] = parse_topics_block(block)
+
+    # Persist artifacts so the next upload/restart skips all of the above
+    if run["cache_dir"]:
+        with stage("save_cache", metrics):
+            _save_artifacts(
+                run["cache_dir"], transcript_lines, sections, all_chunks,
+                embeddings, index, pools, topics_summaries, prelim_summary
+            )
+        logger.info("Artifacts cached: %s", run["cache_key"])
+
+    if corpus is not None:
+        corpus.add_document(run["doc_id"], all_chunks, embeddings, prelim_summary)
 
     # Return full processed structure
-    return {
-        "doc_id": doc_id,
+    result = {
+        "doc_id": run["doc_id"],
+        "cache_key": run["cache_key"],
         "cache_hit": False,
         "summary": prelim_summary,
         "sections": sections,
         "chunks": all_chunks,
+        "token_stats": token_stats(all_chunks),
         "topics_summaries": topics_summaries,
         "topics_items": topics_items,
         "faiss_index": index,
-        "embedding_client": embedding_client,
-        "chat_client": chat_client,
-        "chat_model": CHAT_MODEL,
-        "embedding_model": EMBEDDING_MODEL
+        "pools": pools,
+        "timings": timings,
+        "metrics": metrics.log("process_transcript", doc_id=run["doc_id"], cache_hit=False, total_s=timings["total"]),
+        **clients,
     }
+    if resident is not None:
+        resident.put(run["cache_key"], result)
+    return result
+
+
+def process_transcript(pdf_file, chunk_size=500, overlap=50, cache_dir=CACHE_DIR, use_cache=True, corpus=None,
+                       vector_dim=None, vector_codec="float32", rerank=True, mmap=True, resident=None,
+                       extract_workers=1, extract_engine=None, chunk_mode="speaker",
+                       chat_client=None, embedding_client=None, chat_model=None, embedding_model=None):
+    """
+    Process a transcript PDF end-to-end with disk cache by document hash.
+    Accepts an uploaded file object from Streamlit.
+
+    chunk_size/overlap/chunk_mode shape the chunks; extract_workers and
+    extract_engine the PDF parsing; vector_dim/vector_codec/rerank/mmap the
+    indexes (see scripts.vector_store). ``corpus`` (a CorpusIndex) and
+    ``resident`` (a ResidentDocuments) also receive the result.
+    ``use_cache=False`` bypasses the disk and completion caches. Clients
+    and model names not given come from scripts.clients.
+    """
+    clients = prepare_clients(chat_client, embedding_client, chat_model, embedding_model, use_cache)
+    metrics = Metrics()
+
+    run = prepare_run(pdf_file, chunk_size, overlap, cache_dir, use_cache, vector_dim, vector_codec, rerank,
+                      extract_engine, chunk_mode, clients["chat_model"], clients["embedding_model"])
+    # Concurrent requests for one document wait for the first load instead of repeating it
+    with resident.loading(run["cache_key"]) if resident is not None else nullcontext():
+        if resident is not None:
+            hot = resident.get(run["cache_key"])
+            if hot is not None:
+                return hot
+
+        cached = cached_result(run, rerank, mmap, corpus, resident, metrics, clients)
+        if cached is not None:
+            return cached
+
+        stages = build_stages(pdf_file, chunk_size, overlap, clients, run["vector_opts"], run["rerank_path"],
+                              extract_workers, extract_engine, chunk_mode)
+        results, timings = run_stage_graph(stages, metrics=metrics)
+        return processed_result(run, results, timings, corpus, resident, metrics, clients)
@@ -1,38 +1,170 @@
 import faiss
 from scripts.embedding_faiss import embed_text
+from scripts.embedding_cache import get_query_embedding_cache
+from scripts.lexical_index import BM25Index
 
-def query_index(question, index, chunks, client, top_k=5, context_window=2):
-    question = (question or "").strip()
-    if not question:
-        return []
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+# Fusion defaults picked with benchmarks/retrieval.py; re-tune there with
+# --cache-entry on real transcripts
+RRF_K = 10
+LEXICAL_WEIGHT = 0.5
 
-    # Embed the question
-    q_emb = embed_text([question], client=client)
+NO_CONTEXT_ANSWER = "I'm unable to find relevant context for this question."
+# Returned when the completion call fails; never worth caching
+UNAVAILABLE_ANSWER = "I'm unable to generate an answer at the moment."
+
+def fuse_rankings(rankings, weights=None, rrf_k=RRF_K):
+    """
+    Reciprocal rank fusion of best-first [(row, score), ...] lists. Scores
+    are normalized so a row ranked first by every list scores 1.0.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, (row, _) in enumerate(ranking):
+            fused[row] = fused.get(row, 0.0) + weight / (rrf_k + rank + 1)
+    best = sum(weights) / (rrf_k + 1)
+    return sorted(((row, score / best) for row, score in fused.items()), key=lambda x: x[1], reverse=True)
+
+def _hit_details(vector_hits=(), lexical_hits=()):
+    # Raw per-row scores kept for display and confidence; ranking uses the fused score
+    details = {}
+    for row, score in vector_hits:
+        details.setdefault(row, {})["similarity"] = score
+    for row, score in lexical_hits:
+        details.setdefault(row, {})["bm25"] = score
+    return details
+
+def _embed_questions(questions, client, model, use_cache):
+    # Embed the questions (shared process/disk cache across sessions and documents)
+    if use_cache:
+        q_emb = get_query_embedding_cache().embed(questions, client=client, model=model)
+    else:
+        q_emb = embed_text(questions, client=client, model=model)
     faiss.normalize_L2(q_emb)
+    return q_emb
+
+def plan_retrieval(questions, chunks, top_k, mode, lexical):
+    """
+    First half of retrieve_batch, before any embedding call: the lexical
+    pass answers what BM25 can; plan["need_vectors"] lists the questions
+    still to embed (plan["questions"][i] for each i).
+    """
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}', expected one of {RETRIEVAL_MODES}")
+    questions = [(q or "").strip() for q in questions]
+    asked = [i for i, q in enumerate(questions) if q]
+    plan = {"questions": questions, "hits": {}, "details": {}, "lexical_hits": {}, "k": top_k}
+
+    if mode == "vector":
+        plan["need_vectors"] = asked
+        return plan
+    if lexical is None:
+        lexical = BM25Index.build([c["text"] for c in chunks])
+    plan["k"] = max(top_k * 4, 20)
+    plan["lexical_hits"] = lexical_hits = {i: lexical.search(questions[i], plan["k"]) for i in asked}
+    plan["need_vectors"] = []
+    for i in asked:
+        if mode == "lexical" or lexical.is_confident(questions[i], lexical_hits[i]):
+            # Scores relative to the best lexical hit
+            best = lexical_hits[i][0][1] if lexical_hits[i] else 1.0
+            plan["hits"][i] = [(row, score / best) for row, score in lexical_hits[i][:top_k]]
+            plan["details"][i] = _hit_details(lexical_hits=lexical_hits[i])
+        else:
+            plan["need_vectors"].append(i)
+    return plan
+
+def finish_retrieval(plan, q_emb, index, chunks, top_k, context_window, mode, rrf_k, lexical_weight):
+    """
+    Second half of retrieve_batch: the vector search over ``q_emb`` (the
+    normalized embeddings of plan["need_vectors"], in order), fusion and
+    context windows.
+    """
+    hits = plan["hits"]
+    if plan["need_vectors"]:
+        D, I = index.search(q_emb, plan["k"])
+        for i, ids, scores in zip(plan["need_vectors"], I, D):
+            vector_hits = [(int(r), float(d)) for r, d in zip(ids, scores) if r >= 0]
+            if mode == "vector":
+                hits[i] = vector_hits
+                plan["details"][i] = _hit_details(vector_hits)
+            else:
+                hits[i] = fuse_rankings([vector_hits, plan["lexical_hits"][i]], [1.0, lexical_weight], rrf_k)[:top_k]
+                plan["details"][i] = _hit_details(vector_hits, plan["lexical_hits"][i])
+
+    return [
+        merge_context_windows(hits[i], chunks, top_k=top_k, context_window=context_window,
+                              details=plan["details"].get(i)) if i in hits else []
+        for i in range(len(plan["questions"]))
+    ]
+
+def retrieve_batch(questions, index, chunks, client, top_k=5, context_window=2,
+                   model="text-embedding-3-large", use_cache=True, mode="vector", lexical=None,
+                   rrf_k=RRF_K, lexical_weight=LEXICAL_WEIGHT):
+    """
+    query_index for a list of questions: the questions that need vectors are
+    embedded in one call and searched with one matrix FAISS search. Returns
+    one result list per question; empty questions get [].
+    """
+    plan = plan_retrieval(questions, chunks, top_k, mode, lexical)
+    q_emb = None
+    if plan["need_vectors"]:
+        q_emb = _embed_questions([plan["questions"][i] for i in plan["need_vectors"]], client, model, use_cache)
+    return finish_retrieval(plan, q_emb, index, chunks, top_k, context_window, mode, rrf_k, lexical_weight)
+
+def query_index(question, index, chunks, client, top_k=5, context_window=2,
+                model="text-embedding-3-large", use_cache=True, mode="vector", lexical=None,
+                rrf_k=RRF_K, lexical_weight=LEXICAL_WEIGHT):
+    """
+    Retrieve context for ``question`` from ``chunks`` (rows of ``index``).
 
-    # Search FAISS index
-    D, I = index.search(q_emb, top_k)
+    mode="vector" is plain cosine search. "lexical" ranks with the BM25
+    index only (no embedding call; scores are relative to the best hit).
+    "hybrid" fuses both rankings with reciprocal rank fusion, but skips the
+    embedding call when the lexical ranking alone is confident (every query
+    term in one clearly-best chunk, e.g. a ticker or an exact figure).
 
+    "score" is the ranking value of the mode, so only comparable within one
+    result list. Each result also carries the best cosine "similarity" and
+    raw "bm25" score of its chunks (None where that ranking was not used).
+    """
+    return retrieve_batch([question], index, chunks, client, top_k=top_k, context_window=context_window,
+                          model=model, use_cache=use_cache, mode=mode, lexical=lexical,
+                          rrf_k=rrf_k, lexical_weight=lexical_weight)[0]
+
+def _max_known(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+def merge_context_windows(hits, chunks, top_k=5, context_window=2, details=None):
+    """
+    Expand (row, score) hits into +/- context_window neighbours within
+    ``chunks``, merge overlapping ranges and return them best-first.
+    ``details`` maps rows to their raw {"similarity", "bm25"} scores.
+    """
+    details = details or {}
     # Build context ranges
     ranges = []
-    for score, idx in zip(D[0], I[0]):
+    for idx, score in hits:
         if 0 <= idx < len(chunks):
             start = max(0, idx - context_window)
             end = min(len(chunks), idx + context_window + 1)
-            ranges.append((start, end, float(score)))
+            raw = details.get(idx, {})
+            ranges.append((start, end, float(score), raw.get("similarity"), raw.get("bm25")))
 
     # Sort ranges by start
-    ranges.sort()
+    ranges.sort(key=lambda r: r[:3])
 
     # Merge overlapping ranges
     merged = []
-    for start, end, score in ranges:
+    for start, end, score, similarity, bm25 in ranges:
         if not merged or start > merged[-1]["end"]:
-            merged.append({"start": start, "end": end, "score": score})
+            merged.append({"start": start, "end": end, "score": score, "similarity": similarity, "bm25": bm25})
         else:
             # Merge overlapping
             merged[-1]["end"] = max(merged[-1]["end"], end)
             merged[-1]["score"] = max(merged[-1]["score"], score)  # take max score
+            merged[-1]["similarity"] = _max_known(merged[-1]["similarity"], similarity)
+            merged[-1]["bm25"] = _max_known(merged[-1]["bm25"], bm25)
 
     # Build final results
     results = []
@@ -42,6 +174,8 @@ def query_index(question, index, chunks, client, top_k=5, context_window=2):
         last_chunk = chunks[m["end"] - 1]
         results.append({
             "score": m["score"],
+            "similarity": None if m["similarity"] is None else float(m["similarity"]),
+            "bm25": None if m["bm25"] is None else float(m["bm25"]),
             "chunk_id": [chunks[i].get("chunk_id") for i in range(m["start"], m["end"])],
             "text": text,
             "start_page": first_chunk.get("start_page"),
@@ -56,7 +190,8 @@ def query_index(question, index, chunks, client, top_k=5, context_window=2):
     results = sorted(results, key=lambda x: x["score"], reverse=True)
     return results[:top_k]
 
-def _format_answer(answer_text, retrieved):
+def format_answer(answer_text, retrieved):
+    """Answer dict for ``retrieved`` chunks: the text (or a fallback), sources, confidence and bm25."""
     answer_text = (answer_text or "").strip()
     if not answer_text:
         answer_text = "I'm unable to find a confident answer in the provided transcript."
@@ -68,13 +203,14 @@ def _format_answer(answer_text, retrieved):
             return f"p.{sp} L{sl}-{el} (Chunk {c.get('chunk_id')})"
         return f"p.{sp} L{sl} - p.{ep} L{el} (Chunk {c.get('chunk_id')})"
     sources = [format_src(c) for c in retrieved] if retrieved else []
-    confidence = max([c["score"] for c in retrieved], default=0.0)
-    return {"answer": answer_text, "sources": sources, "confidence": confidence}
-
-def generate_answer(question, retrieved_chunks, client, model="gpt-4o"):
-    if not retrieved_chunks:
-        return _format_answer("I'm unable to find relevant context for this question.", retrieved_chunks)
+    # Cosine similarity of the best chunk; None when only BM25 ranked the context
+    # (then "bm25" holds the best raw BM25 score). Never the fused ranking score.
+    similarities = [c["similarity"] for c in retrieved or [] if c.get("similarity") is not None]
+    bm25 = [c["bm25"] for c in retrieved or [] if c.get("bm25") is not None]
+    confidence = max(similarities) if similarities else (None if bm25 else 0.0)
+    return {"answer": answer_text, "sources": sources, "confidence": confidence, "bm25": max(bm25, default=None)}
 
+def _answer_messages(question, retrieved_chunks):
     context_text = "\n\n".join([
         f"[{c['chunk_id']}] (p.{c.get('start_page')} L{c.get('start_line')} - p.{c.get('end_page')} L{c.get('end_line')}) {c['text']}"
         for c in retrieved_chunks
@@ -92,15 +228,62 @@ def generate_answer(question, retrieved_chunks, client, model="gpt-4o"):
 
     Answer:
     """
+    return [{"role": "system", "content": "Be concise, factual, and avoid hallucinations."},
+            {"role": "user", "content": prompt}]
+
+def answer_request(question, retrieved_chunks):
+    """chat.completions.create arguments (except the model) for an answer from ``retrieved_chunks``."""
+    return {"messages": _answer_messages(question, retrieved_chunks), "temperature": 0.2, "max_tokens": 300}
+
+def generate_answer(question, retrieved_chunks, client, model="gpt-4o"):
+    if not retrieved_chunks:
+        return format_answer(NO_CONTEXT_ANSWER, retrieved_chunks)
+
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "system", "content": "Be concise, factual, and avoid hallucinations."},
-                      {"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=300
-        )
+        resp = client.chat.completions.create(model=model, **answer_request(question, retrieved_chunks))
         content = (resp.choices[0].message.content or "").strip()
-        return _format_answer(content, retrieved_chunks)
+        return format_answer(content, retrieved_chunks)
     except Exception:
-        return _format_answer("I'm unable to generate an answer at the moment.", retrieved_chunks)
+        return format_answer(UNAVAILABLE_ANSWER, retrieved_chunks)
+
+def stream_answer(question, retrieved_chunks, client, model="gpt-4o"):
+    """
+    Streaming variant of generate_answer. Returns the same dict right away,
+    with "sources" and "confidence" filled in and a "tokens" generator that
+    yields answer text as the model produces it; "answer" is set once the
+    generator is exhausted. "complete" turns True only when the model's
+    stream ran to the end; a stream cut off by an error keeps the partial
+    text as the answer but stays incomplete (and is not worth caching).
+    """
+    result = format_answer(None, retrieved_chunks)
+    result["answer"] = None
+    result["complete"] = False
+
+    def tokens():
+        parts = []
+        complete = True
+        if not retrieved_chunks:
+            parts.append(NO_CONTEXT_ANSWER)
+            yield parts[0]
+        else:
+            try:
+                stream = client.chat.completions.create(model=model, stream=True,
+                                                        **answer_request(question, retrieved_chunks))
+                for event in stream:
+                    # Azure sends content-filter events with no choices
+                    delta = event.choices[0].delta.content if event.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            except Exception:
+                complete = False
+                if not parts:
+                    parts.append(UNAVAILABLE_ANSWER)
+                    yield parts[0]
+        result["answer"] = format_answer("".join(parts), retrieved_chunks)["answer"]
+        result["complete"] = complete and bool("".join(parts).strip())
+        if not "".join(parts).strip():
+            yield result["answer"]
+
+    result["tokens"] = tokens()
+    return result
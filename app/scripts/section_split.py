@@ -1,6 +1,9 @@
-from rapidfuzz import fuzz
+from itertools import islice
 import re
 
+import numpy as np
+from rapidfuzz import fuzz, process
+
 SPEAKER_REGEX = re.compile(r"^([A-Z][a-zA-Z\.]*(?:\s[A-Z][a-zA-Z\.]*)*):\s")
 
 OPENING_PHRASES = [
@@ -22,53 +25,102 @@ QA_CUES = [
 ]
 
 
-def split_transcript_metadata_opening_qa(lines):
-    metadata, opening_remarks, qa = [], [], []
+METADATA, OPENING_REMARKS, QA = "Metadata", "Opening Remarks", "Q&A"
+
+MATCH_THRESHOLD = 85
+BATCH_LINES = 128
+MODERATOR_ROLES = ("moderator", "coordinator")
+
+# Exact occurrences score 100 with partial_ratio, so one regex pass settles
+# cue lines before any fuzzy scoring. Every other line is still scored: a
+# lossless prefilter (shared character bigrams) keeps >99% of real lines and
+# costs more than the batched cdist it would save.
+_OPENING_EXACT = re.compile("|".join(map(re.escape, OPENING_PHRASES)))
+_QA_EXACT = re.compile("|".join(map(re.escape, QA_CUES)))
+
+
+def _cue_hits(texts, exact, cues):
+    """Per text: does any cue score partial_ratio > MATCH_THRESHOLD against it."""
+    hits = np.fromiter((exact.search(t) is not None for t in texts), dtype=bool, count=len(texts))
+    rest = np.flatnonzero(~hits)
+    if len(rest):
+        # One batched C++ call for the remaining lines x cues; float64 so
+        # scores at the threshold compare exactly as fuzz.partial_ratio does
+        scores = process.cdist([texts[i] for i in rest], cues, scorer=fuzz.partial_ratio,
+                               score_cutoff=MATCH_THRESHOLD, dtype=np.float64)
+        hits[rest] = (scores > MATCH_THRESHOLD).any(axis=1)
+    return hits
+
+
+def _is_moderator(text):
+    speaker_match = SPEAKER_REGEX.match(text)
+    return bool(speaker_match) and any(role in speaker_match.group(1).lower() for role in MODERATOR_ROLES)
+
+
+def _first_opening(block):
+    texts = [line["text"].strip() for line in block]
+    for i, text in enumerate(texts):
+        if _is_moderator(text):
+            # Only lines before the first moderator line need phrase scoring
+            texts = texts[:i]
+            break
+    else:
+        i = None
+    hits = np.flatnonzero(_cue_hits([t.lower() for t in texts], _OPENING_EXACT, OPENING_PHRASES))
+    return int(hits[0]) if len(hits) else i
 
+
+def _first_qa(block):
+    hits = np.flatnonzero(_cue_hits([line["text"].lower() for line in block], _QA_EXACT, QA_CUES))
+    return int(hits[0]) if len(hits) else None
+
+
+def iter_section_lines(lines, batch_size=BATCH_LINES):
+    """
+    Streaming section splitter: yields (section, line) as lines arrive, so
+    it can run while later pages are still being extracted.
+
+    Lines are Metadata until the first moderator/coordinator speaker line or
+    opening phrase, Opening Remarks from there until the first Q&A cue, and
+    Q&A afterwards. Cue matching runs on blocks of ``batch_size`` lines.
+    """
+    lines = iter(lines)
     first_opening_found = False
-    remainder = []
-
-    # Step 1️⃣ Split metadata vs transcript body
-    for line in lines:
-        text = line["text"].strip()
-        speaker_match = SPEAKER_REGEX.match(text)
-
-        # Speaker identified (Moderator/Operator/Coordinator, etc.)
-        if speaker_match:
-            speaker_name = speaker_match.group(1).lower()
-            if any(role in speaker_name for role in ["moderator", "coordinator"]):
-                first_opening_found = True
-                remainder.append(line)
-                continue
 
-        # Phrase-based detection (no strict speaker needed)
-        lowered = text.lower()
+    while True:
+        block = list(islice(lines, batch_size))
+        if not block:
+            return
+
         if not first_opening_found:
-            if any(fuzz.partial_ratio(lowered, phrase) > 85 for phrase in OPENING_PHRASES):
-                first_opening_found = True
-                remainder.append(line)
-            else:
-                metadata.append(line)
-        else:
-            remainder.append(line)
-
-    if not first_opening_found:
-        # No moderator/operator or opening phrase → everything is metadata
-        return metadata, [], []
-
-    # Step 2️⃣ Detect Q&A start
-    split_index = None
-    for i, row in enumerate(remainder):
-        lowered = row["text"].lower()
-        if any(fuzz.partial_ratio(lowered, cue) > 85 for cue in QA_CUES):
-            split_index = i
-            break
+            start = _first_opening(block)
+            if start is None:
+                for line in block:
+                    yield METADATA, line
+                continue
+            first_opening_found = True
+            for line in block[:start]:
+                yield METADATA, line
+            block = block[start:]
 
-    if split_index is not None:
-        opening_remarks = remainder[:split_index]
-        qa = remainder[split_index:]
-    else:
-        opening_remarks = remainder
-        qa = []
+        # Detect Q&A start (the opening line itself may already be a cue)
+        qa_start = _first_qa(block)
+        if qa_start is None:
+            for line in block:
+                yield OPENING_REMARKS, line
+            continue
+        for line in block[:qa_start]:
+            yield OPENING_REMARKS, line
+        for line in block[qa_start:]:
+            yield QA, line
+        # Everything after the first cue is Q&A: no more matching needed
+        for line in lines:
+            yield QA, line
+        return
 
-    return metadata, opening_remarks, qa
+
+def split_transcript_metadata_opening_qa(lines):
+    parts = {METADATA: [], OPENING_REMARKS: [], QA: []}
+    for section, line in iter_section_lines(lines):
+        parts[section].append(line)
+    return parts[METADATA], parts[OPENING_REMARKS], parts[QA]
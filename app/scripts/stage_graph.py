@@ -0,0 +1,123 @@
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from scripts.metrics import Metrics, stage
+
+# name -> (names of stages it depends on, fn(results_so_far) -> stage result)
+StageSpec = Tuple[Iterable[str], Callable[[Dict[str, Any]], Any]]
+
+
+def _dependencies(stages: Dict[str, StageSpec]) -> Dict[str, set]:
+    deps = {name: set(spec[0]) for name, spec in stages.items()}
+    for name, needed in deps.items():
+        unknown = needed - stages.keys()
+        if unknown:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {sorted(unknown)}")
+    return deps
+
+
+def run_stage_graph(stages: Dict[str, StageSpec], max_workers: int = 4, metrics: Optional[Metrics] = None):
+    """
+    Run a small dependency graph of pipeline stages. Every stage starts as
+    soon as all of its dependencies have finished, so independent branches
+    overlap and the wall-clock time is that of the longest branch.
+
+    Returns (results, timings) where timings maps stage name -> seconds and
+    "total" -> wall-clock seconds for the whole graph. The first stage error
+    is re-raised once running stages have finished. With ``metrics`` each
+    stage runs inside metrics.stage(name), so its CPU time, API calls and
+    retries are recorded too.
+    """
+    deps = _dependencies(stages)
+
+    results: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+    pending = dict(deps)
+    running = {}
+    started = time.perf_counter()
+
+    def _timed(name, fn, inputs):
+        t0 = time.perf_counter()
+        try:
+            if metrics is None:
+                return fn(inputs)
+            with stage(name, metrics):
+                return fn(inputs)
+        finally:
+            timings[name] = round(time.perf_counter() - t0, 4)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            ready = [name for name, needed in pending.items() if needed <= results.keys()]
+            for name in ready:
+                del pending[name]
+                running[pool.submit(_timed, name, stages[name][1], dict(results))] = name
+            if not running:
+                raise ValueError(f"Dependency cycle between stages: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    wait(running)
+                    raise error
+                results[name] = future.result()
+
+    timings["total"] = round(time.perf_counter() - started, 4)
+    return results, timings
+
+
+async def run_stage_graph_async(stages: Dict[str, StageSpec], metrics: Optional[Metrics] = None):
+    """
+    run_stage_graph on the running event loop. Stage functions may be
+    coroutine functions, which are awaited, or plain functions, which run
+    in a worker thread (asyncio.to_thread). Returns (results, timings) like
+    run_stage_graph; on the first stage error the other stages are cancelled.
+    """
+    deps = _dependencies(stages)
+    # Reject cycles up front: a stage task waiting on itself would never finish
+    order, remaining = [], dict(deps)
+    while remaining:
+        ready = [name for name, needed in remaining.items() if needed <= set(order)]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+        order.extend(ready)
+        for name in ready:
+            del remaining[name]
+
+    results: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+    started = time.perf_counter()
+
+    async def run(name):
+        needed, fn = stages[name]
+        await asyncio.gather(*(tasks[d] for d in needed))
+        inputs = dict(results)
+        t0 = time.perf_counter()
+        try:
+            with stage(name, metrics) if metrics is not None else nullcontext():
+                if inspect.iscoroutinefunction(fn):
+                    results[name] = await fn(inputs)
+                else:
+                    results[name] = await asyncio.to_thread(fn, inputs)
+        finally:
+            timings[name] = round(time.perf_counter() - t0, 4)
+
+    for name in order:
+        tasks[name] = asyncio.ensure_future(run(name))
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    timings["total"] = round(time.perf_counter() - started, 4)
+    return results, timings
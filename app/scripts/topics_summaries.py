@@ -1,6 +1,104 @@
-from typing import List, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
 
-def generate_topics_and_summaries(lines: List[Union[str, dict]], model="gpt-4o", client=None):
+from scripts.embedding_faiss import count_tokens
+from scripts.metrics import propagate
+
+# Sections larger than this go through map-reduce instead of one prompt
+TOPICS_WINDOW_TOKENS = 12000
+TOPICS_MAX_WORKERS = 4
+
+FALLBACK_TOPICS = "- Topic: General Overview\n  Summary: The transcript discusses general topics."
+EMPTY_TOPICS = "- Topic: N/A\n  Summary: No content available."
+
+OUTPUT_FORMAT = """
+    Output format:
+    - Topic: <topic_name>
+      Summary: <summary>
+    """
+
+
+def _topics_prompt(text):
+    return f"""
+    Extract 5-7 business-relevant topics from the text below.
+    For each topic, generate a summary (4-5 sentences).
+    Ensure the response is non-empty and follows the exact format.
+
+    Transcript:
+    {text}
+    """ + OUTPUT_FORMAT
+
+
+def _window_prompt(text, part, parts):
+    return f"""
+    The text below is part {part} of {parts} of an earnings call section.
+    Extract the 3-5 most business-relevant topics it covers.
+    For each topic, generate a summary (2-3 sentences) with the concrete figures mentioned.
+
+    Transcript excerpt:
+    {text}
+    """ + OUTPUT_FORMAT
+
+
+def _merge_prompt(blocks):
+    joined = "\n\n".join(blocks)
+    return f"""
+    Below are topic lists extracted from consecutive parts of one earnings call section.
+    Merge them into the 5-7 most business-relevant topics for the whole section:
+    combine overlapping topics and keep the key figures.
+    For each topic, generate a summary (4-5 sentences).
+    Ensure the response is non-empty and follows the exact format.
+
+    Partial topics:
+    {joined}
+    """ + OUTPUT_FORMAT
+
+
+def _request(prompt, max_tokens=1000):
+    # chat.completions.create arguments (except the model) for one topics prompt
+    return {"messages": [{"role": "system", "content": "Return concise, factual topics."},
+                         {"role": "user", "content": prompt}],
+            "temperature": 0.2, "max_tokens": max_tokens}
+
+
+def _token_windows(texts: List[str], budget: int) -> List[List[str]]:
+    """Consecutive groups of texts whose token counts sum to at most ``budget``."""
+    windows, current, used = [], [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if current and used + tokens > budget:
+            windows.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += tokens
+    if current:
+        windows.append(current)
+    return windows
+
+
+def _map_reduce_topics(texts, window_tokens):
+    # Map: topics per window, requested together, so latency is the slowest window
+    windows = _token_windows(texts, window_tokens)
+    blocks = yield [_request(_window_prompt("\n".join(w), i + 1, len(windows)), max_tokens=600)
+                    for i, w in enumerate(windows)]
+    blocks = [b for b in blocks if b]
+    if not blocks:
+        return None
+
+    # Reduce: merge partial topic lists, in rounds if they don't fit one prompt
+    while len(blocks) > 1 and sum(count_tokens(b) for b in blocks) > window_tokens:
+        groups = _token_windows(blocks, window_tokens)
+        if len(groups) == len(blocks):
+            break  # each block alone fills the budget: merging can't shrink further
+        merged = iter((yield [_request(_merge_prompt(g)) for g in groups if len(g) > 1]))
+        blocks = [(next(merged) or "\n".join(g)) if len(g) > 1 else g[0] for g in groups]
+
+    final = (yield [_request(_merge_prompt(blocks))])[0] if len(blocks) > 1 else blocks[0]
+    # If the last merge fails, the per-window topics are still better than nothing
+    return final or "\n".join(blocks)
+
+
+def _section_texts(lines: List[Union[str, dict]]) -> List[str]:
     # Accept both list[str] and list[dict]
     texts = []
     for row in lines:
@@ -10,39 +108,58 @@ def generate_topics_and_summaries(lines: List[Union[str, dict]], model="gpt-4o",
                 texts.append(val)
         elif isinstance(row, str):
             texts.append(row)
-    text = "\n".join(texts)
+    return texts
 
-    if not text.strip():
-        return "- Topic: N/A\n  Summary: No content available."
 
-    prompt = f"""
-    Extract 5-7 business-relevant topics from the text below.
-    For each topic, generate a summary (4-5 sentences).
-    Ensure the response is non-empty and follows the exact format.
+def topics_requests(lines: List[Union[str, dict]], window_tokens=TOPICS_WINDOW_TOKENS):
+    """
+    The topics computation for a section, without the API calls: a generator
+    that yields lists of chat.completions.create arguments (except the model),
+    is sent back the replies (None for a failed one) in the same order, and
+    returns the topics block. Sections up to ``window_tokens`` tokens take
+    one prompt; longer ones are split into windows of that size and merged
+    (map-reduce), so they never overflow the model context.
+    """
+    texts = _section_texts(lines)
+    text = "\n".join(texts)
+    if not text.strip():
+        return EMPTY_TOPICS
 
-    Transcript:
-    {text}
+    if count_tokens(text) <= window_tokens:
+        content = (yield [_request(_topics_prompt(text))])[0]
+    else:
+        content = yield from _map_reduce_topics(texts, window_tokens)
+    return content or FALLBACK_TOPICS
 
-    Output format:
-    - Topic: <topic_name>
-      Summary: <summary>
-    """
-    if client is None:
-        # Minimal deterministic fallback
-        return "- Topic: General Overview\n  Summary: The transcript discusses general topics."
 
+def _complete(client, model, request) -> Optional[str]:
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "system", "content": "Return concise, factual topics."},
-                      {"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=1000
-        )
+        resp = client.chat.completions.create(model=model, **request)
         content = (resp.choices[0].message.content or "").strip()
-        if content:
-            return content
+        return content or None
     except Exception:
-        pass
+        return None
+
 
-    return "- Topic: General Overview\n  Summary: The transcript discusses general topics."
+def generate_topics_and_summaries(lines: List[Union[str, dict]], model="gpt-4o", client=None,
+                                  window_tokens=TOPICS_WINDOW_TOKENS, max_workers=TOPICS_MAX_WORKERS):
+    """
+    Topics block for a section (see topics_requests); the prompts of each
+    map-reduce round run concurrently on up to ``max_workers`` threads.
+    Without a client, a fixed fallback block.
+    """
+    steps = topics_requests(lines, window_tokens)
+    try:
+        requests = next(steps)
+        while True:
+            if client is None:
+                # Minimal deterministic fallback
+                replies = [None] * len(requests)
+            elif len(requests) == 1:
+                replies = [_complete(client, model, requests[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                    replies = list(pool.map(propagate(lambda r: _complete(client, model, r)), requests))
+            requests = steps.send(replies)
+    except StopIteration as done:
+        return done.value
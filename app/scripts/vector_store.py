@@ -0,0 +1,120 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import faiss
+
+# float32: exact, 4 bytes/dim   float16: 2 bytes/dim   int8: 1 byte/dim (per-dim
+# trained ranges)   binary: 1 bit/dim sign codes compared by Hamming distance
+VECTOR_CODECS = ("float32", "float16", "int8", "binary")
+RERANK_FACTOR = 4
+
+
+def truncate_dims(vectors: np.ndarray, dim: Optional[int] = None) -> np.ndarray:
+    """
+    Matryoshka truncation: keep the first ``dim`` components and re-normalize.
+    text-embedding-3-* vectors are trained so that prefixes stay meaningful.
+    Always returns a new contiguous float32 array.
+    """
+    vectors = np.atleast_2d(vectors)
+    if dim is not None and dim < vectors.shape[1]:
+        vectors = vectors[:, :dim]
+    out = np.ascontiguousarray(vectors, dtype="float32").copy()
+    faiss.normalize_L2(out)
+    return out
+
+
+def make_codec_index(dim: int, codec: str = "float32") -> faiss.Index:
+    if codec == "float32":
+        return faiss.IndexFlatIP(dim)
+    if codec == "float16":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    if codec == "int8":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+    if codec == "binary":
+        # Sign bits of the raw coordinates, no rotation/threshold training
+        return faiss.IndexLSH(dim, dim, False, False)
+    raise ValueError(f"Unknown vector codec '{codec}', expected one of {VECTOR_CODECS}")
+
+
+class CompactIndex:
+    """
+    A faiss index over truncated and/or quantized vectors that accepts full
+    query vectors and returns cosine-like scores (higher is better), so it is
+    a drop-in for ``index.search`` in query_index.
+
+    With ``rerank_path`` (the full float32 ``embeddings.npy``), it fetches
+    ``k * rerank_factor`` candidates and re-scores them exactly against the
+    full vectors, read through a memory map so they never have to be
+    resident. ``rows`` maps index rows to rows of that file (for sub-indexes).
+    """
+
+    def __init__(self, index: faiss.Index, dim: Optional[int] = None, codec: str = "float32",
+                 rerank_path: Optional[str] = None, rows: Optional[Sequence[int]] = None,
+                 rerank_factor: int = RERANK_FACTOR):
+        self.index = index
+        self.dim = dim
+        self.codec = codec
+        self.rerank_path = rerank_path
+        self.rows = np.asarray(rows, dtype="int64") if rows is not None else None
+        self.rerank_factor = rerank_factor
+        self._full = None
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, dim: Optional[int] = None, codec: str = "float32", **kwargs):
+        compact = truncate_dims(vectors, dim)
+        index = make_codec_index(compact.shape[1], codec)
+        if len(compact):
+            if not index.is_trained:
+                index.train(compact)
+            index.add(compact)
+        return cls(index, dim=dim, codec=codec, **kwargs)
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def d(self) -> int:
+        return self.index.d
+
+    def nbytes(self) -> int:
+        return len(faiss.serialize_index(self.index))
+
+    def _full_vectors(self):
+        if self._full is None:
+            self._full = np.load(self.rerank_path, mmap_mode="r")
+        return self._full
+
+    def search(self, queries: np.ndarray, k: int):
+        queries = np.atleast_2d(queries)
+        fetch = k * self.rerank_factor if self.rerank_path else k
+        D, I = self.index.search(truncate_dims(queries, self.dim), min(fetch, max(self.ntotal, 1)))
+        if self.codec == "binary":
+            # Hamming distance -> approximate cosine in [-1, 1]
+            D = 1.0 - 2.0 * D.astype("float32") / self.index.d
+
+        if self.rerank_path:
+            D, I = self._rerank(queries, I, k)
+
+        if I.shape[1] < k:
+            pad = k - I.shape[1]
+            D = np.hstack([D, np.full((len(D), pad), -np.inf, dtype="float32")])
+            I = np.hstack([I, np.full((len(I), pad), -1, dtype="int64")])
+        return D[:, :k], I[:, :k]
+
+    def _rerank(self, queries, candidates, k):
+        full = self._full_vectors()
+        D_out = np.full((len(queries), k), -np.inf, dtype="float32")
+        I_out = np.full((len(queries), k), -1, dtype="int64")
+        for qi, (q, cand) in enumerate(zip(queries, candidates)):
+            cand = cand[cand >= 0]
+            if not len(cand):
+                continue
+            source_rows = self.rows[cand] if self.rows is not None else cand
+            order = np.argsort(source_rows)  # sorted reads are friendlier to the page cache
+            scores = np.empty(len(cand), dtype="float32")
+            scores[order] = np.asarray(full[source_rows[order]], dtype="float32") @ q
+            best = np.argsort(-scores)[:k]
+            D_out[qi, :len(best)] = scores[best]
+            I_out[qi, :len(best)] = cand[best]
+        return D_out, I_out
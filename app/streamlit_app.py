@@ -1,11 +1,14 @@
 from io import BytesIO
 import streamlit as st
 import warnings
-import time
 import markdown
 import streamlit.components.v1 as components
 from scripts.pipeline import process_transcript
-from scripts.rag_query import query_index, generate_answer
+from scripts.doc_store import get_resident_documents
+from scripts.rag_query import query_index, stream_answer
+from scripts.batch_qa import DEFAULT_QUESTIONS
+from scripts.metrics import Metrics, stage
+from scripts.answer_cache import answer_scope, cached_question_vector, get_answer_cache
 
 warnings.filterwarnings("ignore")
 st.set_page_config(page_title="📄 Transcript Assistant", layout="wide")
@@ -16,8 +19,6 @@ if "docs" not in st.session_state:
     st.session_state["docs"] = []
 if "selected_doc_id" not in st.session_state:
     st.session_state["selected_doc_id"] = None
-if "qa_cache" not in st.session_state:
-    st.session_state["qa_cache"] = {}
 if "focus_summary" not in st.session_state:
     st.session_state["focus_summary"] = False
 if "auto_scroll_answer" not in st.session_state:
@@ -30,19 +31,20 @@ if "processed_docs" not in st.session_state:
     st.session_state["processed_docs"] = set()
 
 # ---------- Caching Layer ----------
-@st.cache_resource(show_spinner="Processing transcript…")
-def cached_process_transcript(file_bytes: bytes, file_name: str):
-    """Wrap bytes in BytesIO for process_transcript."""
-    return process_transcript(BytesIO(file_bytes), chunk_size=500, overlap=50)
-
-# 2️⃣ Refresh logic right below the function
-if "last_refresh" not in st.session_state:
-    st.session_state.last_refresh = time.time()
-
-print(time.time() - st.session_state.last_refresh)
-if time.time() - st.session_state.last_refresh > 600:  # 30 mins
-    st.cache_resource.clear()
-    st.session_state.last_refresh = time.time()
+# Processed documents are shared by all sessions in one store bounded by
+# TRANSCRIPT_MEMORY_BUDGET_MB, least recently used or idle ones evicted first.
+# Evicted documents are reloaded (memory-mapped) from the disk cache.
+def load_transcript(file_bytes: bytes):
+    """process_transcript through the shared document store."""
+    return process_transcript(BytesIO(file_bytes), chunk_size=500, overlap=50, resident=get_resident_documents())
+
+def _document_data(doc):
+    # Sessions keep only the store key, so they never pin an evicted document
+    data = get_resident_documents().get(doc["cache_key"]) if doc.get("cache_key") else None
+    if data is None:
+        data = load_transcript(doc["file"].getvalue())
+        doc["cache_key"] = data["cache_key"]
+    return data
 
 # ---------- Utility ----------
 def _get_selected_data():
@@ -51,20 +53,18 @@ def _get_selected_data():
         return None
 
     doc = next((d for d in st.session_state["docs"] if d["id"] == doc_id), None)
-    if not doc:
-        return None
-
-    # Only process if not already done
-    if doc_id not in st.session_state["processed_docs"]:
-        if doc.get("file") is not None:
-            try:
-                doc["data"] = cached_process_transcript(doc["file"].getvalue(), doc["file"].name)
-                doc["status"] = "Processed"
-                st.session_state["processed_docs"].add(doc_id)
-            except Exception as e:
-                doc["status"] = "Error"
-                doc["error_msg"] = str(e)
-    return doc
+    if not doc or doc.get("file") is None:
+        return doc
+
+    try:
+        data = _document_data(doc)
+        doc["status"] = "Processed"
+        st.session_state["processed_docs"].add(doc_id)
+    except Exception as e:
+        doc["status"] = "Error"
+        doc["error_msg"] = str(e)
+        return doc
+    return dict(doc, data=data)
 
 # ---------- Display Helpers ----------
 def _display_chunk_card(c, section_name, idx):
@@ -88,6 +88,34 @@ def _display_answer_card(ans_text):
         unsafe_allow_html=True
     )
 
+def _display_metrics(title, metrics):
+    """Per-stage table of a scripts.metrics payload (Metrics.as_dict())."""
+    st.markdown(f"**{title}**")
+    rows = []
+    for name, m in metrics["stages"].items():
+        rows.append({
+            "stage": name,
+            "wall s": m.get("wall_s", 0.0),
+            "cpu s": m.get("cpu_s", 0.0),
+            "peak MB": m.get("peak_rss_mb", 0.0),
+            "calls": m.get("api_calls", 0),
+            "tokens in": m.get("tokens_in", 0),
+            "tokens out": m.get("tokens_out", 0),
+            "retries": m.get("retries", 0),
+            "errors": m.get("errors", 0) + m.get("rate_limited", 0),
+            "cache hits": m.get("cache_hits", 0),
+        })
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    parts = metrics["stages"].get("extract", {}).get("parts")
+    if parts:
+        st.caption(" · ".join(f"{k[:-2]} {v:.2f}s" for k, v in parts.items()))
+
+def _confidence_label(ans):
+    # Cosine similarity of the best source; BM25-only answers show their raw BM25 score
+    if ans.get("confidence") is not None:
+        return f"Confidence: {ans['confidence']:.3f}"
+    return f"BM25 match: {ans.get('bm25') or 0.0:.2f}"
+
 # ---------- Top Navigation ----------
 selected_doc = _get_selected_data()
 selected_data = (selected_doc or {}).get("data") or None
@@ -121,20 +149,19 @@ with upload_tab:
                 "name": uploaded_file.name,
                 "file": uploaded_file,
                 "status": "NotProcessed",
-                "data": None,
+                "cache_key": None,
             }
             st.session_state["docs"].append(found)
         else:
             found["file"] = uploaded_file
             found["status"] = "NotProcessed"
-            found["data"] = None
+            found["cache_key"] = None
         st.session_state["selected_doc_id"] = doc_id
 
         if found["status"] != "Processed":
             with st.spinner("Extracting text and building index…"):
                 try:
-                    data = cached_process_transcript(uploaded_file.getvalue(), uploaded_file.name)
-                    found["data"] = data
+                    found["cache_key"] = load_transcript(uploaded_file.getvalue())["cache_key"]
                     found["status"] = "Processed"
                     st.success("Processed ✅. Move to Summary tab.")
                 except Exception as e:
@@ -371,6 +398,21 @@ with qa_tab:
                 _display_answer_card(st.session_state["generated_summary"][doc_id][section_name])
 
 
+# ---------------- Debug Metrics ----------------
+show_metrics = st.sidebar.checkbox("Show debug metrics", value=False)
+metrics_panel = st.sidebar.container()
+if show_metrics:
+    sel = _get_selected_data()
+    with metrics_panel:
+        if sel and sel.get("data") and sel["data"].get("metrics"):
+            _display_metrics("Pipeline", sel["data"]["metrics"])
+        else:
+            st.caption("No processed document.")
+        store = get_resident_documents().stats()
+        st.caption(f"Document store: {store['documents']} docs · {store['resident_bytes'] / 2**20:.1f} / "
+                   f"{store['max_bytes'] / 2**20:.0f} MB · {store['hits']} hits · "
+                   f"{store['evictions'] + store['expirations']} evicted")
+
 # ---------------- Chat Assistant Tab ----------------
 with chat_tab:
     doc_id = st.session_state.get("selected_doc_id")
@@ -383,13 +425,7 @@ with chat_tab:
     else:
         data = sel.get("data")
         st.subheader("AI Assistant")
-        sample_qs =  [
-            "What were the main drivers of revenue and earnings growth this quarter?",
-            "Any comments on margins, operating costs, or profitability trends?",
-            "What are the key risks, challenges, or headwinds the company faces?",
-            "Any updates on capital allocation, dividends, or share repurchase plans?",
-            "How is the company managing cash flow and liquidity?",
-        ]
+        sample_qs = DEFAULT_QUESTIONS
         with st.expander("Suggested Questions"):
             for idx, q in enumerate(sample_qs):
                 if st.button(q, key=f"suggest_q_{idx}"):
@@ -398,27 +434,50 @@ with chat_tab:
                     st.rerun()
         question = st.text_input("Ask a question", key=f"chat_input_{doc_id}" , placeholder="Type your question here...")
         if question:
-            cache_key = f"{doc_id}::{question.strip().lower()}"
-            if cache_key in st.session_state["qa_cache"]:
-                retrieved, ans = st.session_state["qa_cache"][cache_key]
+            # Answers are shared across sessions: a repeat or a close paraphrase of an
+            # earlier question on this transcript is served without an LLM call
+            answers = get_answer_cache()
+            # Same scope as scripts.batch_qa's defaults (pool, model, mode, top_k, context_window)
+            scope = answer_scope(data["doc_id"], "chat", data.get("chat_model", "gpt-4o"), "hybrid", 5, 2)
+            question_metrics = Metrics()
+            with stage("answer_cache", question_metrics):
+                cached = answers.get(scope, question)
+            q_vec = None
+            if cached:
+                retrieved, ans = cached["retrieved"], cached
             else:
-                with st.spinner("Retrieving context and generating answer..."):
-                    pool = data["chunks"]
-                    pool = [
-                        c for c in pool
-                        if c.get("role", "").lower() == "answer"
-                        or "opening" in c.get("section", "").lower()
-                    ]
-
-                    print(len(pool))
-
-                    retrieved = query_index(question, data["faiss_index"], pool, client=data["embedding_client"])
-                    ans = generate_answer(question, retrieved, client=data["chat_client"], model=data.get("chat_model", "gpt-4o"))
-                st.session_state["qa_cache"][cache_key] = (retrieved, ans)
-        
+                with st.spinner("Retrieving context..."), stage("query", question_metrics):
+                    # Answer/opening chunks only, searched through their own sub-index
+                    pool = data["pools"]["chat"]
+                    retrieved = query_index(question, pool["index"], pool["chunks"], client=data["embedding_client"],
+                                            model=data["embedding_model"], mode="hybrid", lexical=pool.get("lexical"))
+                with stage("answer_cache", question_metrics):
+                    # Paraphrase check with the vector retrieval just embedded (none if BM25 answered)
+                    q_vec = cached_question_vector(question, model=data["embedding_model"])
+                    if q_vec is not None:
+                        cached = answers.get(scope, question, q_vec)
+                if cached:
+                    retrieved, ans = cached["retrieved"], cached
+                else:
+                    ans = stream_answer(question, retrieved, client=data["chat_client"],
+                                        model=data.get("chat_model", "gpt-4o"))
+
             # Anchor target for auto-scroll
             st.markdown("<div id='answer-target'></div>", unsafe_allow_html=True)
-            _display_answer_card(ans['answer'])
+            # Sources and confidence are known before the first answer token
+            st.caption(f"{_confidence_label(ans)} · Sources: {', '.join(ans['sources']) or '—'}")
+            answer_slot = st.empty()
+            if not cached:
+                # Render tokens as they arrive, then swap in the formatted card
+                with answer_slot.container(), stage("answer", question_metrics):
+                    st.write_stream(ans.pop("tokens"))
+                answers.put(scope, question, q_vec, dict(ans, retrieved=retrieved))
+            question_metrics = question_metrics.log("question", doc_id=doc_id, answer_cache_hit=bool(cached))
+            with answer_slot.container():
+                _display_answer_card(ans['answer'])
+            if show_metrics:
+                with metrics_panel:
+                    _display_metrics("Last question", question_metrics)
             # Trigger scroll once if requested
             if st.session_state.get("auto_scroll_answer"):
                 components.html("""
@@ -435,10 +494,13 @@ with chat_tab:
                     role = c.get("role")
                     section = c.get("section") or "?"
                     page = c.get("start_page") or "?"
-                    score = c.get("score", 0.0)
+                    similarity, bm25 = c.get("similarity"), c.get("bm25")
                     header = f"Section: {section} | Page: {page} | Speaker: {speaker}"
                     if role:
                         header += f" · Role: {role.title()}"
-                    header += f" | Score: {score:.3f}"
+                    if similarity is not None:
+                        header += f" | Similarity: {similarity:.3f}"
+                    if bm25 is not None:
+                        header += f" | BM25: {bm25:.2f}"
                     with st.expander(header, expanded=False):
                         st.text_area("Transcript Text",  value=c.get("text", ""), height=150, max_chars=None, key=f"ctx_{idx}", label_visibility="hidden")
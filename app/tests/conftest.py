@@ -0,0 +1,47 @@
+import os
+import sys
+
+import faiss
+import pytest
+
+# Tests import the app's modules as ``scripts.*``, like the app itself
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.embedding_faiss import embed_text
+from scripts.fake_clients import FakeEmbeddingClient
+from scripts.lexical_index import BM25Index
+
+# A tiny answer pool; "Tiramax 4521 tonnes" is answered by the BM25 shortcut
+TEXTS = [
+    "Revenue grew 12% on volume growth in Zentra.",
+    "EBITDA margin came in at 18.5% helped by lower costs.",
+    "The board declared an interim dividend of 4 rupees per share.",
+    "Tiramax capacity reached 4521 tonnes after the new line.",
+    "Export demand was soft but domestic orders stayed strong.",
+    "Net debt reduced by 60 crores this quarter.",
+]
+
+
+@pytest.fixture
+def corpus():
+    """TEXTS as Q&A chunks with a flat cosine index (fake 64-dim vectors) and a BM25 index."""
+    client = FakeEmbeddingClient(dim=64, latency=0)
+    vectors = embed_text(TEXTS, client=client)
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    chunks = [{"text": t, "chunk_id": f"Q&A_{i}"} for i, t in enumerate(TEXTS)]
+    return {"client": client, "index": index, "chunks": chunks, "vectors": vectors,
+            "lexical": BM25Index.build(TEXTS)}
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Process-wide sqlite caches in a fresh temp dir for every test."""
+    from scripts import answer_cache, completion_cache, embedding_cache
+
+    monkeypatch.setenv("QUERY_EMBEDDING_CACHE", str(tmp_path / "query_embeddings.sqlite"))
+    monkeypatch.setenv("COMPLETION_CACHE", str(tmp_path / "completions.sqlite"))
+    monkeypatch.setenv("ANSWER_CACHE", str(tmp_path / "answers.sqlite"))
+    for module in (answer_cache, completion_cache, embedding_cache):
+        monkeypatch.setattr(module, "_default_cache", None)
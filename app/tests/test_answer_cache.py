@@ -0,0 +1,97 @@
+import numpy as np
+
+from scripts.answer_cache import AnswerCache
+from scripts.batch_qa import answer_questions
+from scripts.fake_clients import FakeChatClient, FakeEmbeddingClient
+from scripts.rag_query import stream_answer
+
+
+class BrokenStreamChatClient(FakeChatClient):
+    """Streams two tokens, then drops the connection."""
+
+    def _stream(self, pieces):
+        yield from list(super()._stream(pieces))[:2]
+        raise ConnectionError("stream reset")
+
+
+def _data(corpus, embedding_client, chat_client):
+    pool = {"index": corpus["index"], "chunks": corpus["chunks"], "lexical": corpus["lexical"]}
+    return {"doc_id": "doc", "pools": {"chat": pool}, "embedding_client": embedding_client,
+            "chat_client": chat_client, "chat_model": "gpt-4o", "embedding_model": "text-embedding-3-large"}
+
+
+def _drain(ans):
+    return "".join(ans.pop("tokens"))
+
+
+def test_complete_stream_is_cached(corpus):
+    ans = stream_answer("What did revenue do?", corpus["chunks"][:1], client=FakeChatClient(latency=0))
+    assert ans["complete"] is False
+    _drain(ans)
+    assert ans["complete"] is True
+
+    cache = AnswerCache()
+    cache.put("doc", "What did revenue do?", np.ones(4, dtype="float32") / 2, ans)
+    assert cache.get("doc", "What did revenue do?")["answer"] == ans["answer"]
+
+
+def test_interrupted_stream_is_not_cached(corpus):
+    ans = stream_answer("What did revenue do?", corpus["chunks"][:1], client=BrokenStreamChatClient(latency=0))
+    text = _drain(ans)
+    assert text and ans["answer"] == text.strip()
+    assert ans["complete"] is False
+
+    cache = AnswerCache()
+    cache.put("doc", "What did revenue do?", np.ones(4, dtype="float32") / 2, ans)
+    assert cache.get("doc", "What did revenue do?") is None
+
+
+def test_lexical_answers_skip_the_embedding_call(corpus):
+    embedding_client, chat_client = FakeEmbeddingClient(dim=64, latency=0), FakeChatClient(latency=0)
+    data = _data(corpus, embedding_client, chat_client)
+    cache = AnswerCache()
+
+    first = answer_questions(["Tiramax 4521 tonnes"], data, answer_cache=cache)
+    assert embedding_client.calls == 0 and chat_client.calls == 1
+    # Stored without a vector: exact repeats still hit
+    again = answer_questions(["tiramax 4521 tonnes?"], data, answer_cache=cache)
+    assert again[0]["answer"] == first[0]["answer"]
+    assert embedding_client.calls == 0 and chat_client.calls == 1
+
+
+def test_embedded_questions_are_embedded_once(corpus):
+    embedding_client, chat_client = FakeEmbeddingClient(dim=64, latency=0), FakeChatClient(latency=0)
+    data = _data(corpus, embedding_client, chat_client)
+    cache = AnswerCache()
+
+    answer_questions(["How did margins and export demand develop?", "Tiramax 4521 tonnes"], data,
+                     answer_cache=cache)
+    # Retrieval's embedding call is the only one; the paraphrase check reuses its vector
+    assert embedding_client.calls == 1 and chat_client.calls == 2
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["hits"] == 0
+
+
+def test_entries_without_vectors_are_skipped_by_similarity_search(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    cache = AnswerCache(path=path)
+    vector = np.ones(4, dtype="float32") / 2
+    cache.put("doc", "Tiramax 4521 tonnes", None, {"answer": "lexical"})
+    cache.put("doc", "How did margins develop?", vector, {"answer": "vector"})
+
+    # A fresh process loads both rows from disk
+    reloaded = AnswerCache(path=path)
+    assert reloaded.get("doc", "How were margins?", vector)["answer"] == "vector"
+    assert reloaded.get("doc", "tiramax 4521 tonnes")["answer"] == "lexical"
+
+
+def test_near_hits_never_cross_periods(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    cache = AnswerCache(path=path)
+    vector = np.ones(4, dtype="float32") / 2
+    cache.put("doc", "What was revenue in Q1 2024?", vector, {"answer": "Q1 revenue"})
+
+    # Embeddings of the two questions can be nearly identical; the figures are not
+    for c in (cache, AnswerCache(path=path)):
+        assert c.get("doc", "What was revenue in Q2 2024?", vector) is None
+        assert c.get("doc", "What was the revenue in Q1 2024", vector)["answer"] == "Q1 revenue"
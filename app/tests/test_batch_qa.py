@@ -0,0 +1,29 @@
+from io import BytesIO
+
+from benchmarks.transcripts import synthetic_transcript
+from scripts.batch_qa import answer_questions
+from scripts.fake_clients import FakeChatClient, FakeEmbeddingClient
+from scripts.pipeline import process_transcript
+
+
+class RecordingEmbeddingClient(FakeEmbeddingClient):
+    """Remembers the model of every embedding request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.models = set()
+
+    def _response(self, texts, model):
+        self.models.add(model)
+        return super()._response(texts, model)
+
+
+def test_questions_are_embedded_with_the_index_model(tmp_path):
+    embedding = RecordingEmbeddingClient(dim=32, latency=0)
+    data = process_transcript(BytesIO(synthetic_transcript(3, seed=6)), cache_dir=str(tmp_path),
+                              chat_client=FakeChatClient(latency=0), embedding_client=embedding,
+                              chat_model="gpt-4o", embedding_model="other-embedding")
+    rows = answer_questions(["How did margins develop this quarter?", "What is the outlook on demand?"], data,
+                            mode="vector")
+    assert len(rows) == 2 and all(r["confidence"] is not None for r in rows)
+    assert embedding.models == {"other-embedding"}
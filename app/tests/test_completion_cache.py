@@ -0,0 +1,35 @@
+from io import BytesIO
+
+from benchmarks.transcripts import synthetic_transcript
+from scripts.completion_cache import CompletionCache, cache_completions
+from scripts.fake_clients import FakeChatClient, FakeEmbeddingClient
+from scripts.pipeline import process_transcript
+
+MESSAGES = [{"role": "user", "content": "Summarize the quarter."}]
+
+
+def test_chat_model_is_part_of_the_key():
+    client = FakeChatClient(latency=0)
+    cached = cache_completions(client, cache=CompletionCache())
+    cached.chat.completions.create(model="deployment-a", messages=MESSAGES)
+    cached.chat.completions.create(model="deployment-a", messages=MESSAGES)
+    assert client.calls == 1
+    cached.chat.completions.create(model="deployment-b", messages=MESSAGES)
+    assert client.calls == 2
+
+
+def test_switching_the_pipeline_chat_model_misses(tmp_path):
+    pdf = synthetic_transcript(3, seed=4)
+
+    def run(chat_model, cache_dir):
+        # A fresh transcript cache each time: only the completion cache is shared
+        chat = FakeChatClient(latency=0)
+        process_transcript(BytesIO(pdf), cache_dir=str(tmp_path / cache_dir), chat_client=chat,
+                           embedding_client=FakeEmbeddingClient(dim=64, latency=0), chat_model=chat_model,
+                           embedding_model="text-embedding-3-large")
+        return chat.calls
+
+    first = run("deployment-a", "a1")
+    assert first > 0
+    assert run("deployment-a", "a2") == 0
+    assert run("deployment-b", "b1") == first
@@ -0,0 +1,50 @@
+import functools
+import os
+
+import numpy as np
+
+from benchmarks.transcripts import synthetic_transcript
+from scripts.corpus_index import CorpusIndex
+from scripts.fake_clients import make_fake_clients
+from scripts.ingest import ingest_directory
+
+
+def _doc(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    chunks = [{"text": f"chunk {i}", "section": "Q&A", "chunk_id": f"Q&A_{i}"} for i in range(n)]
+    return chunks, rng.standard_normal((n, dim)).astype("float32")
+
+
+def test_add_only_writes_the_index_on_save(tmp_path):
+    corpus = CorpusIndex(str(tmp_path))
+    chunks, vectors = _doc(5)
+    assert corpus.add_document("a", chunks, vectors, {"company": "Acme"})
+    assert not os.path.exists(tmp_path / "corpus.index")
+    corpus.save()
+    assert os.path.exists(tmp_path / "corpus.index")
+
+    # Added after the last save: re-indexed from its vectors on load
+    chunks_b, vectors_b = _doc(3, seed=1)
+    corpus.add_document("b", chunks_b, vectors_b, {"company": "Zentra"})
+    reloaded = CorpusIndex(str(tmp_path))
+    assert reloaded.index.ntotal == 8
+    q = vectors_b[:1] / np.linalg.norm(vectors_b[:1])
+    hits = reloaded.search_vectors(q, top_k=1, context_window=0, company="zentra")
+    assert hits[0]["doc_id"] == "b"
+
+
+def test_ingest_adds_documents_to_the_corpus(tmp_path):
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    for seed in range(2):
+        (pdf_dir / f"t{seed}.pdf").write_bytes(synthetic_transcript(3, seed=seed))
+    paths = sorted(str(p) for p in pdf_dir.iterdir())
+    factory = functools.partial(make_fake_clients, embedding_latency=0, chat_latency=0, dim=32)
+    options = {"cache_dir": str(tmp_path / "cache")}
+
+    for workers in (1, 2):
+        corpus = CorpusIndex(str(tmp_path / f"corpus{workers}"))
+        report = ingest_directory(paths, options, workers=workers, client_factory=factory, corpus=corpus)
+        assert report["failed"] == 0
+        assert len(corpus) == 2
+        assert CorpusIndex(corpus.corpus_dir).index.ntotal == corpus.index.ntotal
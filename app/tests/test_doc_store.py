@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from io import BytesIO
+
+from benchmarks.transcripts import synthetic_transcript
+from scripts import embedding_cache
+from scripts.async_pipeline import process_transcript_async
+from scripts.doc_store import ResidentDocuments
+from scripts.fake_clients import AsyncFakeChatClient, AsyncFakeEmbeddingClient, FakeChatClient, FakeEmbeddingClient
+from scripts.pipeline import process_transcript
+
+MODELS = {"chat_model": "gpt-4o", "embedding_model": "text-embedding-3-large"}
+
+
+def _process(pdf, resident, chat_client, embedding_client):
+    # No disk or completion cache: every load that is not shared pays for its API calls
+    return process_transcript(BytesIO(pdf), use_cache=False, resident=resident, chat_client=chat_client,
+                              embedding_client=embedding_client, **MODELS)
+
+
+def _calls(*clients):
+    return [c.calls for c in clients]
+
+
+def _fresh_query_cache(monkeypatch, path):
+    # The default questions are embedded through the query cache: start each run cold
+    monkeypatch.setenv("QUERY_EMBEDDING_CACHE", str(path))
+    monkeypatch.setattr(embedding_cache, "_default_cache", None)
+
+
+def test_concurrent_misses_share_one_load(monkeypatch, tmp_path):
+    pdf = synthetic_transcript(3, seed=5)
+    baseline = FakeChatClient(latency=0.05), FakeEmbeddingClient(dim=64, latency=0.05)
+    _fresh_query_cache(monkeypatch, tmp_path / "baseline.sqlite")
+    _process(pdf, ResidentDocuments(), *baseline)
+    _fresh_query_cache(monkeypatch, tmp_path / "concurrent.sqlite")
+
+    clients = FakeChatClient(latency=0.05), FakeEmbeddingClient(dim=64, latency=0.05)
+    resident = ResidentDocuments()
+    start = threading.Barrier(4)
+    results = []
+
+    def load():
+        start.wait()
+        results.append(_process(pdf, resident, *clients))
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert _calls(*clients) == _calls(*baseline)
+    assert all(r is results[0] for r in results)
+    assert resident.stats()["hits"] == 3
+    assert not resident._loads
+
+
+def test_concurrent_async_misses_share_one_load(monkeypatch, tmp_path):
+    pdf = synthetic_transcript(3, seed=5)
+    resident = ResidentDocuments()
+
+    async def run(chat_client, embedding_client, n):
+        return await asyncio.gather(*(
+            process_transcript_async(BytesIO(pdf), use_cache=False, resident=resident, chat_client=chat_client,
+                                     embedding_client=embedding_client, **MODELS)
+            for _ in range(n)
+        ))
+
+    baseline = AsyncFakeChatClient(latency=0.05), AsyncFakeEmbeddingClient(dim=64, latency=0.05)
+    _fresh_query_cache(monkeypatch, tmp_path / "baseline.sqlite")
+    asyncio.run(run(*baseline, 1))
+    resident.pop(next(iter(resident._entries)))
+    _fresh_query_cache(monkeypatch, tmp_path / "concurrent.sqlite")
+
+    clients = AsyncFakeChatClient(latency=0.05), AsyncFakeEmbeddingClient(dim=64, latency=0.05)
+    results = asyncio.run(run(*clients, 4))
+    assert _calls(*clients) == _calls(*baseline)
+    assert all(r is results[0] for r in results)
+    assert not resident._loads
@@ -0,0 +1,38 @@
+import numpy as np
+
+from scripts.embedding_cache import QueryEmbeddingCache, period_tokens
+from scripts.fake_clients import FakeEmbeddingClient
+
+
+def test_period_tokens():
+    assert period_tokens("what was revenue in q1 2024") == ("2024", "q1")
+    assert period_tokens("margin of 3.5% in fy24.") == ("3.5", "fy24")
+    assert period_tokens("guidance for next year") == ("next",)
+
+
+def test_near_duplicate_reuses_reworded_query():
+    cache = QueryEmbeddingCache(near_duplicate_threshold=90)
+    cache.put("m", "What was revenue growth in Q1 2024?", np.ones(4))
+    assert cache.get("m", "what was the revenue growth in Q1 2024") is not None
+    assert cache.near_hits == 1
+
+
+def test_near_duplicate_never_crosses_periods():
+    cache = QueryEmbeddingCache(near_duplicate_threshold=90)
+    cache.put("m", "What was revenue in Q1 2024?", np.ones(4))
+    cache.put("m", "What was the guidance for fiscal 2023?", np.ones(4))
+    assert cache.get("m", "What was revenue in Q2 2024?") is None
+    assert cache.get("m", "What was the guidance for fiscal 2024?") is None
+    assert cache.near_hits == 0
+
+
+def test_models_never_share_entries(tmp_path):
+    path = str(tmp_path / "queries.sqlite")
+    cache = QueryEmbeddingCache(path=path, near_duplicate_threshold=90)
+    question = "What was revenue in Q1 2024?"
+    assert cache.embed([question], FakeEmbeddingClient(dim=64, latency=0), model="model-a").shape == (1, 64)
+    assert cache.embed([question], FakeEmbeddingClient(dim=32, latency=0), model="model-b").shape == (1, 32)
+    # A restarted process too: each model reads back its own vector
+    reloaded = QueryEmbeddingCache(path=path, near_duplicate_threshold=90)
+    assert reloaded.get("model-a", question).shape == (64,)
+    assert reloaded.get("model-b", "what was revenue in q1 2024").shape == (32,)
@@ -0,0 +1,41 @@
+import pypdfium2 as pdfium
+
+from benchmarks.transcripts import LINES_PER_PAGE, make_pdf, synthetic_transcript, transcript_lines
+from scripts.extract_text import PdfiumEngine, PdfPlumberEngine, _page_lines
+
+
+def _records(engine):
+    try:
+        return [r for p in range(len(engine)) for r in _page_lines(engine.page_text(p), p + 1)]
+    finally:
+        engine.close()
+
+
+def test_pdfium_matches_pdfplumber_records():
+    pdf = synthetic_transcript(4, seed=3)
+    reference = _records(PdfPlumberEngine(pdf))
+    engine = PdfiumEngine(pdf)
+    records = _records(engine)
+    assert reference and set(reference[0]) == {"text", "page", "line"}
+    assert records == reference
+    assert engine.fallback_pages == 0
+
+
+def test_pdfium_falls_back_on_pages_without_text(monkeypatch):
+    pdf = synthetic_transcript(3, seed=1)
+    reference = _records(PdfPlumberEngine(pdf))
+    # PDFium "sees" no text on any page, e.g. a scanned or oddly encoded PDF
+    monkeypatch.setattr(pdfium.PdfTextPage, "get_text_range", lambda self, *a, **k: "")
+    engine = PdfiumEngine(pdf)
+    assert _records(engine) == reference
+    assert engine.fallback_pages == 3
+
+
+def test_blank_page_uses_fallback_and_keeps_page_numbers():
+    lines = transcript_lines(2)
+    pdf = make_pdf([lines[:LINES_PER_PAGE], [], lines[LINES_PER_PAGE:]])
+    engine = PdfiumEngine(pdf)
+    records = _records(engine)
+    assert engine.fallback_pages == 1
+    assert {r["page"] for r in records} == {1, 3}
+    assert records == _records(PdfPlumberEngine(pdf))
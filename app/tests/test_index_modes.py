@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from scripts.corpus_index import CorpusIndex
+from scripts.embedding_faiss import INDEX_MODES, build_faiss_index, make_index, train_index
+
+
+# Smaller PQ codebooks keep training fast; the defaults are covered by the first test
+FAST_PARAMS = {"ivf_pq": {"pq_bits": 4}}
+
+
+def _vectors(n=3000, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("mode", INDEX_MODES)
+def test_make_index_builds_trains_adds_and_searches(mode):
+    vectors = _vectors()
+    index = make_index(vectors.shape[1], len(vectors), mode=mode)
+    assert index.d == vectors.shape[1]
+    train_index(index, vectors)
+    index.add(vectors)
+    assert index.ntotal == len(vectors)
+    _, ids = index.search(vectors[:5], 3)
+    assert ids.shape == (5, 3) and (ids >= 0).all()
+
+
+@pytest.mark.parametrize("mode", INDEX_MODES)
+def test_build_faiss_index_finds_exact_matches(mode):
+    vectors = _vectors()
+    index = build_faiss_index(vectors.copy(), mode=mode, **FAST_PARAMS.get(mode, {}))
+    _, ids = index.search(vectors[:20], 1)
+    # PQ codes are lossy; the others should return the query itself
+    assert np.mean(ids[:, 0] == np.arange(20)) >= (0.5 if mode == "ivf_pq" else 0.9)
+
+
+@pytest.mark.parametrize("mode", ["hnsw", "ivf_flat", "ivf_pq"])
+def test_corpus_filtered_search_after_rebuild(tmp_path, mode):
+    corpus = CorpusIndex(str(tmp_path))
+    vectors = _vectors()
+    for i, company in enumerate(["Acme", "Zentra"]):
+        block = vectors[i * 1500:(i + 1) * 1500]
+        chunks = [{"text": f"{company} {j}", "section": "Q&A"} for j in range(len(block))]
+        corpus.add_document(company.lower(), chunks, block, {"company": company})
+    assert corpus.rebuild(mode=mode, **FAST_PARAMS.get(mode, {})) == mode
+
+    hits = corpus.search_vectors(vectors[1500:1501], top_k=3, context_window=0, company="zentra")
+    assert hits and all(h["doc_id"] == "zentra" for h in hits)
+    # Reloaded from disk, the trained index keeps working
+    assert CorpusIndex(str(tmp_path)).search_vectors(vectors[:1], top_k=1, context_window=0, company="acme")
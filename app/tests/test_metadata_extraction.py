@@ -0,0 +1,26 @@
+import faiss
+
+from scripts.embedding_faiss import embed_text
+from scripts.fake_clients import FakeChatClient, FakeEmbeddingClient
+from scripts.metadata_extraction import FIELD_QUERIES, extract_document_metadata
+
+LINES = [
+    {"text": "Orbix Technologies Q4 FY22 Earnings Conference Call", "page": 1, "line": 1},
+    {"text": "October 9, 2024", "page": 1, "line": 2},
+    {"text": "Anita Rao, Chief Executive Officer", "page": 2, "line": 1},
+    {"text": "Vikram Shah, Chief Financial Officer", "page": 3, "line": 1},
+]
+
+
+def test_field_queries_share_one_embedding_call():
+    chunks = [{"text": r["text"], "chunk_id": f"Metadata_{i}"} for i, r in enumerate(LINES)]
+    vectors = embed_text([c["text"] for c in chunks], client=FakeEmbeddingClient(dim=64, latency=0))
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+
+    embedding = FakeEmbeddingClient(dim=64, latency=0)
+    summary = extract_document_metadata(LINES, chunks, index, embedding, FakeChatClient(latency=0))
+    assert len(FIELD_QUERIES) > 1 and embedding.calls == 1
+    assert summary["company"] == LINES[0]["text"]
+    assert summary["total_pages"] == 3
@@ -0,0 +1,22 @@
+from scripts import metrics
+from scripts.metrics import Metrics, record, stage
+
+
+def test_stages_are_measured_without_getrusage(monkeypatch):
+    # As on Windows, where the resource module does not exist
+    monkeypatch.setattr(metrics, "resource", None)
+    m = Metrics()
+    with stage("embed", m):
+        record("api_calls")
+    assert m.stages["embed"]["api_calls"] == 1
+    assert m.stages["embed"]["peak_rss_mb"] is None
+    assert "rss_growth_mb" not in m.stages["embed"]
+    assert m.totals()["peak_rss_mb"] is None
+
+
+def test_peak_rss_is_reported_where_available():
+    m = Metrics()
+    with stage("embed", m):
+        pass
+    assert m.stages["embed"]["peak_rss_mb"] > 0
+    assert m.totals()["peak_rss_mb"] > 0
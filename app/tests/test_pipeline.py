@@ -0,0 +1,48 @@
+import asyncio
+from io import BytesIO
+
+from benchmarks.transcripts import synthetic_transcript
+from scripts.async_pipeline import process_transcript_async
+from scripts.fake_clients import AsyncFakeChatClient, AsyncFakeEmbeddingClient, FakeChatClient, FakeEmbeddingClient
+from scripts.pipeline import process_transcript
+
+MODELS = {"chat_model": "chat-deployment", "embedding_model": "embedding-deployment"}
+
+
+def _recording(client_cls, **kwargs):
+    # Fake client that remembers the model of every request
+    class Recording(client_cls):
+        def _response(self, *args):
+            self.models.add(args[0] if isinstance(self, FakeChatClient) else args[1])
+            return super()._response(*args)
+
+    client = Recording(latency=0, **kwargs)
+    client.models = set()
+    return client
+
+
+def test_stages_call_the_configured_models(tmp_path):
+    chat, embedding = _recording(FakeChatClient), _recording(FakeEmbeddingClient, dim=64)
+    data = process_transcript(BytesIO(synthetic_transcript(3, seed=2)), cache_dir=str(tmp_path), chat_client=chat,
+                              embedding_client=embedding, **MODELS)
+    assert chat.models == {"chat-deployment"}
+    assert embedding.models == {"embedding-deployment"}
+    assert (data["chat_model"], data["embedding_model"]) == ("chat-deployment", "embedding-deployment")
+
+
+def test_async_stages_call_the_configured_models(tmp_path):
+    chat, embedding = _recording(AsyncFakeChatClient), _recording(AsyncFakeEmbeddingClient, dim=64)
+    asyncio.run(process_transcript_async(BytesIO(synthetic_transcript(3, seed=2)), cache_dir=str(tmp_path),
+                                         chat_client=chat, embedding_client=embedding, **MODELS))
+    assert chat.models == {"chat-deployment"}
+    assert embedding.models == {"embedding-deployment"}
+
+
+def test_embedding_models_of_different_sizes_share_one_query_cache(tmp_path):
+    # Same document and same metadata questions; the second model's vectors are half the size
+    pdf = synthetic_transcript(3, seed=2)
+    for dim, model in ((64, "text-embedding-3-large"), (32, "other-embedding")):
+        data = process_transcript(BytesIO(pdf), cache_dir=str(tmp_path / model), chat_client=FakeChatClient(latency=0),
+                                  embedding_client=FakeEmbeddingClient(dim=dim, latency=0), chat_model="gpt-4o",
+                                  embedding_model=model)
+        assert data["faiss_index"].d == dim
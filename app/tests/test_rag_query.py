@@ -0,0 +1,34 @@
+import faiss
+import pytest
+
+from scripts.embedding_faiss import embed_text
+from scripts.rag_query import format_answer, query_index
+
+
+def _cosines(corpus, question):
+    q = embed_text([question], client=corpus["client"])
+    faiss.normalize_L2(q)
+    return corpus["vectors"] @ q[0]
+
+
+@pytest.mark.parametrize("mode", ["vector", "hybrid"])
+def test_confidence_is_the_cosine_similarity(corpus, mode):
+    question = "How did margins and export demand develop?"
+    results = query_index(question, corpus["index"], corpus["chunks"], corpus["client"], top_k=3,
+                          context_window=0, mode=mode, lexical=corpus["lexical"], use_cache=False)
+    cosines = _cosines(corpus, question)
+    for r in results:
+        # Adjacent hits merge into one range, which keeps its best chunk's cosine
+        rows = [int(chunk_id.split("_")[1]) for chunk_id in r["chunk_id"]]
+        assert r["similarity"] == pytest.approx(max(float(cosines[row]) for row in rows), abs=1e-5)
+    assert format_answer("x", results)["confidence"] == pytest.approx(max(r["similarity"] for r in results))
+
+
+def test_lexical_shortcut_reports_bm25_not_full_confidence(corpus):
+    results = query_index("Tiramax 4521 tonnes", corpus["index"], corpus["chunks"], corpus["client"],
+                          context_window=0, mode="hybrid", lexical=corpus["lexical"], use_cache=False)
+    assert results[0]["chunk_id"] == ["Q&A_3"]
+    assert results[0]["similarity"] is None and results[0]["bm25"] > 0
+    ans = format_answer("x", results)
+    assert ans["confidence"] is None
+    assert ans["bm25"] == pytest.approx(results[0]["bm25"])
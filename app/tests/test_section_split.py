@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from benchmarks.section_split import legacy_split, synthetic_lines
+from benchmarks.transcripts import transcript_lines
+from scripts.section_split import _QA_EXACT, iter_section_lines, split_transcript_metadata_opening_qa
+
+
+def _lines(texts):
+    return [{"text": t, "page": 1, "line": i + 1} for i, t in enumerate(texts)]
+
+
+def _texts(parts):
+    return [[line["text"] for line in part] for part in parts]
+
+
+def test_golden_split_of_synthetic_transcript():
+    lines = [{"text": t, "page": i // 55 + 1, "line": i % 55 + 1} for i, t in enumerate(transcript_lines(3, seed=7))]
+    metadata, opening, qa = split_transcript_metadata_opening_qa(lines)
+    assert (len(metadata), len(opening), len(qa)) == (7, 34, 124)
+    assert metadata[0]["text"].endswith("Earnings Conference Call")
+    assert opening[0]["text"].startswith("Moderator: Ladies and gentlemen, good day")
+    assert qa[0]["text"].startswith("Moderator: Thank you. We will now begin the question-and-answer session.")
+
+
+def test_opening_phrase_without_moderator():
+    parts = split_transcript_metadata_opening_qa(_lines([
+        "Acme Industries Q2 FY25 Earnings Call",
+        "John Smith - CEO",
+        "John Smith: Good morning everyone and thank you for joining.",
+        "Revenue grew 12% this quarter.",
+        "We'll now take questions from analysts.",
+        "Priya Shah: What drove margins?",
+    ]))
+    assert _texts(parts) == [
+        ["Acme Industries Q2 FY25 Earnings Call", "John Smith - CEO"],
+        ["John Smith: Good morning everyone and thank you for joining.", "Revenue grew 12% this quarter."],
+        ["We'll now take questions from analysts.", "Priya Shah: What drove margins?"],
+    ]
+
+
+def test_no_qa_cue_keeps_everything_in_opening_remarks():
+    metadata, opening, qa = split_transcript_metadata_opening_qa(_lines([
+        "Zentra Materials Earnings Call",
+        "Moderator: Welcome to the call.",
+        "Mary Major: Net debt reduced by 40 crores.",
+        "Mary Major: Thank you all.",
+    ]))
+    assert len(metadata) == 1 and len(opening) == 3 and qa == []
+
+
+def test_qa_cue_matched_only_fuzzily():
+    cue = "Moderator: We will now begn the Q&A sesion."
+    assert _QA_EXACT.search(cue.lower()) is None
+    metadata, opening, qa = split_transcript_metadata_opening_qa(_lines([
+        "Orbix Technologies Earnings Call",
+        "Moderator: Ladies and gentlemen, welcome.",
+        "John Smith: Demand stayed strong.",
+        cue,
+        "Tom Becker: Could you elaborate on exports?",
+    ]))
+    assert [len(metadata), len(opening), len(qa)] == [1, 2, 2]
+    assert qa[0]["text"] == cue
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 128])
+def test_cue_on_batch_boundaries(batch_size):
+    texts = ["Header"] * 6 + ["Moderator: Good afternoon."] + ["Remarks"] * 13 + ["First question is from Bob."]
+    texts += ["Answer"] * 5
+    sections = [section for section, _ in iter_section_lines(_lines(texts), batch_size=batch_size)]
+    assert sections == ["Metadata"] * 6 + ["Opening Remarks"] * 14 + ["Q&A"] * 6
+
+
+def test_matches_the_legacy_line_by_line_splitter():
+    # Random cue phrases, near-miss typos and moderator lines in random places
+    rng = random.Random(0)
+    for trial in range(150):
+        lines = synthetic_lines(rng.randint(0, 600), rng, cue_rate=rng.choice([0.0, 0.002, 0.02, 0.1]))
+        assert split_transcript_metadata_opening_qa(lines) == legacy_split(lines), f"trial {trial}"